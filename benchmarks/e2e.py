@@ -0,0 +1,163 @@
+# coding: utf-8
+
+"""End-to-end build benchmarks.
+
+Generates synthetic websites of the specified sizes and times 'pub build'
+in a separate process for each scenario:
+
+- cold: no previous build output;
+- warm: rebuild over the existing output without source changes;
+- change: rebuild after a single post was modified.
+
+Results are saved as JSON, so runs could be compared over time.
+
+Usage: python benchmarks/e2e.py [--sizes 100,10000] [--repeat 3]"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import sitegen
+
+LOCAL_PATH = os.path.dirname(os.path.abspath(__file__))
+RESULTS_PATH = os.path.join(LOCAL_PATH, 'results')
+SCENARIOS = ['cold', 'warm', 'change']
+
+# build outputs removed before each cold build
+OUTPUTS = ['build', 'build.builds', 'build.manifest.json', '.highlight-cache',
+           '.pub.conf.cache']
+
+
+def run(sizes, repeat=3, scenarios=SCENARIOS, path=None, build_args=None):
+    """Runs benchmarks and returns results as a dictionary."""
+    results = []
+    for posts in sizes:
+        site_path = os.path.join(path or tempfile.mkdtemp(),
+                                 'site-%d' % posts)
+        if not os.path.isdir(site_path):
+            print("generating website with %d posts" % posts)
+            sitegen.generate(site_path, posts)
+        for scenario in scenarios:
+            times = [_scenario(scenario, site_path, build_args or [])
+                     for _ in range(repeat)]
+            result = {
+                'posts': posts,
+                'scenario': scenario,
+                'times': times,
+                'min': min(times),
+                'median': statistics.median(times),
+            }
+            print("%7d posts  %-6s  median %8.3f s  min %8.3f s" % (
+                posts, scenario, result['median'], result['min']))
+            results.append(result)
+        if path is None:
+            shutil.rmtree(os.path.dirname(site_path), ignore_errors=True)
+    return {
+        'timestamp': datetime.datetime.now().isoformat(),
+        'commit': _commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'build_args': build_args or [],
+        'results': results,
+    }
+
+
+def save(results, file_name=None):
+    """Writes results to [file_name], or to a timestamped file in the
+    results directory. Returns the file name."""
+    if file_name is None:
+        os.makedirs(RESULTS_PATH, exist_ok=True)
+        stamp = datetime.datetime.now().strftime('%Y%m%d-%H%M%S')
+        file_name = os.path.join(RESULTS_PATH, 'e2e-%s.json' % stamp)
+    with open(file_name, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=1, sort_keys=True)
+    return file_name
+
+
+def build(site_path, build_args):
+    """Runs 'pub build' and returns elapsed seconds."""
+    command = [sys.executable, '-m', 'publicstatic', 'build',
+               '--source', site_path] + build_args
+    started = time.perf_counter()
+    subprocess.check_call(command, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.DEVNULL)
+    return time.perf_counter() - started
+
+
+def _scenario(scenario, site_path, build_args):
+    if scenario == 'cold':
+        _clean(site_path)
+    elif scenario == 'warm':
+        _ensure_build(site_path, build_args)
+    elif scenario == 'change':
+        _ensure_build(site_path, build_args)
+        _touch_post(site_path)
+    else:
+        raise ValueError("unknown scenario: " + scenario)
+    return build(site_path, build_args)
+
+
+def _clean(site_path):
+    for name in OUTPUTS:
+        path = os.path.join(site_path, name)
+        if os.path.isdir(path):
+            shutil.rmtree(path)
+        elif os.path.exists(path):
+            os.remove(path)
+
+
+def _ensure_build(site_path, build_args):
+    if not os.path.isdir(os.path.join(site_path, 'build')):
+        build(site_path, build_args)
+
+
+def _touch_post(site_path):
+    """Appends a line to the latest post."""
+    posts_path = os.path.join(site_path, 'posts')
+    file_name = os.path.join(posts_path, max(os.listdir(posts_path)))
+    with open(file_name, 'a', encoding='utf-8') as f:
+        f.write("\nUpdated at %s.\n" % time.time())
+
+
+def _commit():
+    try:
+        output = subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+                                         cwd=LOCAL_PATH,
+                                         stderr=subprocess.DEVNULL)
+        return output.decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--sizes', default='100,10000',
+                        help='comma-separated numbers of posts')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='number of runs per scenario')
+    parser.add_argument('--scenarios', default=','.join(SCENARIOS),
+                        help='comma-separated scenarios')
+    parser.add_argument('--path', default=None,
+                        help='directory to keep generated websites in '
+                             '(reused by the next runs)')
+    parser.add_argument('--output', default=None,
+                        help='results file name')
+    parser.add_argument('build_args', nargs=argparse.REMAINDER,
+                        help="extra 'pub build' arguments after '--'")
+    args = parser.parse_args()
+    build_args = [arg for arg in args.build_args if arg != '--']
+    sizes = [int(size) for size in args.sizes.split(',')]
+    results = run(sizes, args.repeat, args.scenarios.split(','), args.path,
+                  build_args)
+    print('results: ' + save(results, args.output))
+
+
+if __name__ == '__main__':
+    main()
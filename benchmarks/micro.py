@@ -0,0 +1,197 @@
+# coding: utf-8
+
+"""Micro-benchmarks for the functions called once per source or output.
+
+Each case runs the function over realistic inputs of several sizes,
+taken from a synthetic website (see sitegen.py). The best time per call
+of several repeats is reported. Results could be saved and compared with
+a baseline run, in which case slower cases are reported as regressions
+and the exit status is non-zero.
+
+Usage: python benchmarks/micro.py [--save FILE] [--compare BASELINE]"""
+
+import argparse
+import datetime
+import json
+import logging
+import platform
+import random
+import shutil
+import sys
+import tempfile
+import time
+import markdown as python_markdown
+import sitegen
+from publicstatic import builders
+from publicstatic import conf
+from publicstatic import helpers
+from publicstatic import markdown
+from publicstatic import minify
+from publicstatic import templates
+from publicstatic.cache import Cache
+from publicstatic.source import ParseableSource
+from publicstatic.urlify import urlify
+from publicstatic.urlize import URLIZE_RE
+from publicstatic.urlize import UrlizePattern
+
+# minimal total time of a single repeat
+MIN_TIME = 0.2
+REPEAT = 5
+
+# relative slowdown reported as a regression
+THRESHOLD = 0.1
+
+# number of markdown blocks for each input size
+SIZES = {
+    'small': 2,
+    'medium': 10,
+    'large': 40,
+}
+
+TITLES = {
+    'short': 'Hello world',
+    'long': 'A rather long post title: with punctuation, "quotes" & more',
+    'unicode': 'Привет, мир! Ünïcödé títle',
+}
+
+TIMES = {
+    'first_format': '2015/01/02 10:20:30',
+    'last_format': '2015/01/02',
+}
+
+
+def cases(site_path):
+    """Yields (name, function) pairs for the website at [site_path]."""
+    conf.load(site_path)
+    conf.set('min_html', False)
+    templates.redirect(lambda text, dest_path: None)
+    rnd = random.Random(0)
+    cache = Cache()
+    post = cache.posts()[0]
+    pattern = UrlizePattern(URLIZE_RE).getCompiledRegExp()
+
+    # converter setup, paid once per thread
+    yield 'markdown.setup', \
+        lambda: python_markdown.Markdown(extensions=markdown.extensions())
+
+    for size, blocks in sorted(SIZES.items()):
+        text = sitegen.body(rnd, blocks)
+        source = "title: Post\ncreated: 2015/01/02 10:20\ntags: a, b\n\n" + \
+            text
+        html = markdown.md(text)
+        post.set('content', html)
+        page_data = builders._complement(post.data())
+        rendered = templates.rendered_page(page_data)
+        line = ' '.join(text.splitlines())
+
+        yield 'markdown.md/' + size, lambda text=text: markdown.md(text)
+        yield 'minify.minify_html/' + size, \
+            lambda rendered=rendered: minify.minify_html(rendered)
+        yield 'ParseableSource._split/' + size, \
+            lambda source=source: ParseableSource._split(source)
+        yield 'ParseableSource._strip_md/' + size, \
+            lambda text=text: ParseableSource._strip_md(text)
+        yield 'templates.render_page/' + size, \
+            lambda data=page_data: templates.render_page(data, post.dest())
+        yield 'urlize.pattern/' + size, \
+            lambda line=line: pattern.match(line)
+
+    yield 'templates.render_data', \
+        lambda: templates.render_data('data-0.yml', 'table')
+
+    for kind, title in sorted(TITLES.items()):
+        yield 'urlify/' + kind, lambda title=title: urlify(title)
+        yield 'helpers.tag_url/' + kind, \
+            lambda title=title: helpers.tag_url(title)
+
+    for kind, value in sorted(TIMES.items()):
+        yield 'helpers.parse_time/' + kind, \
+            lambda value=value: helpers.parse_time(value)
+
+
+def measure(func, repeat=REPEAT, min_time=MIN_TIME):
+    """Returns the best time per call in seconds and the number of calls
+    in each repeat."""
+    loops = 1
+    while True:
+        elapsed = _timeit(func, loops)
+        if elapsed >= min_time:
+            break
+        loops *= 10 if elapsed < min_time / 10 else 2
+    best = min([elapsed] + [_timeit(func, loops) for _ in range(repeat - 1)])
+    return best / loops, loops
+
+
+def run(name_filter=None):
+    """Runs benchmarks and returns results as a dictionary."""
+    results = {}
+    logging.disable(logging.WARNING)  # keep per-call log messages quiet
+    site_path = tempfile.mkdtemp()
+    try:
+        sitegen.generate(site_path, posts=20)
+        for name, func in cases(site_path):
+            if name_filter and name_filter not in name:
+                continue
+            seconds, loops = measure(func)
+            results[name] = {'seconds': seconds, 'loops': loops}
+            print("%-40s %12.3f us" % (name, seconds * 1e6))
+    finally:
+        shutil.rmtree(site_path, ignore_errors=True)
+    return {
+        'timestamp': datetime.datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': results,
+    }
+
+
+def compare(results, baseline, threshold=THRESHOLD):
+    """Prints relative changes against the [baseline] results. Returns a
+    list of regressed benchmark names."""
+    regressions = []
+    for name, result in sorted(results['results'].items()):
+        if name not in baseline['results']:
+            continue
+        before = baseline['results'][name]['seconds']
+        change = result['seconds'] / before - 1
+        regressed = change > threshold
+        if regressed:
+            regressions.append(name)
+        print("%-40s %+8.1f%%%s" % (name, change * 100,
+                                    '  REGRESSION' if regressed else ''))
+    return regressions
+
+
+def _timeit(func, loops):
+    started = time.perf_counter()
+    for _ in range(loops):
+        func()
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--filter', default=None,
+                        help='run benchmarks with names containing the text')
+    parser.add_argument('--save', default=None, metavar='FILE',
+                        help='save results to the file')
+    parser.add_argument('--compare', default=None, metavar='BASELINE',
+                        help='compare results with the baseline file')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='relative slowdown considered a regression')
+    args = parser.parse_args()
+    results = run(args.filter)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("%d regressions found" % len(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+# coding: utf-8
+
+"""Synthetic website generator for benchmarks.
+
+Creates a website with the specified number of posts and pages. Tags
+follow a Zipf-like distribution (a few popular tags and a long tail),
+post bodies mix paragraphs, lists, links, fenced code blocks and
+'--- data:' directives, and the assets include stylesheets, scripts,
+LESS files and binary files. The output depends on the seed only.
+
+Usage: python benchmarks/sitegen.py PATH [--posts N] [--pages N]"""
+
+import argparse
+import datetime
+import os
+import random
+import subprocess
+import sys
+
+WORDS = """lorem ipsum dolor sit amet consectetur adipiscing elit sed do
+eiusmod tempor incididunt ut labore et dolore magna aliqua enim ad minim
+veniam quis nostrud exercitation ullamco laboris nisi aliquip ex ea
+commodo consequat duis aute irure in reprehenderit voluptate velit esse
+cillum fugiat nulla pariatur excepteur sint occaecat cupidatat non
+proident sunt culpa qui officia deserunt mollit anim id est laborum
+static website builder template markdown python cache render""".split()
+
+CODE = """def {name}(items):
+    \"\"\"Returns sorted unique {name}.\"\"\"
+    result = set()
+    for item in items:
+        if item and not item.startswith('#'):
+            result.add(item.strip().lower())
+    return sorted(result)
+"""
+
+DATA_TEMPLATE = """<table>
+{% for row in data %}<tr><td>{{ row.name }}</td><td>{{ row.value }}</td></tr>
+{% endfor %}</table>
+"""
+
+LESS = """@color: #{color};
+@padding: {padding}px;
+
+.block-{index} {{
+  color: @color;
+  padding: @padding;
+  .inner {{ margin: (@padding * 2); border: 1px solid darken(@color, 10%); }}
+}}
+"""
+
+CSS = """.item-{index} {{ color: #{color}; margin: {padding}px; }}
+.item-{index}:hover {{ color: #333; text-decoration: underline; }}
+"""
+
+JS = """(function() {{
+  var items = document.querySelectorAll('.item-{index}');
+  for (var i = 0; i < items.length; i++) {{
+    items[i].setAttribute('data-index', i + {index});
+  }}
+}})();
+"""
+
+# share of posts having code blocks and data directives
+CODE_RATE = 0.3
+DATA_RATE = 0.05
+
+# number of data files and assets of each kind
+DATA_FILES = 5
+ASSETS = 10
+
+
+def generate(path, posts=100, pages=None, tags=None, seed=0):
+    """Creates a new website at [path] with [posts] posts and [pages]
+    pages (a tenth of posts by default), using [tags] distinct tags."""
+    rnd = random.Random(seed)
+    pages = posts // 10 if pages is None else pages
+    tags = tags or max(10, int(posts ** 0.5))
+    init(path)
+    tag_names = ['tag-%d' % index for index in range(tags)]
+    tag_weights = [1 / (index + 1) for index in range(tags)]
+
+    _data(path, rnd)
+    _assets(path, rnd)
+
+    started = datetime.datetime(2010, 1, 1)
+    for index in range(posts):
+        created = started + datetime.timedelta(hours=index * 7,
+                                               minutes=rnd.randrange(60))
+        post_tags = set(rnd.choices(tag_names, tag_weights,
+                                    k=rnd.randint(1, 5)))
+        name = "%s-post-%d.md" % (created.strftime('%Y%m%d'), index)
+        header = "title: %s\ncreated: %s\ntags: %s\n" % (
+            _sentence(rnd, 3, 8), created.strftime('%Y/%m/%d %H:%M:%S'),
+            ', '.join(sorted(post_tags)))
+        _write(path, 'posts', name, header + '\n' + body(rnd))
+
+    for index in range(pages):
+        dir_name = 'section-%d' % (index % 10) if index >= 10 else ''
+        header = "title: %s\n" % _sentence(rnd, 2, 5)
+        _write(path, 'pages', dir_name, 'page-%d.md' % index,
+               header + '\n' + body(rnd))
+
+
+def init(path):
+    """Initializes a website using public-static command line."""
+    command = [sys.executable, '-m', 'publicstatic', 'init', path, '--force']
+    subprocess.check_call(command, stdout=subprocess.DEVNULL,
+                          stderr=subprocess.DEVNULL)
+    for dir_name in ['posts', 'pages']:
+        dir_path = os.path.join(path, dir_name)
+        for file_name in os.listdir(dir_path):
+            os.remove(os.path.join(dir_path, file_name))
+
+
+def body(rnd, blocks=None):
+    """Returns markdown text with the specified number of [blocks]
+    (paragraphs, lists, sections), random by default."""
+    parts = []
+    for _ in range(blocks or rnd.randint(2, 8)):
+        kind = rnd.random()
+        if kind < 0.6:
+            parts.append(_paragraph(rnd))
+        elif kind < 0.8:
+            parts.append('\n'.join("* %s" % _sentence(rnd, 3, 10)
+                                   for _ in range(rnd.randint(2, 6))))
+        else:
+            parts.append("## %s\n\n%s" % (_sentence(rnd, 2, 6),
+                                         _paragraph(rnd)))
+    if rnd.random() < CODE_RATE:
+        code = CODE.format(name=rnd.choice(WORDS))
+        parts.insert(rnd.randrange(len(parts)),
+                     "```python\n%s```" % code)
+    if rnd.random() < DATA_RATE:
+        parts.append("--- data: data-%d.yml, table" %
+                     rnd.randrange(DATA_FILES))
+    return '\n\n'.join(parts) + '\n'
+
+
+def _paragraph(rnd):
+    sentences = []
+    for _ in range(rnd.randint(2, 6)):
+        sentence = _sentence(rnd, 6, 20)
+        if rnd.random() < 0.2:
+            sentence += " See http://example.com/%s." % rnd.choice(WORDS)
+        elif rnd.random() < 0.2:
+            sentence += " Read [%s](http://example.org/%d)." % (
+                rnd.choice(WORDS), rnd.randrange(1000))
+        elif rnd.random() < 0.2:
+            sentence = sentence.replace(' ', ' **', 1) + '**'
+        sentences.append(sentence)
+    return ' '.join(sentences)
+
+
+def _sentence(rnd, min_words, max_words):
+    words = rnd.sample(WORDS, rnd.randint(min_words, max_words))
+    return ' '.join(words).capitalize()
+
+
+def _data(path, rnd):
+    _write(path, 'templates', '_data_table.html', DATA_TEMPLATE)
+    for index in range(DATA_FILES):
+        rows = ''.join("- name: %s\n  value: %d\n" % (rnd.choice(WORDS),
+                                                      rnd.randrange(1000))
+                       for _ in range(rnd.randint(5, 50)))
+        _write(path, 'data', 'data-%d.yml' % index, rows)
+
+
+def _assets(path, rnd):
+    for index in range(ASSETS):
+        values = {
+            'index': index,
+            'color': '%06x' % rnd.randrange(0x1000000),
+            'padding': rnd.randint(1, 20),
+        }
+        _write(path, 'assets', 'css', 'style-%d.less' % index,
+               LESS.format(**values))
+        _write(path, 'assets', 'css', 'extra-%d.css' % index,
+               CSS.format(**values) * 20)
+        _write(path, 'assets', 'js', 'script-%d.js' % index,
+               JS.format(**values) * 10)
+        file_name = os.path.join(path, 'assets', 'img', 'image-%d.bin' % index)
+        os.makedirs(os.path.dirname(file_name), exist_ok=True)
+        size = rnd.randint(1024, 65536)
+        with open(file_name, 'wb') as f:
+            f.write(rnd.getrandbits(size * 8).to_bytes(size, 'little'))
+
+
+def _write(path, *parts):
+    *parts, text = parts
+    file_name = os.path.join(path, *parts)
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    with open(file_name, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('path', help='website directory')
+    parser.add_argument('--posts', type=int, default=100,
+                        help='number of posts')
+    parser.add_argument('--pages', type=int, default=None,
+                        help='number of pages (a tenth of posts by default)')
+    parser.add_argument('--tags', type=int, default=None,
+                        help='number of distinct tags')
+    parser.add_argument('--seed', type=int, default=0,
+                        help='random generator seed')
+    args = parser.parse_args()
+    generate(args.path, args.posts, args.pages, args.tags, args.seed)
+
+
+if __name__ == '__main__':
+    main()
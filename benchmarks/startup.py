@@ -0,0 +1,115 @@
+# coding: utf-8
+
+"""CLI startup benchmarks.
+
+Measures wall time of commands which should not load heavy dependencies
+(Jinja2, Python-Markdown, PyYAML, BeautifulSoup) in a fresh interpreter,
+and the package import time reported by 'python -X importtime'. Results
+could be saved and compared with a baseline run the same way as
+micro-benchmarks (see micro.py).
+
+Usage: python benchmarks/startup.py [--save FILE] [--compare BASELINE]"""
+
+import argparse
+import datetime
+import json
+import platform
+import re
+import subprocess
+import sys
+import tempfile
+import time
+
+REPEAT = 10
+
+# relative slowdown reported as a regression
+THRESHOLD = 0.2
+
+COMMANDS = {
+    'import': ['-c', 'import publicstatic'],
+    'version': ['-m', 'publicstatic', '--version'],
+    'help': ['-m', 'publicstatic', 'build', '--help'],
+}
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+\d+ \|\s+(\d+) \| publicstatic$",
+                           re.M)
+
+
+def measure(args, repeat=REPEAT, cwd=None):
+    """Returns the best wall time of running Python with [args]."""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.check_call([sys.executable] + args, cwd=cwd,
+                              stdout=subprocess.DEVNULL,
+                              stderr=subprocess.DEVNULL)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def import_time(repeat=REPEAT):
+    """Returns the best cumulative package import time in seconds."""
+    best = None
+    for _ in range(repeat):
+        output = subprocess.run([sys.executable, '-X', 'importtime', '-c',
+                                 'import publicstatic'],
+                                stdout=subprocess.DEVNULL,
+                                stderr=subprocess.PIPE).stderr.decode()
+        match = IMPORTTIME_RE.search(output)
+        if match:
+            seconds = int(match.group(1)) / 1e6
+            best = seconds if best is None else min(best, seconds)
+    return best
+
+
+def run(repeat=REPEAT):
+    """Runs benchmarks and returns results as a dictionary."""
+    results = {}
+    baseline = measure(['-c', 'pass'], repeat)
+    print("%-24s %10.1f ms" % ('python', baseline * 1000))
+    with tempfile.TemporaryDirectory() as cwd:
+        for name, args in sorted(COMMANDS.items()):
+            seconds = measure(args, repeat, cwd)
+            results['startup/' + name] = {'seconds': seconds}
+            print("%-24s %10.1f ms" % ('startup/' + name, seconds * 1000))
+    seconds = import_time(repeat)
+    if seconds is not None:
+        results['importtime/publicstatic'] = {'seconds': seconds}
+        print("%-24s %10.1f ms" % ('importtime/publicstatic', seconds * 1000))
+    return {
+        'timestamp': datetime.datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'interpreter': baseline,
+        'results': results,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[0])
+    parser.add_argument('--repeat', type=int, default=REPEAT,
+                        help='number of runs per command')
+    parser.add_argument('--save', default=None, metavar='FILE',
+                        help='save results to the file')
+    parser.add_argument('--compare', default=None, metavar='BASELINE',
+                        help='compare results with the baseline file')
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help='relative slowdown considered a regression')
+    args = parser.parse_args()
+    results = run(args.repeat)
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1, sort_keys=True)
+    if args.compare:
+        import micro
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)
+        regressions = micro.compare(results, baseline, args.threshold)
+        if regressions:
+            print("%d regressions found" % len(regressions))
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
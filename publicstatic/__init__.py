@@ -1,15 +1,37 @@
+import os
 import sys
 from publicstatic import conf
 from publicstatic import cli
+from publicstatic import daemon
+from publicstatic import helpers
 from publicstatic import logger
+from publicstatic import markdown
 from publicstatic import publicstatic
+from publicstatic import publish
+from publicstatic import shards
 from publicstatic import source
 
-USER_ERRORS = (
-    conf.NotFoundException,
-    conf.ConfigurationExistsException,
-    source.PageExistsException,
-)
+
+def user_errors():
+    """Returns exceptions reported without traceback. Command-specific
+    subsystems are imported here instead of the module level to keep CLI
+    startup fast."""
+    from publicstatic import deployer
+    from publicstatic import loadtest
+    return (
+        conf.NotFoundException,
+        conf.ConfigurationExistsException,
+        shards.ShardFormatException,
+        shards.AmbiguousShardsException,
+        shards.IncompleteShardsException,
+        daemon.DaemonRunningException,
+        deployer.DeployException,
+        loadtest.LoadTestException,
+        markdown.MarkdownEngineException,
+        publish.IncompleteBuildException,
+        publish.NoPreviousBuildException,
+        source.PageExistsException,
+    )
 
 CRITICAL_ERRORS = (
     conf.ParsingError,
@@ -19,23 +41,59 @@ CRITICAL_ERRORS = (
 )
 
 
+def forward(args):
+    """Forwards command to the build daemon, if it is running.
+    Returns False if the command should be executed locally."""
+    command = args.get('command')
+    source = args.get('source')
+    if command not in daemon.COMMANDS or not daemon.running(source):
+        return False
+    if command == 'build':
+        output = args['output'] and os.path.abspath(args['output'])
+        trace = args['trace'] and os.path.abspath(args['trace'])
+        daemon.request(source, command, output=output, shard=args['shard'],
+                       merge=args['merge'], pipelined=args['pipeline'],
+                       profile=args['profile'], trace=trace,
+                       memprofile=args['memprofile'],
+                       template_profile=args['template_profile'])
+    else:
+        result = daemon.request(source, command, name=args['name'],
+                                force=args['force'])
+        if result and result['path'] and args['edit']:
+            helpers.execute(result['editor_cmd'], result['path'])
+    return True
+
+
 def dispatch(args):
     command = args.get('command')
     source = args.get('source')
+    if forward(args):
+        return
     if command == 'init':
         publicstatic.init(args.get('path'), args['force'])
     elif command == 'build':
-        publicstatic.build(source, args['output'])
+        publicstatic.build(source, args['output'], args['shard'],
+                           args['merge'], pipelined=args['pipeline'],
+                           profile=args['profile'], trace=args['trace'],
+                           memprofile=args['memprofile'],
+                           template_profile=args['template_profile'])
     elif command == 'run':
-        publicstatic.run(source, args['port'], args['browse'])
+        publicstatic.run(source, args['port'], args['browse'], args['live'])
+    elif command == 'loadtest':
+        publicstatic.loadtest(source, args['port'], args['concurrency'],
+                              args['requests'])
     elif command == 'deploy':
         publicstatic.deploy(source)
+    elif command == 'daemon':
+        publicstatic.daemon(source, args['stop'])
     elif command == 'clean':
         publicstatic.clean(source)
     elif command == 'page':
         publicstatic.page(source, args['name'], args['force'], args['edit'])
     elif command == 'post':
         publicstatic.post(source, args['name'], args['force'], args['edit'])
+    elif command == 'rollback':
+        publicstatic.rollback(source)
     elif command == 'theme':
         subcommand = args.get('command2')
         if subcommand == 'update':
@@ -45,7 +103,8 @@ def dispatch(args):
 def main():
     try:
         dispatch(cli.parse(sys.argv[1:]))
-    except USER_ERRORS as e:
-        logger.error(e)
-    except CRITICAL_ERRORS:
-        logger.crash()
+    except CRITICAL_ERRORS as e:
+        if isinstance(e, user_errors()):
+            logger.error(e)
+        else:
+            logger.crash()
@@ -1,4 +1,4 @@
 import sys
-from publicstatic.publicstatic import main
+from publicstatic import main
 
 sys.exit(main())
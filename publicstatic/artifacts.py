@@ -0,0 +1,192 @@
+# coding: utf-8
+
+"""Content-addressed build artifact cache.
+
+Artifacts (markdown conversions, minified pages and assets) are keyed
+by a hash of their inputs and stored in a pluggable backend, so any
+machine sharing the same backend could reuse outputs produced by another
+one instead of recomputing them."""
+
+import hashlib
+import os
+import tempfile
+import threading
+from publicstatic import conf
+from publicstatic import helpers
+from publicstatic import logger
+from publicstatic import pathes
+from publicstatic import writer
+from publicstatic.version import __version__
+
+# HTTP backend request timeout in seconds
+HTTP_TIMEOUT = 10
+
+_store = None
+_loaded = False
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+class DirBackend:
+    """Stores artifacts as files inside a local or mounted directory."""
+
+    def __init__(self, path):
+        self._path = path
+
+    def __str__(self):
+        return self._path
+
+    def get(self, key):
+        try:
+            with open(self._file(key), 'rb') as f:
+                return f.read()
+        except (IOError, OSError):
+            return None
+
+    def put(self, key, value):
+        file_name = self._file(key)
+        helpers.makedirs(os.path.dirname(file_name))
+        fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(file_name))
+        with os.fdopen(fd, 'wb') as f:
+            f.write(value)
+        os.replace(tmp_name, file_name)
+
+    def _file(self, key):
+        return os.path.join(self._path, key[:2], key)
+
+
+class HttpBackend:
+    """Fetches artifacts with GET and stores them with PUT requests
+    to <url>/<key>. Any server supporting these two methods will do."""
+
+    def __init__(self, url, timeout=HTTP_TIMEOUT):
+        self._url = url.rstrip('/') + '/'
+        self._timeout = timeout
+
+    def __str__(self):
+        return self._url
+
+    def get(self, key):
+        import urllib.request
+        try:
+            with urllib.request.urlopen(self._url + key,
+                                        timeout=self._timeout) as response:
+                return response.read()
+        except urllib.error.HTTPError as e:
+            if e.code != 404:
+                logger.debug("artifact cache GET error: %s" % e)
+        except (urllib.error.URLError, OSError) as e:
+            logger.debug("artifact cache GET error: %s" % e)
+        return None
+
+    def put(self, key, value):
+        import urllib.request
+        request = urllib.request.Request(self._url + key,
+                                         data=value,
+                                         method='PUT')
+        request.add_header('Content-Type', 'application/octet-stream')
+        try:
+            urllib.request.urlopen(request, timeout=self._timeout).close()
+        except (urllib.error.URLError, OSError) as e:
+            logger.debug("artifact cache PUT error: %s" % e)
+
+
+def backend(spec):
+    """Creates storage backend from the configuration value. HTTP(S) URLs
+    are served by HttpBackend, anything else is treated as a directory
+    path relative to the site source directory."""
+    if spec.startswith('http://') or spec.startswith('https://'):
+        return HttpBackend(spec)
+    return DirBackend(pathes.site(os.path.expanduser(spec)))
+
+
+def store():
+    """Returns configured storage backend or None if the cache is
+    disabled."""
+    global _store, _loaded
+    if not _loaded:
+        spec = conf.get('artifact_cache')
+        _store = backend(spec) if spec else None
+        _loaded = True
+    return _store
+
+
+def enabled():
+    return store() is not None
+
+
+def reset():
+    """Drops backend configuration and hit/miss counters."""
+    global _store, _loaded
+    _store, _loaded = None, False
+    with _lock:
+        _stats.update({'hits': 0, 'misses': 0})
+
+
+def stats():
+    """Returns (hits, misses) tuple."""
+    with _lock:
+        return _stats['hits'], _stats['misses']
+
+
+def key(kind, parts):
+    """Input hash for an artifact of the specified kind."""
+    digest = hashlib.sha1()
+    for part in [__version__, kind] + list(parts):
+        part = part if isinstance(part, bytes) else str(part).encode('utf-8')
+        digest.update(("%d:" % len(part)).encode('ascii'))
+        digest.update(part)
+    return digest.hexdigest()
+
+
+def cached(kind, parts, produce):
+    """Returns artifact bytes from the cache, or calls produce() to get
+    them and puts the result to the cache."""
+    backend = store()
+    if backend is None:
+        return produce()
+    artifact_key = key(kind, parts)
+    value = backend.get(artifact_key)
+    _count('hits' if value is not None else 'misses')
+    if value is None:
+        value = produce()
+        backend.put(artifact_key, value)
+    return value
+
+
+def cached_text(kind, parts, produce):
+    """Same as cached() for unicode text artifacts."""
+    if not enabled():
+        return produce()
+    produce_bytes = lambda: produce().encode('utf-8')
+    return cached(kind, parts, produce_bytes).decode('utf-8')
+
+
+def cached_file(kind, parts, dest, produce):
+    """Same as cached() for artifacts produced as a file. produce(path)
+    is expected to create the file at the path, which is renamed to the
+    [dest] afterwards (see writer.produce())."""
+    if not enabled():
+        writer.produce(dest, produce)
+        return
+
+    produced = []
+
+    def produce_file():
+        writer.produce(dest, produce)
+        produced.append(dest)
+        with open(dest, 'rb') as f:
+            return f.read()
+
+    def write(path):
+        with open(path, 'wb') as f:
+            f.write(value)
+
+    value = cached(kind, parts, produce_file)
+    if not produced:
+        writer.produce(dest, write)
+
+
+def _count(counter):
+    with _lock:
+        _stats[counter] += 1
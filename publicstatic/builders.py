@@ -3,17 +3,31 @@
 """Website building routines."""
 
 import os
-import shutil
 import traceback
+from publicstatic import artifacts
 from publicstatic import conf
 from publicstatic import const
 from publicstatic import logger
+from publicstatic import profiler
 from publicstatic import helpers
+from publicstatic import shards
 from publicstatic import templates
+from publicstatic import writer
 
 
 def order():
     """Returns a sequence of builder functions."""
+    return shard_order() + global_order()
+
+
+def shard_order():
+    """Builders producing per-source outputs, which could be split
+    between shards."""
+    return asset_order() + page_order()
+
+
+def asset_order():
+    """Builders processing assets."""
     return [
         css,
         js,
@@ -21,10 +35,24 @@ def order():
         robots,
         humans,
         static,
+    ]
+
+
+def page_order():
+    """Builders rendering pages for individual sources and tags."""
+    return [
         pages,
         posts,
-        archive,
         tags,
+    ]
+
+
+def global_order():
+    """Builders producing site-wide outputs, which depend on the whole
+    site index."""
+    return [
+        root,
+        archive,
         atom,
         sitemap,
     ]
@@ -32,54 +60,48 @@ def order():
 
 def css(cache):
     """Minify CSS files to the build path."""
-    for source in cache.assets(ext='.css'):
+    for source in _own(cache.assets(ext='.css')):
         helpers.makedirs(source.dest_dir())
         command = conf.get('min_css_cmd')
         if conf.get('min_css') and command:
             logger.info('minifying CSS: ' + source.rel_path())
-            helpers.execute(command, source.path(), source.dest())
+            _minify_asset('min_css', command, source)
+            helpers.utime(source.dest(), source.updated())
         else:
             logger.info('copying: ' + source.rel_path())
-            shutil.copyfile(source.path(), source.dest())
-        helpers.utime(source.dest(), source.updated())
+            writer.copy(source.path(), source.dest(), source.updated())
         source.processed(True)
 
 
 def js(cache):
     """Minify JavaScript files to the build path."""
-    for source in cache.assets(ext='.js'):
+    for source in _own(cache.assets(ext='.js')):
         helpers.makedirs(source.dest_dir())
         command = conf.get('min_js_cmd')
         if conf.get('min_js') and command:
             logger.info('minifying JavaScript: ' + source.rel_path())
-            helpers.execute(command, source.path(), source.dest())
+            _minify_asset('min_js', command, source)
+            helpers.utime(source.dest(), source.updated())
         else:
             logger.info('copying: ' + source.rel_path())
-            shutil.copyfile(source.path(), source.dest())
-        helpers.utime(source.dest(), source.updated())
+            writer.copy(source.path(), source.dest(), source.updated())
         source.processed(True)
 
 
 def less(cache):
     """Compile and minify less files."""
-    for source in cache.assets(ext='.less'):
+    for source in _own(cache.assets(ext='.less')):
         helpers.makedirs(source.dest_dir())
         logger.info('compiling LESS: ' + source.rel_path())
-        if conf.get('min_css') and conf.get('min_css_cmd'):
-            tmp_file = os.path.join(source.dest_dir(), '_' + source.basename())
-            helpers.execute(conf.get('less_cmd'), source.path(), tmp_file)
-            logger.info('minifying CSS: ' + source.rel_path())
-            helpers.execute(conf.get('min_css_cmd'), tmp_file, source.dest())
-            os.remove(tmp_file)
-        else:
-            helpers.execute(conf.get('less_cmd'), source.path(), source.dest())
+        with profiler.output(source.dest()):
+            _less(source)
         helpers.utime(source.dest(), source.updated())
         source.processed(True)
 
 
 def robots(cache):
     """Build robots.txt."""
-    for source in cache.assets(basename='robots.txt'):
+    for source in _own(cache.assets(basename='robots.txt')):
         logger.info('processing ' + source.rel_path())
         helpers.makedirs(source.dest_dir())
         try:
@@ -94,7 +116,7 @@ def robots(cache):
 
 def humans(cache):
     """Build humans.txt."""
-    for source in cache.assets(basename='humans.txt'):
+    for source in _own(cache.assets(basename='humans.txt')):
         logger.info('processing ' + source.rel_path())
         helpers.makedirs(source.dest_dir())
         try:
@@ -109,17 +131,15 @@ def humans(cache):
 
 def static(cache):
     """Copy other assets as is to the build path."""
-    for source in cache.assets(processed=False):
+    for source in _own(cache.assets(processed=False)):
         logger.info('copying: ' + source.rel_path())
-        helpers.makedirs(source.dest_dir())
-        shutil.copyfile(source.path(), source.dest())
-        helpers.utime(source.dest(), source.updated())
+        writer.copy(source.path(), source.dest(), source.updated())
         source.processed(True)
 
 
 def pages(cache):
     """Build site pages."""
-    for source in cache.pages():
+    for source in _own(cache.pages()):
         logger.info(_to('page', source.rel_path(), source.rel_dest()))
         helpers.makedirs(source.dest_dir())
         try:
@@ -131,8 +151,8 @@ def pages(cache):
 
 
 def posts(cache):
-    """Build blog posts and copy the latest post to the site root."""
-    for source in cache.posts():
+    """Build blog posts."""
+    for source in _own(cache.posts()):
         logger.info(_to('post', source.rel_path(), source.rel_dest()))
         helpers.makedirs(source.dest_dir())
         try:
@@ -142,15 +162,19 @@ def posts(cache):
             logger.error('post building error: ' + str(ex))
             logger.debug(traceback.format_exc())
 
-    if conf.get('post_at_root_url'):  # put the latest post at site root url
+
+def root(cache):
+    """Copy the latest post to the site root."""
+    if conf.get('post_at_root_url') and cache.posts():
         last = cache.posts()[0]
         path = os.path.join(conf.get('build_path'), conf.get('index_page'))
         logger.info(_to('root', last.rel_dest(), conf.get('index_page')))
         if any(cache.pages(dest=conf.get('index_page'))):
             logger.warn('root page will be overwritten by the latest post')
-        try:
-            shutil.copyfile(last.dest(), path)
-        except FileNotFoundError:
+        writer.wait(last.dest())
+        if os.path.isfile(last.dest()):
+            writer.copy(last.dest(), path)
+        else:
             logger.error("latest post was not generated and can't be copied")
 
 
@@ -169,6 +193,8 @@ def tags(cache):
     for tag in cache.tags():
         tag = tag['name']
         dest = helpers.tag_path(tag)
+        if not shards.selected(_rel(dest)):
+            continue
         logger.info(_to('tag', tag, dest))
         helpers.makedirs(os.path.dirname(dest))
         data = _complement({'title': tag}, index=cache.index(tag=tag))
@@ -193,6 +219,36 @@ def sitemap(cache):
     templates.render(data, 'sitemap.xml', dest)
 
 
+def _minify_asset(kind, command, source):
+    """Run minification command through the artifact cache."""
+    with open(source.path(), 'rb') as f:
+        parts = [command, f.read()]
+    execute = lambda path: helpers.execute(command, source.path(), path)
+    with profiler.output(source.dest()), profiler.stage('minify'):
+        artifacts.cached_file(kind, parts, source.dest(), execute)
+
+
+def _less(source):
+    if conf.get('min_css') and conf.get('min_css_cmd'):
+        tmp_file = os.path.join(source.dest_dir(), '_' + source.basename())
+        with profiler.stage('render'):
+            helpers.execute(conf.get('less_cmd'), source.path(), tmp_file)
+        logger.info('minifying CSS: ' + source.rel_path())
+        with profiler.stage('minify'):
+            writer.produce(source.dest(), lambda path: helpers.execute(
+                conf.get('min_css_cmd'), tmp_file, path))
+        os.remove(tmp_file)
+    else:
+        with profiler.stage('render'):
+            writer.produce(source.dest(), lambda path: helpers.execute(
+                conf.get('less_cmd'), source.path(), path))
+
+
+def _own(sources):
+    """Filter sources belonging to the current build shard."""
+    return [item for item in sources if shards.selected(item.rel_dest())]
+
+
 def _complement(page_data=None, index=None):
     """Complement individual page data with common variables and site index."""
     return {
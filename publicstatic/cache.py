@@ -3,34 +3,63 @@
 import os
 from publicstatic import conf
 from publicstatic import helpers
+from publicstatic import metrics
 from publicstatic import pathes
+from publicstatic import profiler
 from publicstatic import source
 
 
+def scan():
+    """Yields (source type, root directory, relative path) for each
+    source file. Assets go first."""
+    proc_queue = [
+        (source.AssetSource, pathes.theme_assets()),
+        (source.AssetSource, pathes.assets()),
+        (source.PageSource, pathes.pages()),
+        (source.PostSource, pathes.posts()),
+    ]
+
+    for src_type, dir_path in proc_queue:
+        for root, rel in helpers.iterwalk(dir_path):
+            yield src_type, root, rel
+
+
+def load(src_type, root, rel, reusable=None):
+    """Creates source object, or reuses unchanged one from the [reusable]
+    dictionary produced by Cache._reusable()."""
+    file_name = os.path.join(root, rel)
+    reused = (reusable or {}).get((src_type, file_name))
+    if reused is not None and not reused.changed():
+        reused.processed(False)
+        metrics.count('sources_reused')
+        return reused
+    metrics.count('sources_parsed')
+    name = os.path.join(os.path.basename(root), rel)
+    with profiler.item(name), profiler.stage('parse'):
+        return src_type(file_name, root)
+
+
 class Cache():
     """Website contents cache."""
 
-    def __init__(self):
-        """Populate cache with source files."""
+    def __init__(self, previous=None, sources=None, errors=None):
+        """Populate cache with source files. Unchanged sources are reused
+        from the [previous] cache instance if it is specified. Already
+        loaded [sources] and processing [errors] could be passed instead
+        of scanning source directories."""
         self._cache = []
+        self._errors = list(errors or [])
 
-        proc_queue = [
-            (source.AssetSource, pathes.theme_assets()),
-            (source.AssetSource, pathes.assets()),
-            (source.PageSource, pathes.pages()),
-            (source.PostSource, pathes.posts()),
-        ]
+        if sources is not None:
+            self._cache = list(sources)
+            return
 
-        self._errors = []
-        for src_type, dir_path in proc_queue:
-            def add_source(root, rel):
-                try:
-                    file_name = os.path.join(root, rel)
-                    self._cache.append(src_type(file_name, root))
-                except Exception as e:
-                    self._errors.append((rel, e))
-
-            helpers.walk(dir_path, add_source)
+        reusable = previous._reusable() if previous is not None else {}
+        for src_type, root, rel in scan():
+            try:
+                self._cache.append(load(src_type, root, rel, reusable))
+            except Exception as e:
+                self._errors.append((rel, e))
 
     def cond(self,
              source_type=None,
@@ -119,6 +148,10 @@ class Cache():
         """A list of non-digested source files."""
         return self._errors
 
+    def _reusable(self):
+        """Sources which could be reused by the next cache instance."""
+        return {(type(item), item.path()): item for item in self._cache}
+
     def _get_posts(self):
         posts = list(filter(self.cond(source.PostSource), self._cache))
         posts.sort(key=lambda item: item.created(), reverse=True)
@@ -30,6 +30,70 @@ ARGS = {
             'help': 'build output path',
         }
     ),
+    '--shard': (
+        ['--shard'],
+        {
+            'default': None,
+            'metavar': 'K/N',
+            'dest': 'shard',
+            'help': 'build K-th of N deterministic subsets of the website',
+        }
+    ),
+    '--merge': (
+        ['--merge'],
+        {
+            'action': 'store_true',
+            'default': False,
+            'dest': 'merge',
+            'help': 'merge shard outputs and build site-wide pages',
+        }
+    ),
+    '--pipeline': (
+        ['--pipeline'],
+        {
+            'action': 'store_true',
+            'default': False,
+            'dest': 'pipeline',
+            'help': 'use pipelined build',
+        }
+    ),
+    '--profile': (
+        ['--profile'],
+        {
+            'action': 'store_true',
+            'default': False,
+            'dest': 'profile',
+            'help': 'report time spent by builders and individual files',
+        }
+    ),
+    '--memprofile': (
+        ['--memprofile'],
+        {
+            'action': 'store_true',
+            'default': False,
+            'dest': 'memprofile',
+            'help': 'report memory usage and allocation sites per build stage',
+        }
+    ),
+    '--template-profile': (
+        ['--template-profile'],
+        {
+            'action': 'store_true',
+            'default': False,
+            'dest': 'template_profile',
+            'help': 'report time spent in templates, blocks, macros and '
+                    'filters',
+        }
+    ),
+    '--trace': (
+        ['--trace'],
+        {
+            'default': None,
+            'metavar': 'FILE',
+            'dest': 'trace',
+            'help': 'write build trace in Chrome Trace Event format',
+        }
+    ),
     '--port': (
         ['-p', '--port'],
         {
@@ -39,6 +103,24 @@ ARGS = {
             'help': 'port for local HTTP server',
         }
     ),
+    '--concurrency': (
+        ['-c', '--concurrency'],
+        {
+            'default': None,
+            'type': int,
+            'dest': 'concurrency',
+            'help': 'number of concurrent connections',
+        }
+    ),
+    '--requests': (
+        ['-n', '--requests'],
+        {
+            'default': None,
+            'type': int,
+            'dest': 'requests',
+            'help': 'total number of requests',
+        }
+    ),
     '--browse': (
         ['-b', '--browse'],
         {
@@ -48,6 +130,15 @@ ARGS = {
             'help': 'open in default browser',
         }
     ),
+    '--live': (
+        ['-l', '--live'],
+        {
+            'action': 'store_true',
+            'default': False,
+            'dest': 'live',
+            'help': 'render pages on demand from the source files',
+        }
+    ),
     '--force': (
         ['-f', '--force'],
         {
@@ -75,6 +166,15 @@ ARGS = {
             'help': 'backup previous version',
         }
     ),
+    '--stop': (
+        ['--stop'],
+        {
+            'action': 'store_true',
+            'default': False,
+            'dest': 'stop',
+            'help': 'stop running daemon',
+        }
+    ),
     'path': (
         ['path'],
         {
@@ -102,14 +202,21 @@ CONF = {
         },
         {
             'name': 'build',
-            'args': ['--source', '--output'],
+            'args': ['--source', '--output', '--shard', '--merge',
+                     '--pipeline', '--profile', '--trace', '--memprofile',
+                     '--template-profile'],
             'help': 'generate web content from source',
         },
         {
             'name': 'run',
-            'args': ['--source', '--port', '--browse'],
+            'args': ['--source', '--port', '--browse', '--live'],
             'help': 'run local web server to preview generated website',
         },
+        {
+            'name': 'loadtest',
+            'args': ['--source', '--port', '--concurrency', '--requests'],
+            'help': 'load test running local web server',
+        },
         {
             'name': 'deploy',
             'args': ['--source'],
@@ -120,6 +227,11 @@ CONF = {
             'args': ['--source'],
             'help': 'delete all generated content',
         },
+        {
+            'name': 'daemon',
+            'args': ['--source', '--stop'],
+            'help': 'run build daemon to speed up subsequent commands',
+        },
         {
             'name': 'page',
             'args': ['name', '--source', '--force', '--edit'],
@@ -130,6 +242,11 @@ CONF = {
             'args': ['name', '--source', '--force', '--edit'],
             'help': 'create new post',
         },
+        {
+            'name': 'rollback',
+            'args': ['--source'],
+            'help': 'publish the previous build (requires atomic_publish)',
+        },
         {
             'name': 'theme',
             'args': [],
@@ -170,4 +287,9 @@ def parse(args):
     configure_parser(parser, CONF, ARGS)
     if not args:
         parser.print_help()
-    return vars(parser.parse_args(args))
+    result = vars(parser.parse_args(args))
+    if result.get('shard') and result.get('output'):
+        parser.error('--shard could not be combined with --output')
+    if result.get('shard') and result.get('merge'):
+        parser.error('--shard could not be combined with --merge')
+    return result
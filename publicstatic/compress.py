@@ -0,0 +1,130 @@
+# coding: utf-8
+
+"""Precompressed outputs.
+
+A '.gz' sibling is written for every compressible output above the size
+threshold, so the web server could serve static compressed files instead
+of compressing them for each request (e.g. nginx 'gzip_static on').
+Siblings are flagged in the build manifest, so '.gz' files coming from
+the website assets are never mistaken for them."""
+
+import concurrent.futures
+import gzip
+import os
+import tempfile
+import traceback
+from publicstatic import conf
+from publicstatic import helpers
+from publicstatic import logger
+
+# compressed file name suffix
+SUFFIX = '.gz'
+
+# manifest entry flag marking compressed siblings
+FLAG = 'compressed'
+
+
+def compressed(rel_path, entry):
+    """Checks if the manifest entry describes a compressed sibling
+    written by compress()."""
+    return rel_path.endswith(SUFFIX) and bool(entry.get(FLAG))
+
+
+def compressible(rel_path, entry):
+    """Checks if the output file should have a compressed sibling."""
+    return not rel_path.endswith(SUFFIX) and \
+        helpers.ext(rel_path) in conf.get('gzip_extensions') and \
+        entry['size'] >= conf.get('gzip_min_size')
+
+
+def mark(manifest):
+    """Flags compressed siblings of compressible files in the [manifest]
+    scanned after compress(). Returns the manifest."""
+    for rel_path, entry in manifest.items():
+        if rel_path + SUFFIX in manifest and compressible(rel_path, entry):
+            manifest[rel_path + SUFFIX][FLAG] = True
+    return manifest
+
+
+def compress(build_path, previous, current, baseline=None):
+    """Writes compressed siblings for the files from [current] manifest,
+    skipping files which contents did not change since the [previous]
+    manifest if their compressed siblings exist, or could be hard-linked
+    from the [baseline] build directory. Drops outdated siblings.
+    Returns a number of compressed files."""
+    jobs = []
+    for rel_path, entry in current.items():
+        if compressed(rel_path, entry):
+            if rel_path[:-len(SUFFIX)] not in current:
+                _remove(_file(build_path, rel_path))
+            continue
+        dest = _file(build_path, rel_path + SUFFIX)
+        if not compressible(rel_path, entry):
+            sibling = current.get(rel_path + SUFFIX)
+            if sibling is not None and compressed(rel_path + SUFFIX, sibling):
+                _remove(dest)
+            continue
+        unchanged = rel_path in previous and \
+            previous[rel_path]['hash'] == entry['hash']
+        if unchanged and (os.path.isfile(dest) or
+                          _link(baseline, rel_path + SUFFIX, dest)):
+            continue
+        jobs.append(rel_path)
+
+    failed = 0
+    with concurrent.futures.ThreadPoolExecutor() as executor:
+        futures = {executor.submit(_compress,
+                                   _file(build_path, rel_path)): rel_path
+                   for rel_path in jobs}
+        for future in concurrent.futures.as_completed(futures):
+            try:
+                future.result()
+            except Exception as e:
+                logger.error("error compressing '%s' - %s" %
+                             (futures[future], e))
+                logger.debug(traceback.format_exc())
+                failed += 1
+
+    logger.info("gzip: %d files compressed" % (len(jobs) - failed))
+    return len(jobs) - failed
+
+
+def _compress(file_name):
+    dest = file_name + SUFFIX
+    fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(dest),
+                                    prefix='.', suffix='.tmp')
+    try:
+        with open(file_name, 'rb') as src, \
+                os.fdopen(fd, 'wb') as f, \
+                gzip.GzipFile(filename='', mode='wb', fileobj=f, mtime=0,
+                              compresslevel=conf.get('gzip_level')) as gz:
+            gz.write(src.read())
+        stat = os.stat(file_name)
+        os.chmod(tmp_name, stat.st_mode & 0o777)
+        os.utime(tmp_name, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        os.replace(tmp_name, dest)
+    except Exception:
+        _remove(tmp_name)
+        raise
+
+
+def _link(baseline, rel_path, dest):
+    """Hard-links compressed file from the baseline build directory."""
+    if not baseline:
+        return False
+    try:
+        os.link(_file(baseline, rel_path), dest)
+        return True
+    except OSError:
+        return False
+
+
+def _file(build_path, rel_path):
+    return os.path.join(build_path, *rel_path.split('/'))
+
+
+def _remove(file_name):
+    try:
+        os.remove(file_name)
+    except OSError:
+        pass
@@ -4,8 +4,9 @@
 
 import codecs
 from datetime import datetime
+import json
 import os
-import yaml
+import tempfile
 from publicstatic import const
 from publicstatic import errors
 from publicstatic.version import __version__
@@ -53,11 +54,10 @@ def load(conf_path):
     if not _path:
         raise NotFoundException()
 
-    try:
-        with codecs.open(_path, mode='r', encoding='utf-8') as f:
-            loaded = yaml.load(f.read())
-    except (IOError, OSError, yaml.scanner.ScannerError) as ex:
-        raise ParsingError(error=str(ex)) from ex
+    loaded = _cached(_path)
+    if loaded is None:
+        loaded = _parse(_path)
+        _cache(_path, loaded)
 
     global _params
     _params = defaults()
@@ -159,8 +159,76 @@ def commons():
     }
 
 
+def _parse(file_name):
+    """Reads configuration file and validates its structure."""
+    import yaml
+    try:
+        with codecs.open(file_name, mode='r', encoding='utf-8') as f:
+            loaded = yaml.safe_load(f.read())
+    except (IOError, OSError, yaml.YAMLError) as ex:
+        raise ParsingError(error=str(ex)) from ex
+    if loaded is None:
+        return {}
+    if not isinstance(loaded, dict):
+        raise ParsingError(error='configuration should be a mapping')
+    return loaded
+
+
+def _cache_path(file_name):
+    return os.path.join(os.path.dirname(file_name), const.CONF_CACHE)
+
+
+def _stamp(file_name):
+    """Identifies configuration file version for the cache."""
+    stat = os.stat(file_name)
+    return [__version__, stat.st_size, stat.st_mtime_ns]
+
+
+def _cached(file_name):
+    """Returns parsed configuration from the cache, if the configuration
+    file did not change since it was cached, or None."""
+    try:
+        with open(_cache_path(file_name), encoding='utf-8') as f:
+            cached = json.load(f)
+        if cached['stamp'] == _stamp(file_name) and \
+           isinstance(cached['conf'], dict):
+            return cached['conf']
+    except Exception:  # missing, outdated or broken cache
+        pass
+    return None
+
+
+def _cache(file_name, loaded):
+    """Saves parsed configuration to skip YAML parsing next time. The
+    cache is plain JSON, so reading it could not execute code; values
+    which JSON could not keep as is (e.g. dates) are not cached at all.
+    Errors are ignored, since the cache is optional."""
+    cache_path = _cache_path(file_name)
+    try:
+        text = json.dumps({'stamp': _stamp(file_name), 'conf': loaded})
+        if json.loads(text)['conf'] != loaded:  # e.g. non-string keys
+            return
+    except (TypeError, ValueError):
+        return
+    try:
+        fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(cache_path),
+                                        prefix='.', suffix='.tmp')
+    except OSError:  # e.g. read-only website source directory
+        return
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp_name, cache_path)
+    except Exception:
+        try:
+            os.remove(tmp_name)
+        except OSError:
+            pass
+
+
 def _dumpopt(opt_name):
     """Serializes configuration option with default value."""
+    import yaml
     desc = const.DEFAULTS[opt_name]['desc']
     desc = ("# %s\n" % desc) if desc else ''
     return desc + yaml.dump({
@@ -173,11 +241,21 @@ def _purify(params):
 
     expandables = [
         'build_path',
+        'changed_urls',
+        'highlight_cache',
+        'hotspots_path',
+        'loadtest_path',
+        'memprofile_path',
+        'metrics_path',
+        'metrics_prometheus_path',
+        'profile_path',
         'log_file',
+        'shards_path',
     ]
 
     for param in expandables:
-        params[param] = _expand(params[param])
+        if params[param]:
+            params[param] = _expand(params[param])
 
     urls = [
         'root_url',
@@ -190,8 +268,21 @@ def _purify(params):
 
     integers = [
         'port',
+        'deploy_workers',
+        'gzip_level',
+        'gzip_min_size',
+        'hotspots_top',
+        'keep_builds',
+        'live_cache_size',
+        'loadtest_concurrency',
+        'loadtest_requests',
+        'memprofile_top',
+        'pipeline_queue_size',
+        'profile_top',
         'log_max_size',
         'log_backup_cnt',
+        'writer_queue_size',
+        'writer_threads',
     ]
 
     for param in integers:
@@ -3,6 +3,9 @@
 # Site configuration file name
 CONF_NAME = 'conf.yml'
 
+# parsed configuration cache file name
+CONF_CACHE = '.pub.conf.cache'
+
 # Configuration file header
 CONF_HEADER = 'public-static configuration file'
 
@@ -39,6 +42,12 @@ tags: unsorted
 
 This is a new blog post."""
 
+# build daemon control socket name inside site source directory
+DAEMON_SOCKET = '.pub.sock'
+
+# deployed files manifest name, stored at the deployment target
+DEPLOY_MANIFEST = '.deploy-manifest.json'
+
 # sitemap file name
 SITEMAP = 'sitemap.xml'
 
@@ -69,6 +78,9 @@ POSTS_DIR = 'posts'
 # directory name for data files
 DATA_DIR = 'data'
 
+# markdown directive rendering a data file with a template
+DATA_PREFIX = '--- data:'
+
 # default build output directory path inside website source dir
 BUILD_DIR = 'build'
 
@@ -77,18 +89,23 @@ UNTITLED_POST = 'untitled-post'
 
 # parameters sequence for the configuration file
 EXPORTS = [
+    'artifact_cache',
     'author',
     'author_url',
     'author_twitter',
     'build_path',
+    'changed_urls',
     'default_tags',
     'deploy_cmd',
+    'deploy_target',
     'disqus_id',
     'editor_cmd',
     'enable_search_form',
     'addthis_id',
     'google_analytics_id',
+    'gzip',
     'less_cmd',
+    'markdown_engine',
     'menu',
     'min_css',
     'min_css_cmd',
@@ -112,6 +129,17 @@ DEFAULTS = {
         'value': 'archive.html',
         'desc': 'Blog archive page location',
     },
+    'artifact_cache': {
+        'value': '',
+        'desc': 'Shared build artifact cache location: a directory path or '
+                'an HTTP(S) URL accepting GET and PUT requests (the cache '
+                'is disabled if the value is empty)',
+    },
+    'atomic_publish': {
+        'value': False,
+        'desc': 'Build to a fresh directory and switch build_path symbolic '
+                'link to it when the build is complete',
+    },
     'atom_location': {
         'value': 'atom.xml',
         'desc': 'Atom feed file name',
@@ -132,6 +160,13 @@ DEFAULTS = {
         'value': BUILD_DIR,
         'desc': 'Build path for web content generator output',
     },
+    'changed_urls': {
+        'value': 'changed-urls.txt',
+        'desc': 'File to write absolute URLs of the outputs changed or '
+                'removed by the last build to, one per line, e.g. for CDN '
+                'cache purging (the list is not written if the value is '
+                'empty)',
+    },
     'default_tags': {
         'value': ['misc'],
         'desc': 'A list of default tags to be added to a new post',
@@ -146,7 +181,28 @@ DEFAULTS = {
     },
     'deploy_cmd': {
         'value': '',
-        'desc': 'Shell command for web content deployment',
+        'desc': 'Shell command for web content deployment (used if '
+                'deploy_target is empty)',
+    },
+    'deploy_s3_endpoint': {
+        'value': '',
+        'desc': 'S3-compatible storage endpoint URL (AWS endpoint for '
+                'deploy_s3_region is used if the value is empty)',
+    },
+    'deploy_s3_region': {
+        'value': 'us-east-1',
+        'desc': 'S3 region for request signing',
+    },
+    'deploy_target': {
+        'value': '',
+        'desc': 'Delta deployment target: a directory path or '
+                's3://bucket/prefix (credentials are taken from '
+                'AWS_ACCESS_KEY_ID and AWS_SECRET_ACCESS_KEY environment '
+                'variables)',
+    },
+    'deploy_workers': {
+        'value': 8,
+        'desc': 'Number of parallel file transfers during deployment',
     },
     'editor_cmd': {
         'value': "$EDITOR \"\"{source}\"\"",
@@ -172,6 +228,37 @@ DEFAULTS = {
         'desc': 'Google Analytics tracking ID, e.g. UA-12345678-9 (tracking '
                 'code will be included if the value is not empty)',
     },
+    'gzip': {
+        'value': False,
+        'desc': 'Write precompressed .gz siblings for compressible outputs',
+    },
+    'gzip_extensions': {
+        'value': ['.css', '.html', '.js', '.svg', '.txt', '.xml'],
+        'desc': 'A list of compressible output file extensions',
+    },
+    'gzip_level': {
+        'value': 9,
+        'desc': 'Compression level for precompressed outputs (1-9)',
+    },
+    'gzip_min_size': {
+        'value': 1024,
+        'desc': 'Minimum output file size to be precompressed (in bytes)',
+    },
+    'highlight_cache': {
+        'value': '.highlight-cache',
+        'desc': 'Directory to keep syntax highlighted code blocks in, so '
+                'unchanged code is not highlighted again (the cache is '
+                'disabled if the value is empty)',
+    },
+    'hotspots_path': {
+        'value': 'hotspots.json',
+        'desc': 'Output file for template profiling data '
+                '(pub build --template-profile)',
+    },
+    'hotspots_top': {
+        'value': 20,
+        'desc': 'Number of the slowest template constructs to report',
+    },
     'index_page': {
         'value': 'index.html',
         'desc': 'File name for an index page',
@@ -196,10 +283,37 @@ DEFAULTS = {
         'value': 'English',
         'desc': 'Site Language for humans.txt',
     },
+    'keep_builds': {
+        'value': 3,
+        'desc': 'Number of builds to keep for rollback when atomic_publish '
+                'is enabled',
+    },
     'less_cmd': {
         'value': "lessc --compress {source} > {dest}",
         'desc': 'Shell command for LESS compillation',
     },
+    'live_cache_size': {
+        'value': 256,
+        'desc': 'Maximum number of rendered responses kept in memory by '
+                'the live preview server',
+    },
+    'live_reload': {
+        'value': True,
+        'desc': 'Reload pages opened in browser when their outputs change '
+                'while running the local web server',
+    },
+    'loadtest_concurrency': {
+        'value': 10,
+        'desc': 'Number of concurrent connections for pub loadtest',
+    },
+    'loadtest_path': {
+        'value': 'loadtest.json',
+        'desc': 'Output file for load test results (pub loadtest)',
+    },
+    'loadtest_requests': {
+        'value': 1000,
+        'desc': 'Number of requests for pub loadtest',
+    },
     'log_backup_cnt': {
         'value': 3,
         'desc': 'Amount of log files to keep',
@@ -212,6 +326,30 @@ DEFAULTS = {
         'value': 1024 * 1024,
         'desc': 'Maximum file size for log rotation (in bytes)',
     },
+    'markdown_engine': {
+        'value': 'python-markdown',
+        'desc': 'Markdown parser: python-markdown or markdown-it (faster, '
+                'requires markdown-it-py and mdit-py-plugins packages and '
+                'does not support the grid extension)',
+    },
+    'memprofile_path': {
+        'value': 'memprofile.json',
+        'desc': 'Output file for memory profiling data '
+                '(pub build --memprofile)',
+    },
+    'memprofile_top': {
+        'value': 10,
+        'desc': 'Number of the top allocation sites to report per build stage',
+    },
+    'metrics_path': {
+        'value': 'metrics.json',
+        'desc': 'Build metrics file in JSON format (empty to disable)',
+    },
+    'metrics_prometheus_path': {
+        'value': 'metrics.prom',
+        'desc': 'Build metrics file in Prometheus text format '
+                '(empty to disable)',
+    },
     'menu': {
         'value': [
             {'title': 'About', 'href': '/about.html'},
@@ -247,6 +385,14 @@ DEFAULTS = {
         'value': 'page',
         'desc': 'Template name for pages',
     },
+    'pipeline': {
+        'value': False,
+        'desc': 'Use pipelined build, overlapping disk I/O and processing',
+    },
+    'pipeline_queue_size': {
+        'value': 64,
+        'desc': 'Maximum number of items waiting between pipeline stages',
+    },
     'pluso_enabled': {
         'value': False,
         'desc': 'Enable pluso.ru sharing buttons',
@@ -271,6 +417,14 @@ DEFAULTS = {
         'value': 'post',
         'desc': 'Template name for blog posts',
     },
+    'profile_path': {
+        'value': 'profile.json',
+        'desc': 'Output file for build profiling data (pub build --profile)',
+    },
+    'profile_top': {
+        'value': 20,
+        'desc': 'Number of the slowest items to report when profiling',
+    },
     'rel_root_url': {
         'value': '/',
         'desc': 'Relative root website URL',
@@ -279,6 +433,11 @@ DEFAULTS = {
         'value': 'http://example.com/',
         'desc': 'Root website URL',
     },
+    'shards_path': {
+        'value': 'shards',
+        'desc': 'Output path for sharded builds (each shard is built to a '
+                'separate subdirectory)',
+    },
     'site_twitter': {
         'value': '',
         'desc': 'Website twitter account',
@@ -312,4 +471,12 @@ DEFAULTS = {
         'value': True,
         'desc': 'Enable verbose logging',
     },
+    'writer_queue_size': {
+        'value': 256,
+        'desc': 'Maximum number of output files waiting to be written',
+    },
+    'writer_threads': {
+        'value': 8,
+        'desc': 'Number of background threads writing output files',
+    },
 }
@@ -0,0 +1,215 @@
+# coding: utf-8
+
+"""Build daemon keeping a warm site model behind a Unix domain socket.
+
+Protocol: a client connects to the socket inside the site source
+directory and sends a single JSON object terminated by a newline, e.g.
+
+    {"command": "build", "args": {"output": null}}
+
+The daemon replies with a sequence of newline-terminated JSON objects.
+Log messages produced while processing the request are sent as
+{"log": "<message>"}, and the last object is either {"status": "ok",
+"result": <value>} or {"status": "error", "message": "<text>"}.
+
+Supported commands: build (output, shard, merge, pipelined, profile, trace,
+memprofile, template_profile), page and post (name, force), and stop."""
+
+import importlib
+import json
+import logging
+import os
+import socket
+import socketserver
+import traceback
+from publicstatic import conf
+from publicstatic import const
+from publicstatic import errors
+from publicstatic import logger
+
+# commands which could be forwarded to the daemon
+COMMANDS = ['build', 'page', 'post']
+
+
+class DaemonRunningException(errors.BasicException):
+    """build daemon is already running for this website"""
+    pass
+
+
+class _StreamHandler(logging.Handler):
+    """Forwards log records to the connected client."""
+
+    def __init__(self, wfile):
+        super().__init__()
+        self._wfile = wfile
+
+    def emit(self, record):
+        try:
+            _send(self._wfile, {'log': self.format(record)})
+        except Exception:
+            self.handleError(record)
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line.strip():  # availability probe
+            return
+        handler = _StreamHandler(self.wfile)
+        formatter = logging.Formatter(const.LOG_FORMAT, const.LOG_DATE_FORMAT)
+        handler.setFormatter(formatter)
+        verbose = conf.get('verbose', False)
+        handler.setLevel(logging.DEBUG if verbose else logging.INFO)
+        logger.logger().addHandler(handler)
+        try:
+            request = json.loads(line.decode('utf-8'))
+            result = self.server.site.execute(request['command'],
+                                              request.get('args', {}))
+            response = {'status': 'ok', 'result': result}
+        except Exception as e:
+            logger.debug(traceback.format_exc())
+            response = {'status': 'error', 'message': str(e)}
+        finally:
+            logger.logger().removeHandler(handler)
+        _send(self.wfile, response)
+
+
+class _Server(socketserver.UnixStreamServer):
+    def __init__(self, socket_path, site):
+        self.site = site
+        super().__init__(socket_path, _RequestHandler)
+
+
+class Site:
+    """Warm in-memory website model reused between requests."""
+
+    def __init__(self, path):
+        self._path = path
+        self._cache = None
+        self._conf_mtime = os.path.getmtime(conf.path())
+        self.stopped = False
+
+    def execute(self, command, args):
+        from publicstatic import publicstatic
+        if command == 'build':
+            self._refresh()
+            self._cache = publicstatic.build(self._path,
+                                             args.get('output'),
+                                             args.get('shard'),
+                                             args.get('merge', False),
+                                             self._cache,
+                                             args.get('pipelined', False),
+                                             args.get('profile', False),
+                                             args.get('trace'),
+                                             args.get('memprofile', False),
+                                             args.get('template_profile',
+                                                      False))
+        elif command in ['page', 'post']:
+            create = getattr(publicstatic, command)
+            path = create(self._path, args['name'], args.get('force', False))
+            return {'path': path, 'editor_cmd': conf.get('editor_cmd')}
+        elif command == 'stop':
+            self.stopped = True
+        else:
+            raise ValueError("unknown command: '%s'" % command)
+
+    def _refresh(self):
+        """Drops cached state depending on configuration if the
+        configuration file was changed."""
+        from publicstatic import artifacts
+        from publicstatic import highlight
+        from publicstatic import templates
+        from publicstatic import writer
+        mtime = os.path.getmtime(conf.find_conf(self._path))
+        if mtime != self._conf_mtime:
+            self._cache = None
+            templates.reset()
+            artifacts.reset()
+            highlight.reset()
+            writer.reset()
+            self._conf_mtime = mtime
+
+
+def socket_path(path):
+    """Control socket path for the website, or None if there is no
+    website at the specified path."""
+    conf_path = conf.find_conf(path or '.')
+    if not conf_path:
+        return None
+    return os.path.join(os.path.dirname(conf_path), const.DAEMON_SOCKET)
+
+
+def running(path):
+    """Returns True if the daemon is serving the website."""
+    sock_path = socket_path(path)
+    if not hasattr(socket, 'AF_UNIX') or not sock_path or \
+       not os.path.exists(sock_path):
+        return False
+    try:
+        _connect(sock_path).close()
+        return True
+    except OSError:
+        return False
+
+
+def request(path, command, **args):
+    """Sends a command to the daemon, prints forwarded log messages,
+    and returns the command result."""
+    sock = _connect(socket_path(path))
+    try:
+        message = {'command': command, 'args': args}
+        sock.sendall((json.dumps(message) + '\n').encode('utf-8'))
+        with sock.makefile('rb') as f:
+            for line in f:
+                response = json.loads(line.decode('utf-8'))
+                if 'log' in response:
+                    print(response['log'])
+                elif response.get('status') == 'ok':
+                    return response.get('result')
+                else:
+                    raise Exception(response.get('message'))
+    finally:
+        sock.close()
+    raise Exception('build daemon closed connection unexpectedly')
+
+
+def serve(path=None):
+    """Runs the daemon in the foreground until 'stop' command."""
+    conf.load(path)
+    importlib.import_module('publicstatic.publicstatic')  # warm up imports
+    from publicstatic import templates
+    templates.env()
+
+    sock_path = socket_path(path)
+    if running(path):
+        raise DaemonRunningException(socket=sock_path)
+    if os.path.exists(sock_path):
+        os.remove(sock_path)
+
+    site = Site(path)
+    server = _Server(sock_path, site)
+    logger.info('build daemon is listening on ' + sock_path)
+    try:
+        while not site.stopped:
+            server.handle_request()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(sock_path)
+    logger.info('build daemon stopped')
+
+
+def _connect(sock_path):
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(sock_path)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def _send(wfile, message):
+    wfile.write((json.dumps(message, default=str) + '\n').encode('utf-8'))
+    wfile.flush()
@@ -1,6 +1,9 @@
+import csv
 import markdown
+from publicstatic import const
+from publicstatic import templates
 
-PREFIX = '--- data:'
+PREFIX = const.DATA_PREFIX
 
 
 class DataPreprocessor(markdown.preprocessors.Preprocessor):
@@ -8,24 +11,29 @@ class DataPreprocessor(markdown.preprocessors.Preprocessor):
         new_lines = []
         for line in lines:
             if line.startswith(PREFIX):
-                data_file, template = self._parse_args(line)
-                new_lines.append(templates.render_data(data_file, template))
+                new_lines.append(render(line))
             else:
                 new_lines.append(line)
         return new_lines
 
-    def _parse_args(self, line):
-        try:
-            reader = csv.reader([line[len(PREFIX):]], skipinitialspace=True)
-            for row in reader:
-                data_file, template = row[0], row[1]
-            return data_file, template
-        except:
-            return None, None
-
 
 class DataExtension(markdown.Extension):
     def extendMarkdown(self, md, md_globals):
         md.preprocessors.add('data', DataPreprocessor(md), '_begin')
 
 
+def render(line):
+    """Renders data directive line with the specified template."""
+    data_file, template = parse_args(line)
+    return templates.render_data(data_file, template)
+
+
+def parse_args(line):
+    """Returns (data file, template) from data directive line."""
+    try:
+        reader = csv.reader([line[len(PREFIX):]], skipinitialspace=True)
+        for row in reader:
+            data_file, template = row[0], row[1]
+        return data_file, template
+    except:
+        return None, None
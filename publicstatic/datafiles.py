@@ -0,0 +1,64 @@
+# coding: utf-8
+
+"""Data files for the '--- data:' markdown directive.
+
+YAML and JSON files are parsed once and kept in memory until the file
+modification time or size changes. CSV files are not loaded at all: the
+template gets an iterable reading the file row by row on each pass, so
+large tables never sit in memory as a whole."""
+
+import codecs
+import csv
+import json
+import os
+import threading
+
+_lock = threading.Lock()
+_cache = {}  # file name -> (stamp, data)
+
+
+class Rows():
+    """CSV file rows as dictionaries keyed by the header row values."""
+
+    def __init__(self, file_name):
+        self.file_name = file_name
+
+    def __iter__(self):
+        with open(self.file_name, encoding='utf-8', newline='') as f:
+            for row in csv.DictReader(f):
+                yield row
+
+
+def load(file_name):
+    """Returns data from the file. Files other than JSON (.json) and CSV
+    (.csv) are parsed as YAML."""
+    ext = os.path.splitext(file_name)[1].lower()
+    if ext == '.csv':
+        return Rows(file_name)
+    current = stamp(file_name)
+    with _lock:
+        cached = _cache.get(file_name)
+    if cached is not None and cached[0] == current:
+        return cached[1]
+    with codecs.open(file_name, mode='r', encoding='utf-8') as f:
+        data = json.load(f) if ext == '.json' else _yaml(f)
+    with _lock:
+        _cache[file_name] = (current, data)
+    return data
+
+
+def stamp(file_name):
+    """Returns value changing with the file contents."""
+    stat = os.stat(file_name)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def reset():
+    """Drops cached data."""
+    with _lock:
+        _cache.clear()
+
+
+def _yaml(f):
+    import yaml
+    return yaml.load(f, Loader=getattr(yaml, 'CSafeLoader', yaml.SafeLoader))
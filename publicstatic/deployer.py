@@ -0,0 +1,265 @@
+# coding: utf-8
+
+"""Manifest-based delta deployment.
+
+The build manifest is compared with the manifest of the last successful
+deploy, which is stored at the target itself, so only changed files are
+transferred and removed files are deleted, regardless of which machine
+performs the deploy. Supported targets are local (or mounted) directories
+and S3-compatible object stores."""
+
+import concurrent.futures
+import datetime
+import hashlib
+import hmac
+import mimetypes
+import os
+import shutil
+import tempfile
+import urllib.error
+import urllib.parse
+import urllib.request
+from publicstatic import compress
+from publicstatic import conf
+from publicstatic import const
+from publicstatic import errors
+from publicstatic import helpers
+from publicstatic import logger
+from publicstatic import manifest
+from publicstatic import pathes
+
+# S3 request timeout in seconds
+S3_TIMEOUT = 60
+
+
+class DeployException(errors.BasicException):
+    """deployment failed"""
+    pass
+
+
+class DirTarget:
+    """Local or mounted directory."""
+
+    # precompressed siblings are deployed for the web server to use them
+    siblings = True
+
+    def __init__(self, path):
+        self._path = path
+
+    def __str__(self):
+        return self._path
+
+    def get(self, rel_path):
+        """Returns file contents or None if the file does not exist."""
+        try:
+            with open(self._file(rel_path), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def put(self, rel_path, file_name):
+        dest = self._file(rel_path)
+        helpers.makedirs(os.path.dirname(dest))
+        fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(dest))
+        os.close(fd)
+        try:
+            shutil.copyfile(file_name, tmp_name)
+            os.replace(tmp_name, dest)
+        except Exception:
+            os.remove(tmp_name)
+            raise
+
+    def put_bytes(self, rel_path, value):
+        dest = self._file(rel_path)
+        helpers.makedirs(os.path.dirname(dest))
+        with open(dest, 'wb') as f:
+            f.write(value)
+
+    def delete(self, rel_path):
+        try:
+            os.remove(self._file(rel_path))
+        except FileNotFoundError:
+            pass
+
+    def _file(self, rel_path):
+        return os.path.join(self._path, *rel_path.split('/'))
+
+
+class S3Target:
+    """S3-compatible object store, accessed with path-style requests
+    signed with AWS Signature Version 4."""
+
+    # object stores do not negotiate content encoding, so precompressed
+    # siblings would only be served as mislabelled gzip data
+    siblings = False
+
+    def __init__(self, bucket, prefix='', endpoint=None, region='us-east-1',
+                 access_key=None, secret_key=None):
+        self._bucket = bucket
+        self._prefix = prefix.strip('/')
+        self._endpoint = (endpoint or
+                          "https://s3.%s.amazonaws.com" % region).rstrip('/')
+        self._region = region
+        self._access_key = access_key or ''
+        self._secret_key = secret_key or ''
+
+    def __str__(self):
+        return "s3://%s/%s" % (self._bucket, self._prefix)
+
+    def get(self, rel_path):
+        try:
+            return self._request('GET', rel_path)
+        except urllib.error.HTTPError as e:
+            if e.code == 404:
+                return None
+            raise
+
+    def put(self, rel_path, file_name):
+        with open(file_name, 'rb') as f:
+            self.put_bytes(rel_path, f.read())
+
+    def put_bytes(self, rel_path, value):
+        content_type = mimetypes.guess_type(rel_path)[0]
+        self._request('PUT', rel_path, value,
+                      content_type or 'application/octet-stream')
+
+    def delete(self, rel_path):
+        self._request('DELETE', rel_path)
+
+    def _request(self, method, rel_path, body=b'', content_type=None):
+        key = '/'.join(filter(None, [self._prefix, rel_path]))
+        uri = urllib.parse.quote("/%s/%s" % (self._bucket, key), safe='/~')
+        headers = sign(method,
+                       self._endpoint + uri,
+                       body,
+                       self._region,
+                       self._access_key,
+                       self._secret_key)
+        if content_type:
+            headers['Content-Type'] = content_type
+        request = urllib.request.Request(self._endpoint + uri,
+                                         data=body if method == 'PUT' else None,
+                                         headers=headers,
+                                         method=method)
+        with urllib.request.urlopen(request, timeout=S3_TIMEOUT) as response:
+            return response.read()
+
+
+def sign(method, url, body, region, access_key, secret_key, now=None):
+    """Returns headers authenticating S3 request with AWS Signature
+    Version 4."""
+    now = now or datetime.datetime.utcnow()
+    amz_date = now.strftime('%Y%m%dT%H%M%SZ')
+    date = now.strftime('%Y%m%d')
+    parsed = urllib.parse.urlparse(url)
+    payload_hash = hashlib.sha256(body).hexdigest()
+    headers = {
+        'host': parsed.netloc,
+        'x-amz-content-sha256': payload_hash,
+        'x-amz-date': amz_date,
+    }
+    signed_headers = ';'.join(sorted(headers))
+    canonical_request = '\n'.join([
+        method,
+        parsed.path or '/',
+        _canonical_query(parsed.query),
+        ''.join("%s:%s\n" % (name, headers[name]) for name in sorted(headers)),
+        signed_headers,
+        payload_hash,
+    ])
+    scope = "%s/%s/s3/aws4_request" % (date, region)
+    string_to_sign = '\n'.join([
+        'AWS4-HMAC-SHA256',
+        amz_date,
+        scope,
+        hashlib.sha256(canonical_request.encode('utf-8')).hexdigest(),
+    ])
+    key = ('AWS4' + secret_key).encode('utf-8')
+    for part in [date, region, 's3', 'aws4_request']:
+        key = hmac.new(key, part.encode('utf-8'), hashlib.sha256).digest()
+    signature = hmac.new(key, string_to_sign.encode('utf-8'),
+                         hashlib.sha256).hexdigest()
+    headers['Authorization'] = ("AWS4-HMAC-SHA256 Credential=%s/%s, "
+                                "SignedHeaders=%s, Signature=%s") % (
+        access_key, scope, signed_headers, signature)
+    del headers['host']
+    return headers
+
+
+def _canonical_query(query):
+    """Returns query string with encoded parameters sorted by name, as
+    required for the canonical request."""
+    quote = lambda value: urllib.parse.quote(value, safe='-_.~')
+    pairs = urllib.parse.parse_qsl(query, keep_blank_values=True)
+    return '&'.join("%s=%s" % (quote(name), quote(value))
+                    for name, value in sorted(pairs))
+
+
+def target(spec):
+    """Creates deployment target from the configuration value:
+    's3://bucket/prefix' or a directory path."""
+    if spec.startswith('s3://'):
+        bucket, _, prefix = spec[len('s3://'):].partition('/')
+        return S3Target(bucket,
+                        prefix,
+                        endpoint=conf.get('deploy_s3_endpoint'),
+                        region=conf.get('deploy_s3_region'),
+                        access_key=os.environ.get('AWS_ACCESS_KEY_ID'),
+                        secret_key=os.environ.get('AWS_SECRET_ACCESS_KEY'))
+    if spec.startswith('dir:'):
+        spec = spec[len('dir:'):]
+    return DirTarget(pathes.site(os.path.expanduser(spec)))
+
+
+def deploy(dest, build_path=None, previous=None, workers=None):
+    """Transfers changed files from the build directory to the [dest]
+    target and deletes removed ones. Hashes are reused from the [previous]
+    build manifest for unchanged files. Returns (transferred, deleted)
+    counters."""
+    build_path = build_path or conf.get('build_path')
+    current = manifest.scan(build_path, previous)
+    if not dest.siblings:
+        current = dict((rel_path, entry) for rel_path, entry in current.items()
+                       if not compress.compressed(rel_path, entry))
+    deployed = dest.get(const.DEPLOY_MANIFEST)
+    try:
+        deployed = manifest.loads(deployed.decode('utf-8')) if deployed else {}
+    except ValueError:
+        logger.warn('deployed manifest is broken, deploying everything')
+        deployed = {}
+    changed, removed = manifest.diff(deployed, current)
+    logger.info("deploying to %s: %d changed, %d removed" %
+                (dest, len(changed), len(removed)))
+
+    def put(rel_path):
+        logger.debug('uploading: ' + rel_path)
+        dest.put(rel_path, os.path.join(build_path, *rel_path.split('/')))
+
+    def delete(rel_path):
+        logger.debug('deleting: ' + rel_path)
+        dest.delete(rel_path)
+
+    failed = []
+    workers = workers or conf.get('deploy_workers')
+    with concurrent.futures.ThreadPoolExecutor(workers) as executor:
+        jobs = {executor.submit(put, rel): rel for rel in changed}
+        jobs.update({executor.submit(delete, rel): rel for rel in removed})
+        for job in concurrent.futures.as_completed(jobs):
+            rel_path = jobs[job]
+            try:
+                job.result()
+            except Exception as e:
+                logger.error("error deploying '%s' - %s" % (rel_path, e))
+                failed.append(rel_path)
+
+    # record successful transfers only, so failed ones will be retried
+    for rel_path in failed:
+        if rel_path in deployed:
+            current[rel_path] = deployed[rel_path]
+        else:
+            current.pop(rel_path, None)
+    dest.put_bytes(const.DEPLOY_MANIFEST,
+                   manifest.dumps(current).encode('utf-8'))
+    if failed:
+        raise DeployException(failed=len(failed))
+    return len(changed), len(removed)
@@ -10,17 +10,30 @@ import shutil
 import sys
 import time
 from publicstatic import conf
+from publicstatic import tracing
 from publicstatic.urlify import urlify
 
 RE_H1 = re.compile(r"^\s*#\s*(.*)\s*", re.I | re.M | re.U)
 
+_dirs = set()  # directories known to exist
+
 
 def makedirs(dir_path):
-    """Creates directory if it not exists."""
-    if dir_path and not os.path.isdir(dir_path):
-        os.makedirs(dir_path)
-        return True
-    return False
+    """Creates directory if it not exists. Existing directories are
+    remembered, so repeated calls for the same path do not touch the
+    file system until forget_dirs() call."""
+    if not dir_path or dir_path in _dirs:
+        return False
+    created = not os.path.isdir(dir_path)
+    if created:
+        os.makedirs(dir_path, exist_ok=True)
+    _dirs.add(dir_path)
+    return created
+
+
+def forget_dirs():
+    """Drops directories memoized by makedirs()."""
+    _dirs.clear()
 
 
 def browse(url, delay):
@@ -55,6 +68,7 @@ def rmdir(path):
     """Drops the directory if it exists."""
     if os.path.isdir(path):
         shutil.rmtree(path, ignore_errors=True)
+        forget_dirs()
 
 
 def get_h1(text):
@@ -94,13 +108,20 @@ def walk(path, operation):
     - Operation should take two arguments: the original path and
       additional relative path to each file.
     - Directory names starting with underscore will be ignored."""
+    for root, relpath in iterwalk(path):
+        operation(root, relpath)
+
+
+def iterwalk(path):
+    """Generator version of walk(), yielding (path, relative path) couples
+    for each file in the specified path."""
     visible = lambda name: not name.startswith('_')
     for curdir, dirnames, curfiles in os.walk(path):
         dirnames[:] = filter(visible, dirnames)
         for nextfile in curfiles:
             fullpath = os.path.join(curdir, nextfile)
             relpath = fullpath[len(path):].strip(os.sep)
-            operation(path, relpath)
+            yield path, relpath
 
 
 def tag_url(tag):
@@ -117,7 +138,9 @@ def tag_path(tag):
 
 def execute(command, source, dest=''):
     """Executes a command with {source} and {dest} parameter replacements."""
-    os.system(os.path.expandvars(command.format(source=source, dest=dest)))
+    command = os.path.expandvars(command.format(source=source, dest=dest))
+    with tracing.span('execute', command=command):
+        os.system(command)
 
 
 def mergedicts(*args):
@@ -0,0 +1,161 @@
+# coding: utf-8
+
+"""Syntax highlighting with a disk cache.
+
+Highlighted code blocks are stored in the highlight_cache directory,
+keyed by code text, language and formatter options, so an unchanged code
+block never reaches Pygments again, even if the text around it was
+edited. Python-Markdown converters get the cached highlighting through
+own codehilite and fenced_code extension instances."""
+
+import threading
+import pygments
+from markdown.extensions import codehilite
+from markdown.extensions import fenced_code
+from publicstatic import artifacts
+from publicstatic import conf
+
+_store = None
+_loaded = False
+_lock = threading.Lock()
+_stats = {'hits': 0, 'misses': 0}
+
+
+class CodeHilite(codehilite.CodeHilite):
+    """CodeHilite taking highlighted HTML from the cache when possible."""
+
+    def hilite(self):
+        backend = store()
+        if backend is None:
+            return super().hilite()
+        key = artifacts.key('highlight', _parts(self))
+        value = backend.get(key)
+        _count('hits' if value is not None else 'misses')
+        if value is not None:
+            return value.decode('utf-8')
+        result = super().hilite()
+        backend.put(key, result.encode('utf-8'))
+        return result
+
+
+class HiliteTreeprocessor(codehilite.HiliteTreeprocessor):
+    """Highlights indented code blocks with the cached CodeHilite."""
+
+    def run(self, root):
+        for block in root.iter('pre'):
+            if len(block) == 1 and block[0].tag == 'code':
+                code = CodeHilite(block[0].text,
+                                  linenums=self.config['linenums'],
+                                  guess_lang=self.config['guess_lang'],
+                                  css_class=self.config['css_class'],
+                                  style=self.config['pygments_style'],
+                                  noclasses=self.config['noclasses'],
+                                  tab_length=self.markdown.tab_length,
+                                  use_pygments=self.config['use_pygments'])
+                placeholder = self.markdown.htmlStash.store(code.hilite(),
+                                                            safe=True)
+                block.clear()
+                block.tag = 'p'  # removed when raw HTML is inserted
+                block.text = placeholder
+
+
+class FencedBlockPreprocessor(fenced_code.FencedBlockPreprocessor):
+    """Highlights fenced code blocks with the cached CodeHilite."""
+
+    def run(self, lines):
+        if not self.checked_for_codehilite:
+            for ext in self.markdown.registeredExtensions:
+                if isinstance(ext, codehilite.CodeHiliteExtension):
+                    self.codehilite_conf = ext.config
+                    break
+            self.checked_for_codehilite = True
+        if not self.codehilite_conf:
+            return super().run(lines)
+
+        options = dict((name, value[0]) for name, value
+                       in self.codehilite_conf.items())
+        text = '\n'.join(lines)
+        while True:
+            m = self.FENCED_BLOCK_RE.search(text)
+            if not m:
+                break
+            hl_lines = fenced_code.parse_hl_lines(m.group('hl_lines'))
+            code = CodeHilite(m.group('code'),
+                              linenums=options['linenums'],
+                              guess_lang=options['guess_lang'],
+                              css_class=options['css_class'],
+                              style=options['pygments_style'],
+                              use_pygments=options['use_pygments'],
+                              lang=(m.group('lang') or None),
+                              noclasses=options['noclasses'],
+                              hl_lines=hl_lines).hilite()
+            placeholder = self.markdown.htmlStash.store(code, safe=True)
+            text = '%s\n%s\n%s' % (text[:m.start()], placeholder,
+                                   text[m.end():])
+        return text.split('\n')
+
+
+class CodeHiliteExtension(codehilite.CodeHiliteExtension):
+    def extendMarkdown(self, md, md_globals):
+        hiliter = HiliteTreeprocessor(md)
+        hiliter.config = self.getConfigs()
+        md.treeprocessors.add('hilite', hiliter, '<inline')
+        md.registerExtension(self)
+
+
+class FencedCodeExtension(fenced_code.FencedCodeExtension):
+    def extendMarkdown(self, md, md_globals):
+        md.registerExtension(self)
+        md.preprocessors.add('fenced_code_block', FencedBlockPreprocessor(md),
+                             '>normalize_whitespace')
+
+
+def store():
+    """Returns cache storage backend or None if the cache is disabled."""
+    global _store, _loaded
+    if not _loaded:
+        path = conf.get('highlight_cache')
+        _store = artifacts.DirBackend(path) if path else None
+        _loaded = True
+    return _store
+
+
+def enabled():
+    return store() is not None
+
+
+def reset():
+    """Drops cache configuration and hit/miss counters."""
+    global _store, _loaded
+    _store, _loaded = None, False
+    with _lock:
+        _stats.update({'hits': 0, 'misses': 0})
+
+
+def stats():
+    """Returns (hits, misses) tuple."""
+    with _lock:
+        return _stats['hits'], _stats['misses']
+
+
+def _parts(hiliter):
+    """Code block and the options affecting highlighted HTML. The source
+    is taken before hilite() strips it and parses the language header."""
+    return [
+        pygments.__version__,
+        hiliter.src,
+        hiliter.lang,
+        hiliter.linenums,
+        hiliter.guess_lang,
+        hiliter.css_class,
+        hiliter.style,
+        hiliter.noclasses,
+        hiliter.tab_length,
+        hiliter.hl_lines,
+        hiliter.use_pygments,
+    ]
+
+
+def _count(counter):
+    with _lock:
+        _stats[counter] += 1
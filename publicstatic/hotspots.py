@@ -0,0 +1,161 @@
+# coding: utf-8
+
+"""Template hotspot profiler.
+
+Records cumulative time and call counts for each template, block, macro
+and filter of the instrumented Jinja2 environment. Template and block
+time includes nested blocks, includes, macros and filters, so the
+ranking shows where the render time goes from the template author's
+perspective."""
+
+import functools
+import json
+import threading
+import time
+import jinja2
+from jinja2.runtime import Context
+from jinja2.runtime import Macro
+from publicstatic import logger
+
+# name for templates created from strings (e.g. pages)
+STRING_TEMPLATE = '<string>'
+
+_enabled = False
+_lock = threading.Lock()
+_stats = {}  # (kind, name) -> [seconds, calls]
+
+
+class _Timer:
+    def __init__(self, kind, name):
+        self._key = (kind, name)
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        _add(self._key, time.perf_counter() - self._started)
+        return False
+
+
+class _Template(jinja2.Template):
+    """Template with timed root render function and blocks."""
+
+    @classmethod
+    def _from_namespace(cls, environment, namespace, globals):
+        template = super()._from_namespace(environment, namespace, globals)
+        name = template.name or STRING_TEMPLATE
+        template.root_render_func = _generator(('template', name),
+                                               template.root_render_func)
+        template.blocks = dict(
+            (block, _generator(('block', "%s:%s" % (name, block)), func))
+            for block, func in template.blocks.items())
+        return template
+
+
+class _Context(Context):
+    """Context timing macro calls."""
+
+    def call(*args, **kwargs):
+        obj = args[1]
+        if not isinstance(obj, Macro):
+            return Context.call(*args, **kwargs)
+        with _Timer('macro', _macro_name(obj)):
+            return Context.call(*args, **kwargs)
+
+
+def enable():
+    """Starts collecting data for environments instrumented after this
+    call."""
+    global _enabled
+    reset()
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _stats.clear()
+
+
+def instrument(env):
+    """Instruments Jinja2 [env]. Should be called before loading any
+    templates."""
+    env.template_class = _Template
+    env.context_class = _Context
+    env.filters = dict((name, _filter(name, func))
+                       for name, func in env.filters.items())
+    return env
+
+
+def data():
+    """Returns collected data ranked by cumulative time."""
+    with _lock:
+        stats = dict((key, list(value)) for key, value in _stats.items())
+    result = [{'kind': kind, 'name': name, 'seconds': seconds, 'calls': calls}
+              for (kind, name), (seconds, calls) in stats.items()]
+    return sorted(result, key=lambda record: -record['seconds'])
+
+
+def report(file_name, top):
+    """Logs [top] template constructs by cumulative time, and writes the
+    full data to [file_name] as JSON."""
+    result = data()
+    for record in result[:top]:
+        logger.info("hotspots: %8.3f s %8d calls  %-8s %s" % (
+            record['seconds'], record['calls'], record['kind'],
+            record['name']))
+    with open(file_name, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=1, sort_keys=True)
+    logger.info('template hotspots data: ' + file_name)
+
+
+def _add(key, seconds):
+    with _lock:
+        record = _stats.setdefault(key, [0, 0])
+        record[0] += seconds
+        record[1] += 1
+
+
+def _generator(key, func):
+    """Wraps render function returning a generator, so the time spent
+    generating output is accumulated across iterations."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        elapsed = 0
+        started = time.perf_counter()
+        try:
+            for chunk in func(*args, **kwargs):
+                elapsed += time.perf_counter() - started
+                yield chunk
+                started = time.perf_counter()
+            elapsed += time.perf_counter() - started
+        finally:
+            _add(key, elapsed)
+    return wrapper
+
+
+def _filter(name, func):
+    """Wraps filter function keeping Jinja2 context/environment passing
+    attributes."""
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        with _Timer('filter', name):
+            return func(*args, **kwargs)
+    return wrapper
+
+
+def _macro_name(macro):
+    """Returns macro name prefixed with the defining template name, taken
+    from the compiled template module globals."""
+    func = getattr(macro, '_func', None)
+    template = getattr(func, '__globals__', {}).get('name')
+    return "%s:%s" % (template or STRING_TEMPLATE, macro.name)
@@ -0,0 +1,218 @@
+# coding: utf-8
+
+"""Load generator for the preview server.
+
+Fetches the sitemap from the running server and requests its pages over
+[concurrency] keep-alive connections, reporting latency percentiles,
+throughput and error rates. Sitemap URLs are requested by path, so the
+configured root URL does not need to point to the server."""
+
+import asyncio
+import gzip
+import json
+import time
+from urllib.parse import urlparse
+from xml.etree import ElementTree
+from publicstatic import const
+from publicstatic import errors
+from publicstatic import logger
+
+# seconds to wait for a single response
+TIMEOUT = 30
+
+PERCENTILES = [50, 90, 95, 99]
+
+SITEMAP_NS = '{http://www.sitemaps.org/schemas/sitemap/0.9}'
+
+
+class LoadTestException(errors.BasicException):
+    """load test failed"""
+    pass
+
+
+class Stats():
+    """Request latencies and outcomes."""
+
+    def __init__(self):
+        self.latencies = []
+        self.statuses = {}
+        self.errors = {}
+        self.bytes = 0
+        self.elapsed = 0
+
+    def add(self, latency, status, size):
+        self.latencies.append(latency)
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+        self.bytes += size
+
+    def fail(self, error):
+        name = type(error).__name__
+        self.errors[name] = self.errors.get(name, 0) + 1
+
+    def data(self):
+        latencies = sorted(self.latencies)
+        total = len(latencies) + sum(self.errors.values())
+        failed = sum(self.errors.values()) + \
+            sum(count for status, count in self.statuses.items()
+                if status >= 400)
+        return {
+            'requests': total,
+            'elapsed': self.elapsed,
+            'throughput': total / self.elapsed if self.elapsed else 0,
+            'bytes': self.bytes,
+            'error_rate': failed / total if total else 0,
+            'statuses': dict((str(status), count)
+                             for status, count in self.statuses.items()),
+            'errors': self.errors,
+            'latency': dict([
+                ('p%d' % p, _percentile(latencies, p)) for p in PERCENTILES
+            ] + [
+                ('mean', sum(latencies) / len(latencies) if latencies else 0),
+                ('max', latencies[-1] if latencies else 0),
+            ]),
+        }
+
+
+def run(url, concurrency, requests):
+    """Runs load test against the server at [url] and returns results
+    as a dictionary."""
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(_run(url, concurrency, requests))
+    finally:
+        loop.close()
+
+
+def report(result, file_name=None):
+    """Logs load test results and writes them to [file_name] as JSON."""
+    message = "loadtest: %d requests in %.2f s, %.1f req/s, %.2f%% errors"
+    logger.info(message % (result['requests'], result['elapsed'],
+                           result['throughput'], result['error_rate'] * 100))
+    latency = ', '.join("%s %.1f ms" % (key, value * 1000)
+                        for key, value in result['latency'].items())
+    logger.info("loadtest: latency " + latency)
+    statuses = ', '.join("%s: %d" % item
+                         for item in sorted(result['statuses'].items()))
+    logger.info("loadtest: statuses " + (statuses or '-'))
+    for name, count in sorted(result['errors'].items()):
+        logger.warn("loadtest: %d requests failed with %s" % (count, name))
+    if file_name:
+        with open(file_name, 'w', encoding='utf-8') as f:
+            json.dump(result, f, indent=1, sort_keys=True)
+        logger.info('loadtest data: ' + file_name)
+
+
+def pathes(sitemap):
+    """Returns URL pathes from sitemap XML."""
+    root = ElementTree.fromstring(sitemap)
+    result = []
+    for loc in root.iter(SITEMAP_NS + 'loc'):
+        url = urlparse((loc.text or '').strip())
+        result.append((url.path or '/') + ('?' + url.query if url.query
+                                          else ''))
+    return result
+
+
+async def _run(url, concurrency, requests):
+    url = urlparse(url)
+    host, port = url.hostname, url.port or 80
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        status, headers, body, _ = await _fetch(reader, writer, host,
+                                                '/' + const.SITEMAP)
+    finally:
+        writer.close()
+    if status != 200:
+        raise LoadTestException(url=const.SITEMAP, status=status)
+    if headers.get('content-encoding') == 'gzip':
+        body = gzip.decompress(body)
+    targets = pathes(body)
+    if not targets:
+        raise LoadTestException(url=const.SITEMAP, pages=0)
+    logger.info("loadtest: %d pages, %d requests, concurrency %d" %
+                (len(targets), requests, concurrency))
+
+    stats = Stats()
+    counter = iter(range(requests))
+    started = time.perf_counter()
+    await asyncio.gather(*[_worker(host, port, targets, counter, stats)
+                           for _ in range(concurrency)])
+    stats.elapsed = time.perf_counter() - started
+    return stats.data()
+
+
+async def _worker(host, port, targets, counter, stats):
+    """Requests pages over a keep-alive connection, reconnecting after
+    errors, until the [counter] is exhausted."""
+    reader = writer = None
+    for index in counter:
+        path = targets[index % len(targets)]
+        started = time.perf_counter()
+        try:
+            if writer is None:
+                reader, writer = await asyncio.open_connection(host, port)
+            status, headers, body, closed = await asyncio.wait_for(
+                _fetch(reader, writer, host, path), TIMEOUT)
+            stats.add(time.perf_counter() - started, status, len(body))
+            if closed:
+                reader = writer = None
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError,
+                ValueError) as e:
+            stats.fail(e)
+            if writer is not None:
+                writer.close()
+            reader = writer = None
+    if writer is not None:
+        writer.close()
+
+
+async def _fetch(reader, writer, host, path):
+    """Sends GET request and reads the response. Returns (status,
+    headers, body, closed). The connection is closed if the server does
+    not keep it alive."""
+    writer.write(("GET %s HTTP/1.1\r\nHost: %s\r\n"
+                  "Accept-Encoding: gzip\r\n\r\n" % (path, host)).encode())
+    await writer.drain()
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionResetError('connection closed by server')
+    status = int(status_line.split()[1])
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    closed = headers.get('connection', '').lower() == 'close'
+    if 'content-length' in headers:
+        body = await reader.readexactly(int(headers['content-length']))
+    elif headers.get('transfer-encoding', '').lower() == 'chunked':
+        body = await _chunked(reader)
+    elif status in (204, 304):
+        body = b''
+    else:
+        body = await reader.read()
+        closed = True
+    if closed:
+        writer.close()
+    return status, headers, body, closed
+
+
+async def _chunked(reader):
+    chunks = []
+    while True:
+        size = int((await reader.readline()).split(b';')[0], 16)
+        if size == 0:
+            await reader.readline()
+            return b''.join(chunks)
+        chunks.append(await reader.readexactly(size))
+        await reader.readline()
+
+
+def _percentile(values, percent):
+    """Returns percentile of sorted [values] (nearest rank)."""
+    if not values:
+        return 0
+    rank = max(0, -(-len(values) * percent // 100) - 1)
+    return values[int(rank)]
@@ -0,0 +1,121 @@
+# coding: utf-8
+
+"""Build manifest: size, modification time and content hash for each
+output file, indexed by the path relative to the build directory."""
+
+import hashlib
+import json
+import os
+import tempfile
+import urllib.parse
+from publicstatic import conf
+
+# hash function for the file contents
+HASH = hashlib.sha1
+
+# read buffer size for hashing
+CHUNK_SIZE = 1024 * 1024
+
+
+def path(build_path=None):
+    """Manifest file path for the [build_path] (defaults to the configured
+    one)."""
+    build_path = build_path or conf.get('build_path')
+    return build_path.rstrip(os.sep) + '.manifest.json'
+
+
+def load(file_name=None):
+    """Reads manifest from file. Returns empty manifest if the file does
+    not exist or is broken."""
+    try:
+        with open(file_name or path(), 'r', encoding='utf-8') as f:
+            return loads(f.read())
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def loads(text):
+    manifest = json.loads(text)
+    if not isinstance(manifest, dict):
+        raise ValueError('manifest should be a dictionary')
+    return manifest
+
+
+def save(manifest, file_name=None):
+    """Writes manifest to file."""
+    file_name = file_name or path()
+    fd, tmp_name = tempfile.mkstemp(dir=os.path.dirname(file_name))
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(dumps(manifest))
+    os.replace(tmp_name, file_name)
+
+
+def dumps(manifest):
+    return json.dumps(manifest, indent=1, sort_keys=True)
+
+
+def scan(build_path=None, previous=None, written=None):
+    """Builds manifest for the build directory. Hashes are reused from the
+    [previous] manifest for files with unchanged size and modification
+    time. If a set of [written] file names is specified, only those files
+    are hashed, and the rest keep their previous hashes unless the size
+    has changed."""
+    build_path = build_path or conf.get('build_path')
+    previous = previous or {}
+    if written is not None:
+        written = set(os.path.relpath(file_name, build_path).replace(
+            os.sep, '/') for file_name in written)
+    manifest = {}
+    for root, dirs, files in os.walk(build_path, followlinks=True):
+        for name in files:
+            file_name = os.path.join(root, name)
+            rel_path = os.path.relpath(file_name, build_path)
+            rel_path = rel_path.replace(os.sep, '/')
+            stat = os.stat(file_name)
+            entry = previous.get(rel_path)
+            if written is None:
+                outdated = entry is None or entry['mtime'] != stat.st_mtime
+            else:
+                outdated = entry is None or rel_path in written
+            if outdated or entry['size'] != stat.st_size:
+                entry = {
+                    'size': stat.st_size,
+                    'mtime': stat.st_mtime,
+                    'hash': digest(file_name),
+                }
+            elif entry['mtime'] != stat.st_mtime:
+                entry = dict(entry, mtime=stat.st_mtime)
+            manifest[rel_path] = entry
+    return manifest
+
+
+def urls(rel_pathes):
+    """Converts relative output pathes to absolute percent-encoded URLs.
+    Index pages are also listed with their directory URLs."""
+    root_url = conf.get('root_url')
+    index_page = conf.get('index_page')
+    result = []
+    for rel_path in rel_pathes:
+        rel_path = urllib.parse.quote(rel_path, safe='/')
+        result.append(root_url + rel_path)
+        if rel_path == index_page or rel_path.endswith('/' + index_page):
+            result.append(root_url + rel_path[:-len(index_page)])
+    return result
+
+
+def digest(file_name):
+    """Returns hex digest for the file contents."""
+    result = HASH()
+    with open(file_name, 'rb') as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+            result.update(chunk)
+    return result.hexdigest()
+
+
+def diff(old, new):
+    """Compares two manifests. Returns a tuple of sorted lists of changed
+    (including added) and removed relative pathes."""
+    changed = [rel for rel, entry in new.items()
+               if rel not in old or old[rel]['hash'] != entry['hash']]
+    removed = [rel for rel in old if rel not in new]
+    return sorted(changed), sorted(removed)
@@ -1,25 +1,109 @@
 # coding: utf-8
 
-import csv
-import markdown
-import re
-from publicstatic import templates
-from publicstatic import data
-from publicstatic import urlize
+import threading
+from publicstatic import artifacts
+from publicstatic import conf
+from publicstatic import const
+from publicstatic import errors
+from publicstatic import profiler
 
+# markdown_engine values
+PYTHON_MARKDOWN = 'python-markdown'
+MARKDOWN_IT = 'markdown-it'
+ENGINES = [MARKDOWN_IT, PYTHON_MARKDOWN]
 
 EXTENSIONS = [
-    'codehilite',
     'def_list',
-    'fenced_code',
     'grid',
     'nl2br',
     'smarty',
-    data.DataExtension(),
-    urlize.UrlizeExtension(),
 ]
 
+_extensions = None
+
+# converter instances per thread, reset after each document
+_local = threading.local()
+
+
+class MarkdownEngineException(errors.BasicException):
+    """markdown engine is not available"""
+    pass
+
+
+def extensions():
+    """Returns Python-Markdown extensions list. Python-Markdown and custom
+    extensions are imported on the first use to keep CLI startup fast.
+    Code blocks are highlighted by own codehilite and fenced_code
+    extensions using the highlight cache."""
+    global _extensions
+    if _extensions is None:
+        from publicstatic import data
+        from publicstatic import highlight
+        from publicstatic import urlize
+        _extensions = EXTENSIONS + [
+            highlight.CodeHiliteExtension(),
+            highlight.FencedCodeExtension(),
+            data.DataExtension(),
+            urlize.UrlizeExtension(),
+        ]
+    return _extensions
+
+
+def converter(engine=None):
+    """Returns Markdown converter of the current thread for the [engine]
+    (the configured one by default). Building the converter registers all
+    extensions and compiles their patterns, so it is done once per thread
+    rather than for each document."""
+    engine = engine or conf.get('markdown_engine') or PYTHON_MARKDOWN
+    if not hasattr(_local, 'converters'):
+        _local.converters = {}
+    instance = _local.converters.get(engine)
+    if instance is None:
+        with profiler.stage('markdown setup'):
+            instance = _create(engine)
+        _local.converters[engine] = instance
+    return instance
+
 
 def md(text):
     """Converts markdown formatted text to HTML"""
-    return markdown.markdown(text.strip(), extensions=EXTENSIONS)
+    with profiler.stage('markdown'):
+        return _md(text)
+
+
+def _md(text):
+    text = text.strip()
+    engine = conf.get('markdown_engine') or PYTHON_MARKDOWN
+    instance = converter(engine)
+
+    def convert():
+        try:
+            return instance.convert(text)
+        finally:
+            instance.reset()
+
+    if const.DATA_PREFIX in text:  # data directives depend on external files
+        return convert()
+    parts = [engine, _version(engine), text]
+    return artifacts.cached_text('markdown', parts, convert)
+
+
+def _create(engine):
+    if engine == PYTHON_MARKDOWN:
+        import markdown
+        return markdown.Markdown(extensions=extensions())
+    if engine not in ENGINES:
+        raise MarkdownEngineException(engine=engine)
+    try:
+        from publicstatic import mdit
+    except ImportError as e:
+        raise MarkdownEngineException(engine=engine, error=e)
+    return mdit.Converter()
+
+
+def _version(engine):
+    if engine == PYTHON_MARKDOWN:
+        import markdown
+        return markdown.version
+    from publicstatic import mdit
+    return mdit.version()
@@ -0,0 +1,152 @@
+# coding: utf-8
+
+"""markdown-it-py backend for markdown.md().
+
+Mirrors the Python-Markdown extensions list (see markdown.extensions()):
+fenced code and indented code blocks are highlighted with cached
+CodeHilite (see highlight.py),
+definition lists come from mdit-py-plugins, smart quotes, dashes and
+ellipses are produced by the typographer, line breaks are preserved,
+and '--- data:' directives and urlize autolinks have own rules. The
+grid extension has no counterpart. See tests/test_markdown.py for the
+remaining differences."""
+
+import re
+import markdown_it
+from markdown_it import MarkdownIt
+from markdown_it.token import Token
+from mdit_py_plugins import __version__ as plugins_version
+from mdit_py_plugins.deflist import deflist_plugin
+from publicstatic import const
+from publicstatic import data
+from publicstatic import highlight
+from publicstatic import urlize
+
+URLIZE_RE = re.compile(urlize.URLIZE_RE)
+
+# smarty extension substitutions, longer first
+DASHES = [
+    ('---', '—'),
+    ('--', '–'),
+    ('...', '…'),
+]
+
+
+class Converter:
+    """Python-Markdown compatible converter interface."""
+
+    def __init__(self):
+        self._md = MarkdownIt('commonmark', {
+            'breaks': True,
+            'typographer': True,
+        })
+        self._md.enable('smartquotes')
+        self._md.use(deflist_plugin)
+        self._md.block.ruler.before('fence', 'data', _data,
+                                    {'alt': ['paragraph']})
+        self._md.core.ruler.before('smartquotes', 'smarty', _smarty)
+        self._md.core.ruler.push('urlize', _urlize)
+        self._md.add_render_rule('fence', _fence)
+        self._md.add_render_rule('code_block', _code_block)
+
+    def convert(self, text):
+        return self._md.render(text).strip()
+
+    def reset(self):
+        pass
+
+
+def version():
+    """Returns markdown-it-py and plugins version string."""
+    return "%s/%s" % (markdown_it.__version__, plugins_version)
+
+
+def _highlight(code, lang=None):
+    # CodeHilite takes language from the ':::lang' or shebang header
+    # when [lang] is not specified, as Python-Markdown does
+    return highlight.CodeHilite(code, lang=lang or None).hilite() + '\n'
+
+
+def _fence(renderer, tokens, idx, options, env):
+    token = tokens[idx]
+    lang = token.info.strip().split(' ')[0] if token.info else None
+    return _highlight(token.content, lang)
+
+
+def _code_block(renderer, tokens, idx, options, env):
+    return _highlight(tokens[idx].content)
+
+
+def _data(state, start_line, end_line, silent):
+    """Block rule rendering '--- data:' directive line."""
+    if state.sCount[start_line] - state.blkIndent >= 4:
+        return False
+    pos = state.bMarks[start_line] + state.tShift[start_line]
+    line = state.src[pos:state.eMarks[start_line]]
+    if not line.startswith(const.DATA_PREFIX):
+        return False
+    if silent:
+        return True
+    token = state.push('html_block', '', 0)
+    token.map = [start_line, start_line + 1]
+    token.content = data.render(line) + '\n'
+    state.line = start_line + 1
+    return True
+
+
+def _smarty(state):
+    """Core rule replacing dashes and ellipses in text."""
+    for block in state.tokens:
+        if block.type != 'inline' or not block.children:
+            continue
+        for token in block.children:
+            if token.type == 'text':
+                for text, replacement in DASHES:
+                    token.content = token.content.replace(text, replacement)
+
+
+def _urlize(state):
+    """Core rule turning plain text URLs into links."""
+    for block in state.tokens:
+        if block.type != 'inline' or not block.children:
+            continue
+        children, level = [], 0
+        for token in block.children:
+            if token.type == 'link_open':
+                level += 1
+            elif token.type == 'link_close':
+                level -= 1
+            if token.type != 'text' or level > 0:
+                children.append(token)
+                continue
+            children.extend(_links(token))
+        block.children = children
+
+
+def _links(token):
+    """Splits text token into text and link tokens."""
+    text, pos, result = token.content, 0, []
+    for match in URLIZE_RE.finditer(text):
+        url = match.group(1)
+        if url.startswith('<'):
+            url = url[1:-1]
+        if match.start() > pos:
+            result.append(_text(text[pos:match.start()], token.level))
+        link = Token('link_open', 'a', 1, attrs={'href': urlize.href(url)},
+                     level=token.level, markup='linkify', info='auto')
+        result.extend([
+            link,
+            _text(url, token.level + 1),
+            Token('link_close', 'a', -1, level=token.level,
+                  markup='linkify', info='auto'),
+        ])
+        pos = match.end()
+    if not result:
+        return [token]
+    if pos < len(text):
+        result.append(_text(text[pos:], token.level))
+    return result
+
+
+def _text(content, level):
+    return Token('text', '', 0, content=content, level=level)
@@ -0,0 +1,131 @@
+# coding: utf-8
+
+"""Build memory profiler.
+
+A tracemalloc snapshot is taken at the end of each build stage (cache
+population, every builder, pending writes). For each stage the report
+shows traced and peak memory, the process peak RSS, the top allocation
+sites holding memory and the sites which grew the most during the
+stage."""
+
+import json
+import sys
+import tracemalloc
+from publicstatic import logger
+
+try:
+    import resource
+except ImportError:  # not available on Windows
+    resource = None
+
+# traceback depth for allocation sites
+FRAMES = 1
+
+_IGNORED = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap>'),
+    tracemalloc.Filter(False, '<frozen importlib._bootstrap_external>'),
+    tracemalloc.Filter(False, '<unknown>'),
+]
+
+_enabled = False
+_stages = []
+_previous = None
+_top = 0
+
+
+def enable(top):
+    """Starts tracing memory allocations, reporting [top] sites per
+    stage."""
+    global _enabled, _previous, _top
+    del _stages[:]
+    _previous = None
+    _top = top
+    tracemalloc.start(FRAMES)
+    _enabled = True
+
+
+def disable():
+    global _enabled, _previous
+    _enabled = False
+    _previous = None
+    tracemalloc.stop()
+
+
+def enabled():
+    return _enabled
+
+
+def snapshot(stage):
+    """Records memory usage at the end of the [stage]."""
+    global _previous
+    if not enabled():
+        return
+    current, peak = tracemalloc.get_traced_memory()
+    if hasattr(tracemalloc, 'reset_peak'):  # Python 3.9+
+        tracemalloc.reset_peak()
+    taken = tracemalloc.take_snapshot().filter_traces(_IGNORED)
+    growth = []
+    if _previous is not None:
+        growth = [_site(stat, stat.size_diff, stat.count_diff)
+                  for stat in taken.compare_to(_previous, 'lineno')[:_top]
+                  if stat.size_diff > 0]
+    _stages.append({
+        'stage': stage,
+        'traced': current,
+        'peak': peak,
+        'rss_peak': _rss_peak(),
+        'top': [_site(stat, stat.size, stat.count)
+                for stat in taken.statistics('lineno')[:_top]],
+        'growth': growth,
+    })
+    _previous = taken
+
+
+def data():
+    """Returns collected data as a list of stages."""
+    return list(_stages)
+
+
+def report(file_name):
+    """Logs memory usage for each stage and writes the full data to
+    [file_name] as JSON."""
+    for record in _stages:
+        rss = record['rss_peak']
+        logger.info("memprofile: %-12s traced %s, peak %s, peak RSS %s" % (
+            record['stage'], _size(record['traced']), _size(record['peak']),
+            _size(rss) if rss is not None else 'n/a'))
+        for site in record['growth'] or record['top']:
+            logger.info("memprofile: %12s %10s  %s" %
+                        ('', _size(site['size']), site['site']))
+    with open(file_name, 'w', encoding='utf-8') as f:
+        json.dump(_stages, f, indent=1, sort_keys=True)
+    logger.info('memory profile data: ' + file_name)
+
+
+def _site(stat, size, count):
+    frame = stat.traceback[0]
+    return {
+        'site': "%s:%d" % (frame.filename, frame.lineno),
+        'size': size,
+        'count': count,
+    }
+
+
+def _rss_peak():
+    """Returns the process peak resident set size in bytes."""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+def _size(value):
+    if abs(value) < 1024:
+        return "%d B" % value
+    for unit in ['KiB', 'MiB']:
+        value /= 1024
+        if abs(value) < 1024:
+            return "%.1f %s" % (value, unit)
+    return "%.1f GiB" % (value / 1024)
@@ -0,0 +1,178 @@
+# coding: utf-8
+
+"""Build metrics.
+
+Builder durations and counters (outputs written and hard-linked, bytes
+written, reused sources, artifact cache hits, log messages by level) are
+collected for every build and written to a JSON file and a Prometheus
+text exposition file, which could be picked up by the node exporter
+textfile collector."""
+
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+
+# Prometheus metric name prefix
+PREFIX = 'pub_build_'
+
+# counter name -> description
+COUNTERS = {
+    'outputs_written': 'Output files written',
+    'outputs_linked': 'Unchanged output files hard-linked from the '
+                      'previous build',
+    'outputs_changed': 'Output files with changed contents',
+    'outputs_removed': 'Output files removed since the previous build',
+    'bytes_written': 'Bytes written to output files',
+    'sources_parsed': 'Source files parsed',
+    'sources_reused': 'Unchanged source files reused from the previous '
+                      'build',
+    'artifacts_hits': 'Artifact cache hits',
+    'artifacts_misses': 'Artifact cache misses',
+    'highlight_hits': 'Highlighted code blocks taken from the cache',
+    'highlight_misses': 'Code blocks highlighted with Pygments',
+}
+
+_lock = threading.Lock()
+_counters = {}
+_builders = {}  # builder name -> seconds
+_started = None
+_handler = None
+
+
+class _LogCounter(logging.Handler):
+    """Counts log messages by level."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.counts = {}
+
+    def emit(self, record):
+        level = record.levelname.lower()
+        with _lock:
+            self.counts[level] = self.counts.get(level, 0) + 1
+
+
+class _Builder:
+    def __init__(self, name):
+        self._name = name
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        elapsed = time.perf_counter() - self._started
+        with _lock:
+            _builders[self._name] = _builders.get(self._name, 0) + elapsed
+        return False
+
+
+def start():
+    """Resets metrics and starts counting log messages."""
+    global _started, _handler
+    with _lock:
+        _counters.clear()
+        _builders.clear()
+    _started = time.perf_counter()
+    if _handler is None:
+        _handler = _LogCounter()
+        logging.getLogger().addHandler(_handler)
+    _handler.counts = {}
+
+
+def stop():
+    """Stops counting log messages."""
+    global _handler
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+
+
+def count(name, value=1):
+    """Increments the [name] counter."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def builder(name):
+    """Context manager timing a builder."""
+    return _Builder(name)
+
+
+def data():
+    """Returns collected metrics as a dictionary."""
+    with _lock:
+        counters = dict((name, 0) for name in COUNTERS)
+        counters.update(_counters)
+        log = dict(_handler.counts) if _handler else {}
+        builders = dict(_builders)
+    return {
+        'timestamp': time.time(),
+        'duration': time.perf_counter() - _started if _started else 0,
+        'builders': builders,
+        'counters': counters,
+        'log': {level: log.get(level, 0)
+                for level in ['warning', 'error', 'critical']},
+    }
+
+
+def prometheus(metrics):
+    """Formats metrics in Prometheus text exposition format."""
+    lines = []
+
+    def metric(name, description, values):
+        lines.append("# HELP %s%s %s" % (PREFIX, name, description))
+        lines.append("# TYPE %s%s gauge" % (PREFIX, name))
+        for labels, value in values:
+            labels = ','.join('%s="%s"' % (key, _escape(label))
+                              for key, label in labels)
+            labels = '{%s}' % labels if labels else ''
+            lines.append("%s%s%s %s" % (PREFIX, name, labels, _number(value)))
+
+    metric('timestamp_seconds', 'Build completion time',
+           [((), metrics['timestamp'])])
+    metric('duration_seconds', 'Build duration',
+           [((), metrics['duration'])])
+    metric('builder_duration_seconds', 'Builder duration',
+           [((('builder', name), ), seconds)
+            for name, seconds in sorted(metrics['builders'].items())])
+    for name, value in sorted(metrics['counters'].items()):
+        metric(name, COUNTERS.get(name, name.replace('_', ' ').capitalize()),
+               [((), value)])
+    metric('log_messages', 'Log messages by level',
+           [((('level', level), ), value)
+            for level, value in sorted(metrics['log'].items())])
+    return '\n'.join(lines) + '\n'
+
+
+def save(json_path, prometheus_path):
+    """Writes collected metrics to the files, skipping empty pathes.
+    Returns the metrics."""
+    metrics = data()
+    if json_path:
+        _save(json_path, json.dumps(metrics, indent=1, sort_keys=True))
+    if prometheus_path:
+        _save(prometheus_path, prometheus(metrics))
+    return metrics
+
+
+def _save(file_name, text):
+    """Writes the file atomically, so collectors never read partial
+    data."""
+    dir_path = os.path.dirname(file_name)
+    fd, tmp_name = tempfile.mkstemp(dir=dir_path, prefix='.', suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.chmod(tmp_name, 0o644)
+    os.replace(tmp_name, file_name)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"')
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
@@ -4,7 +4,6 @@
 # https://github.com/cobrateam/django-htmlmin
 
 import re
-import bs4
 from html.parser import HTMLParser
 
 EXCLUDE_TAGS = ('pre', 'script', 'textarea')
@@ -15,6 +14,7 @@ SPACES_RE = re.compile(r"\s+")
 
 
 def minify_html(html, ignore_comments=True):
+    import bs4  # BeautifulSoup and html5lib are slow to import
     soup = bs4.BeautifulSoup(html, 'html5lib')
     html = str(soup)
     exclude_tags = {}
@@ -0,0 +1,168 @@
+# coding: utf-8
+
+"""Pipelined build.
+
+Sources stream through scan -> parse -> convert stages running in
+separate threads and connected by bounded queues: markdown content of
+each page and post is converted as soon as the source is parsed, while
+the next sources are still being read. Assets are processed as soon as
+all of them were scanned, concurrently with pages and posts parsing.
+
+Page templates are rendered after the last source was converted, since
+posts link to adjacent posts and pages get the whole site index, and
+rendered outputs stream through minify -> write stages, so they never
+pile up in memory. Site-wide outputs are rendered last."""
+
+import os
+import queue
+import threading
+import traceback
+from publicstatic import builders
+from publicstatic import cache
+from publicstatic import conf
+from publicstatic import helpers
+from publicstatic import logger
+from publicstatic import metrics
+from publicstatic import profiler
+from publicstatic import source
+from publicstatic import templates
+
+# end of stream marker
+_DONE = object()
+
+# marker following the last scanned asset
+_ASSETS_DONE = object()
+
+
+class _Stage(threading.Thread):
+    """Pipeline stage applying [func] to each item from the [inbox] queue
+    and passing non-None results to the [outbox] queue."""
+
+    def __init__(self, name, func, inbox, outbox=None):
+        super().__init__(name=name, daemon=True)
+        self._func = func
+        self._inbox = inbox
+        self._outbox = outbox
+
+    def run(self):
+        while True:
+            item = self._inbox.get()
+            try:
+                if item is _DONE:
+                    if self._outbox is not None:
+                        self._outbox.put(_DONE)
+                    break
+                result = self._func(item)
+                if result is not None and self._outbox is not None:
+                    self._outbox.put(result)
+            except Exception as e:
+                logger.error("%s stage error: %s" % (self.name, e))
+                logger.debug(traceback.format_exc())
+            finally:
+                self._inbox.task_done()
+
+
+def build(global_builders, previous=None):
+    """Runs the build pipeline followed by [global_builders]. Unchanged
+    sources are reused from the [previous] cache. Returns populated
+    cache."""
+    size = conf.get('pipeline_queue_size')
+    parse_queue = queue.Queue(size)
+    convert_queue = queue.Queue(size)
+    minify_queue = queue.Queue(size)
+    write_queue = queue.Queue(size)
+    reusable = previous._reusable() if previous is not None else {}
+    assets, sources, errors, threads = [], [], [], []
+
+    def scan():
+        assets_done = False
+        try:
+            for src_type, root, rel in cache.scan():
+                if src_type != source.AssetSource and not assets_done:
+                    parse_queue.put(_ASSETS_DONE)
+                    assets_done = True
+                parse_queue.put((src_type, root, rel))
+        except Exception as e:
+            logger.error("scan stage error: %s" % e)
+            logger.debug(traceback.format_exc())
+        finally:
+            if not assets_done:
+                parse_queue.put(_ASSETS_DONE)
+            parse_queue.put(_DONE)
+
+    def parse(item):
+        if item is _ASSETS_DONE:
+            assets_cache = cache.Cache(sources=assets)
+            thread = threading.Thread(target=_run,
+                                      name='assets',
+                                      args=(builders.asset_order(),
+                                            assets_cache))
+            thread.start()
+            threads.append(thread)
+            return
+        src_type, root, rel = item
+        try:
+            loaded = cache.load(src_type, root, rel, reusable)
+        except Exception as e:
+            errors.append((rel, e))
+            return
+        if isinstance(loaded, source.AssetSource):
+            assets.append(loaded)
+            return
+        sources.append(loaded)
+        return loaded, os.path.join(os.path.basename(root), rel)
+
+    def convert(item):
+        loaded, name = item
+        try:
+            with profiler.item(name):
+                loaded.data('content')
+        except Exception as e:  # reported by the builder rendering it
+            logger.debug("%s conversion failed: %s" % (name, e))
+
+    def minify(item):
+        text, dest_path = item
+        return templates.minified(text, dest_path), dest_path
+
+    def write(item):
+        text, dest_path = item
+        helpers.makedirs(os.path.dirname(dest_path))
+        templates.write(text, dest_path)
+
+    stages = [
+        threading.Thread(target=scan, name='scan', daemon=True),
+        _Stage('parse', parse, parse_queue, convert_queue),
+        _Stage('convert', convert, convert_queue),
+        _Stage('minify', minify, minify_queue, write_queue),
+        _Stage('write', write, write_queue),
+    ]
+
+    templates.redirect(lambda text, dest_path:
+                       minify_queue.put((text, dest_path)))
+    try:
+        for stage in stages:
+            stage.start()
+        stages[2].join()  # index stage begins when conversion is complete
+
+        site = cache.Cache(sources=assets + sources, errors=errors)
+        _run(builders.page_order(), site)
+        if global_builders:
+            minify_queue.join()  # root builder copies rendered files
+            write_queue.join()
+            _run(global_builders, site)
+    finally:
+        for thread in threads:
+            thread.join()
+        minify_queue.put(_DONE)
+        for stage in stages:
+            stage.join()
+        templates.redirect(None)
+
+    return site
+
+
+def _run(sequence, site):
+    for builder in sequence:
+        name = builder.__name__
+        with profiler.builder(name), metrics.builder(name):
+            builder(site)
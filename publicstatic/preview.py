@@ -0,0 +1,332 @@
+# coding: utf-8
+
+"""On-demand rendering preview server.
+
+Instead of serving a complete build, incoming URLs are mapped back to
+sources through their destination pathes, and the requested output is
+rendered when it is requested. Markdown content is converted on first
+use, so the server starts without rendering the whole website. Rendered
+responses are kept in a LRU cache, which is invalidated by a polling
+watcher when source files, templates, data files or configuration
+change."""
+
+import asyncio
+import collections
+import hashlib
+import mimetypes
+import os
+import posixpath
+import tempfile
+import threading
+import time
+import traceback
+from publicstatic import builders
+from publicstatic import cache
+from publicstatic import conf
+from publicstatic import const
+from publicstatic import helpers
+from publicstatic import logger
+from publicstatic import pathes
+from publicstatic import server
+from publicstatic import source
+from publicstatic import templates
+
+# seconds between file system polls
+POLL_INTERVAL = 1.0
+
+
+class LiveServer(server.Server):
+    """Renders requested outputs on demand."""
+
+    def __init__(self, path, port):
+        super().__init__(conf.get('build_path'), port)
+        self._path = path
+        self._lock = threading.RLock()
+        self._responses = collections.OrderedDict()  # rel_path -> Response
+        self._site = None
+        self._routes = {}
+        self._snapshot = None
+        self._ready = threading.Event()
+
+    async def respond(self, request):
+        if request.method not in ('GET', 'HEAD'):
+            return server.error(405, {'Allow': 'GET, HEAD'})
+        rel_path = server._rel_path(request.path)
+        if rel_path is None:
+            return server.error(400)
+        if not rel_path or request.path.endswith('/'):
+            rel_path = '/'.join(filter(None, [rel_path,
+                                              conf.get('index_page')]))
+        loop = asyncio.get_event_loop()
+        route = None
+        if not self._ready.is_set():
+            route = await loop.run_in_executor(None, _provisional, rel_path)
+            if route is None:
+                await loop.run_in_executor(None, self._ready.wait)
+        route = route or self._routes.get(rel_path)
+        if route is None:
+            return server.error(404)
+        kind, item = route
+        if kind == 'file':
+            return self.file_response(request, rel_path, item)
+        response = await loop.run_in_executor(None, self.rendered,
+                                              rel_path, route)
+        headers = response.headers
+        injected = conf.get('live_reload') and \
+            headers['Content-Type'].startswith('text/html')
+        if injected:
+            headers = dict(headers)
+            headers['ETag'] = server.injected_etag(headers['ETag'])
+        if server._not_modified(request, headers['ETag'], None):
+            return server.Response(304, headers)
+        if injected:
+            return server.Response(200, headers, server.inject(response.body))
+        return response
+
+    def rendered(self, rel_path, route):
+        """Returns cached response for the output, rendering it if
+        necessary. Responses for provisional routes are not cached."""
+        with self._lock:
+            response = self._responses.get(rel_path)
+            if response is not None:
+                self._responses.move_to_end(rel_path)
+                return response
+            site = self._site
+        started = time.time()
+        body = _render(site, *route)
+        logger.debug("rendered %s in %.3f s" %
+                     (rel_path, time.time() - started))
+        content_type = mimetypes.guess_type(rel_path)[0] or 'text/html'
+        if content_type.startswith('text/') or content_type.endswith('xml'):
+            content_type += '; charset=utf-8'
+        headers = {
+            'Content-Type': content_type,
+            'Cache-Control': 'no-cache',
+            'ETag': '"%s"' % hashlib.sha1(body).hexdigest(),
+        }
+        response = server.Response(200, headers, body)
+        with self._lock:
+            if route is self._routes.get(rel_path):
+                self._responses[rel_path] = response
+                while len(self._responses) > conf.get('live_cache_size'):
+                    self._responses.popitem(last=False)
+        return response
+
+    def _changed(self, files, etags):
+        """Returns output pathes affected by the changed source [files]:
+        assets produced from them, and opened pages which were rendered
+        differently than before (compared to the previous [etags])."""
+        result = set()
+        for rel_path, (kind, item) in self._routes.items():
+            if kind in ('file', 'text', 'less'):
+                path = item if kind == 'file' else item.path()
+                if path in files:
+                    result.add(rel_path)
+        for rel_path in self.subscribed():
+            route = self._routes.get(rel_path)
+            if route is None:  # removed page
+                result.add(rel_path)
+                continue
+            if route[0] == 'file':
+                continue
+            try:
+                response = self.rendered(rel_path, route)
+            except Exception as e:
+                logger.error("error rendering '%s' - %s" % (rel_path, e))
+                response = None
+            if response is None or \
+               etags.get(rel_path) != response.headers['ETag']:
+                result.add(rel_path)
+        return result
+
+    def _load(self, reuse=True):
+        """Scans sources (reusing unchanged ones, unless [reuse] is False)
+        and maps destination pathes to the routes, in the same order as
+        the builders write outputs, so later outputs take precedence. The
+        new site replaces the current one when it is complete."""
+        started = time.time()
+        with self._lock:
+            previous = self._site if reuse else None
+        site = cache.Cache(previous)
+        for file_name, error in site.processing_errors():
+            logger.error("error processing source file '%s' - %s" %
+                         (file_name, error))
+        routes = {}
+        for item in site.assets():
+            routes[_url_path(item.rel_dest())] = _asset_route(item)
+        for item in site.pages():
+            routes[_url_path(item.rel_dest())] = ('page', item)
+        for item in site.posts():
+            routes[_url_path(item.rel_dest())] = ('post', item)
+        for tag in site.tags():
+            rel_path = builders._rel(helpers.tag_path(tag['name']))
+            routes[_url_path(rel_path)] = ('tag', tag['name'])
+        if conf.get('post_at_root_url') and site.posts():
+            routes[conf.get('index_page')] = ('post', site.posts()[0])
+        routes[_url_path(conf.get('archive_location'))] = ('archive', None)
+        routes[_url_path(conf.get('atom_location'))] = ('atom', None)
+        routes[const.SITEMAP] = ('sitemap', None)
+        with self._lock:
+            self._site = site
+            self._routes = routes
+            self._responses.clear()
+        logger.info("%d routes indexed in %.2f s" %
+                    (len(routes), time.time() - started))
+
+    def watch(self):
+        """Indexes the site, then polls the file system, reloads the site
+        on changes and notifies live reload clients."""
+        try:
+            self._snapshot = _snapshot()
+            self._load()
+        finally:
+            self._ready.set()
+        while self._loop is not None:
+            time.sleep(POLL_INTERVAL)
+            try:
+                self.poll()
+            except Exception as e:
+                logger.error("reloading failed: %s" % e)
+                logger.debug(traceback.format_exc())
+
+    def poll(self):
+        """Reloads the site if files changed since the previous poll.
+        Returns True if there were changes."""
+        snapshot = _snapshot()
+        if snapshot == self._snapshot:
+            return False
+        changed = set(snapshot.items()) ^ set(self._snapshot.items())
+        self._snapshot = snapshot
+        logger.info("%d files changed, reloading" %
+                    len(set(path for path, mtime in changed)))
+        reload_conf = conf.path() in dict(changed)
+        if reload_conf:
+            conf.load(self._path)
+        with self._lock:
+            etags = {rel_path: response.headers['ETag'] for
+                     rel_path, response in self._responses.items()}
+        templates.reset()
+        self._load(reuse=not reload_conf)
+        if conf.get('live_reload'):
+            self.notify(self._changed(dict(changed), etags))
+        return True
+
+
+def serve(path, port):
+    """Runs on-demand rendering preview server."""
+    print("running live preview server on port %d..." % port)
+    print('use Ctrl-Break to stop webserver')
+    LiveServer(path, port).serve()
+
+
+def _render(site, kind, item):
+    """Renders output to bytes using the same templates as the builders."""
+    if kind == 'page':
+        data = builders._complement(item.data(), index=site.index())
+        text = templates.rendered_page(data)
+    elif kind == 'post':
+        text = templates.rendered_page(builders._complement(item.data()))
+    elif kind == 'tag':
+        data = builders._complement({'title': item},
+                                    index=site.index(tag=item))
+        text = templates.rendered(data, 'tag.html')
+    elif kind == 'archive':
+        page_data = {'title': 'Archive', 'tags': site.tags()}
+        data = builders._complement(page_data, index=site.index())
+        text = templates.rendered(data, 'archive.html')
+    elif kind == 'atom':
+        data = builders._complement(index=site.index())
+        text = templates.rendered(data, 'atom.xml')
+    elif kind == 'sitemap':
+        data = builders._complement(index=site.full_index())
+        text = templates.rendered(data, 'sitemap.xml')
+    elif kind == 'text':
+        text = templates.rendered_file(item.path(), builders._complement({}))
+    elif kind == 'less':
+        return _compile_less(item)
+    else:
+        raise ValueError("unknown route: '%s'" % kind)
+    return text.encode('utf-8')
+
+
+def _provisional(rel_path):
+    """Resolves the route for assets and posts before the site is indexed,
+    parsing only sources which could produce the output. Posts are
+    rendered without links to adjacent posts. Returns None if the output
+    requires the site index."""
+    name = os.path.splitext(posixpath.basename(rel_path))[0]
+    latest = None
+    for src_type, root, rel in cache.scan():
+        if src_type == source.AssetSource:
+            if os.path.splitext(_url_path(rel))[0] != \
+               os.path.splitext(rel_path)[0]:
+                continue
+            item = src_type(os.path.join(root, rel), root)
+            if _url_path(item.rel_dest()) == rel_path:
+                return _asset_route(item)
+        elif src_type == source.PostSource:
+            base = os.path.basename(rel)
+            if latest is None or base > os.path.basename(latest[1]):
+                latest = (root, rel)
+            if _post_name(rel) != name:
+                continue
+            item = src_type(os.path.join(root, rel), root)
+            if _url_path(item.rel_dest()) == rel_path:
+                return ('post', item)
+    if rel_path == conf.get('index_page') and latest and \
+       conf.get('post_at_root_url'):
+        # post file names start with the creation date
+        root, rel = latest
+        return ('post', source.PostSource(os.path.join(root, rel), root))
+    return None
+
+
+def _asset_route(item):
+    if item.basename() in ('robots.txt', 'humans.txt'):
+        return ('text', item)
+    elif item.ext() == '.less':
+        return ('less', item)
+    return ('file', item.path())
+
+
+def _post_name(rel):
+    name = os.path.basename(rel).lstrip('0123456789-_')
+    return os.path.splitext(name)[0]
+
+
+def _snapshot():
+    """Returns {file path: modification time} for all files affecting the
+    website."""
+    dirs = [
+        pathes.theme_assets(),
+        pathes.assets(),
+        pathes.pages(),
+        pathes.posts(),
+        pathes.templates(),
+        pathes.theme_templates(),
+        pathes.data(),
+    ]
+    result = {conf.path(): os.path.getmtime(conf.path())}
+    for dir_path in dirs:
+        for root, rel in helpers.iterwalk(dir_path):
+            file_name = os.path.join(root, rel)
+            try:
+                result[file_name] = os.path.getmtime(file_name)
+            except OSError:
+                pass
+    return result
+
+
+def _compile_less(item):
+    fd, tmp_name = tempfile.mkstemp(suffix='.css')
+    os.close(fd)
+    try:
+        helpers.execute(conf.get('less_cmd'), item.path(), tmp_name)
+        with open(tmp_name, 'rb') as f:
+            return f.read()
+    finally:
+        os.remove(tmp_name)
+
+
+def _url_path(rel_path):
+    return rel_path.replace(os.sep, '/').strip('/')
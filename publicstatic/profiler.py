@@ -0,0 +1,218 @@
+# coding: utf-8
+
+"""Build profiler.
+
+Builders and processing stages (parse, markdown, render, minify, write)
+are timed for each processed item, identified by a source or output
+path. Stage times are exclusive: the time of nested stages (e.g.
+markdown conversion triggered while rendering) is not counted twice.
+Builders and stages are also recorded as spans when tracing is enabled.
+When both profiling and tracing are disabled, instrumentation returns a
+shared no-op context manager, so the overhead is a function call per
+stage."""
+
+import json
+import os
+import threading
+import time
+from publicstatic import conf
+from publicstatic import logger
+from publicstatic import tracing
+
+# builder name for the work done outside of builders (e.g. sources parsing)
+NO_BUILDER = '-'
+
+_enabled = False
+_lock = threading.Lock()
+_local = threading.local()
+_builders = {}  # builder name -> seconds
+_stages = {}  # (builder, item, stage) -> [seconds, calls]
+_started = None
+
+
+class _Null:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL = _Null()
+
+
+class _Builder:
+    def __init__(self, name):
+        self._name = name
+
+    def __enter__(self):
+        self._previous = getattr(_local, 'builder', None)
+        _local.builder = self._name
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        elapsed = time.perf_counter() - self._started
+        _local.builder = self._previous
+        if tracing.enabled():
+            tracing.complete(self._name, self._started, elapsed)
+        if _enabled:
+            with _lock:
+                _builders[self._name] = _builders.get(self._name, 0) + elapsed
+        return False
+
+
+class _Context:
+    def __init__(self, builder=None, item=None):
+        self._builder = builder
+        self._item = item
+
+    def __enter__(self):
+        self._previous = current()
+        _local.builder, _local.item = self._builder, self._item
+        return self
+
+    def __exit__(self, *args):
+        _local.builder, _local.item = self._previous
+        return False
+
+
+class _Stage:
+    def __init__(self, name):
+        self._name = name
+
+    def __enter__(self):
+        stack = getattr(_local, 'stack', None)
+        if stack is None:
+            stack = _local.stack = []
+        self._nested = 0  # time spent in nested stages
+        stack.append(self)
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        elapsed = time.perf_counter() - self._started
+        stack = _local.stack
+        stack.pop()
+        if stack:
+            stack[-1]._nested += elapsed
+        builder, item = current()
+        if tracing.enabled():
+            tracing.complete(self._name, self._started, elapsed,
+                             {'builder': builder, 'item': item})
+        if _enabled:
+            key = (builder or NO_BUILDER, item or '', self._name)
+            with _lock:
+                record = _stages.setdefault(key, [0, 0])
+                record[0] += elapsed - self._nested
+                record[1] += 1
+        return False
+
+
+def enable():
+    """Starts collecting profiling data."""
+    global _enabled, _started
+    reset()
+    _enabled = True
+    _started = time.perf_counter()
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _builders.clear()
+        _stages.clear()
+
+
+def active():
+    """Returns True if either profiling or tracing is enabled."""
+    return _enabled or tracing.enabled()
+
+
+def builder(name):
+    """Context manager timing a builder."""
+    return _Builder(name) if active() else _NULL
+
+
+def item(name, builder=None):
+    """Context manager attributing nested stages to the [name] item (and
+    [builder], if specified)."""
+    if not active():
+        return _NULL
+    return _Context(builder or getattr(_local, 'builder', None), name)
+
+
+def output(dest_path, builder=None):
+    """Same as item() for an output file, named by the path relative to
+    the build directory."""
+    if not active():
+        return _NULL
+    name = os.path.relpath(dest_path, conf.get('build_path'))
+    return _Context(builder or getattr(_local, 'builder', None), name)
+
+
+def stage(name):
+    """Context manager timing a processing stage of the current item."""
+    return _Stage(name) if active() else _NULL
+
+
+def current():
+    """Returns (builder, item) for the current thread, which could be
+    passed to restore() in a worker thread."""
+    return getattr(_local, 'builder', None), getattr(_local, 'item', None)
+
+
+def restore(context):
+    """Context manager restoring (builder, item) returned by current()."""
+    return _Context(*context) if active() else _NULL
+
+
+def data():
+    """Returns collected data as a dictionary."""
+    items = {}
+    with _lock:
+        builders = dict(_builders)
+        stages = dict((key, list(value)) for key, value in _stages.items())
+    for (builder, item, stage), (seconds, calls) in stages.items():
+        record = items.setdefault((builder, item), {
+            'builder': builder,
+            'item': item,
+            'total': 0,
+            'stages': {},
+        })
+        record['stages'][stage] = {'seconds': seconds, 'calls': calls}
+        record['total'] += seconds
+    return {
+        'total': time.perf_counter() - _started if _started else 0,
+        'builders': builders,
+        'items': sorted(items.values(), key=lambda item: -item['total']),
+    }
+
+
+def report(file_name, top):
+    """Logs the slowest builders and [top] items, and writes the full data
+    to [file_name] as JSON."""
+    result = data()
+    logger.info("profile: build took %.3f s" % result['total'])
+    builders = sorted(result['builders'].items(), key=lambda item: -item[1])
+    for name, seconds in builders:
+        logger.info("profile: %8.3f s  builder %s" % (seconds, name))
+    for record in result['items'][:top]:
+        stages = sorted(record['stages'].items())
+        stages = ', '.join("%s %.3f" % (name, value['seconds'])
+                           for name, value in stages)
+        logger.info("profile: %8.3f s  %s: %s (%s)" % (record['total'],
+                                                      record['builder'],
+                                                      record['item'],
+                                                      stages))
+    with open(file_name, 'w', encoding='utf-8') as f:
+        json.dump(result, f, indent=1, sort_keys=True)
+    logger.info('profile data: ' + file_name)
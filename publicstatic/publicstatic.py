@@ -4,22 +4,32 @@
 
 import glob
 import heapq
-import http.server
 import os
 import re
 import shutil
-import socketserver
 import subprocess
 import threading
 import traceback
 import webbrowser
+from publicstatic import artifacts
 from publicstatic import conf
 from publicstatic import const
 from publicstatic import builders
+from publicstatic import compress
 from publicstatic import logger
+from publicstatic import manifest
+from publicstatic import memory
+from publicstatic import metrics
 from publicstatic import helpers
 from publicstatic import pathes
+from publicstatic import pipeline
+from publicstatic import profiler
+from publicstatic import publish
+from publicstatic import shards
 from publicstatic import source
+from publicstatic import templates
+from publicstatic import tracing
+from publicstatic import writer
 from publicstatic.cache import Cache
 
 
@@ -40,48 +50,223 @@ def init(path=None, force=False):
         print(str(ex))
 
 
-def build(path=None, output=None):
-    """Generate web content from source."""
-    conf.load(path)
-    cache = Cache()
-    if cache.processing_errors():
-        for file_name, error in cache.processing_errors():
-            message = "error processing source file '%s' - %s"
-            logger.error(message % (file_name, error))
+def build(path=None, output=None, shard=None, merge=False, previous=None,
+          pipelined=False, profile=False, trace=None, memprofile=False,
+          template_profile=False):
+    """Generate web content from source. Returns the populated cache,
+    which could be passed as [previous] to the next build to reuse
+    unchanged sources. Profiling and tracing are stopped even if the
+    build fails, but reports are written for successful builds only."""
+    if template_profile:
+        from publicstatic import hotspots
+    if trace:
+        tracing.enable()
+    try:
+        with tracing.span('config load'):
+            conf.load(path)
+        metrics.start()
+        if profile:
+            profiler.enable()
+        if memprofile:
+            memory.enable(conf.get('memprofile_top'))
+        if template_profile:
+            hotspots.enable()
+            templates.reset()
+        cache = _build(output, shard, merge, previous, pipelined)
+    finally:
+        metrics.stop()
+        if profile:
+            profiler.disable()
+        if template_profile:
+            hotspots.disable()
+            templates.reset()
+        if memprofile:
+            memory.disable()
+        if trace:
+            tracing.disable()
+
+    if profile:
+        profiler.report(conf.get('profile_path'), conf.get('profile_top'))
+    if template_profile:
+        hotspots.report(conf.get('hotspots_path'),
+                        conf.get('hotspots_top'))
+    if memprofile:
+        memory.report(conf.get('memprofile_path'))
+    if trace:
+        tracing.save(trace)
+        logger.info('trace: ' + trace)
+    return cache
+
+
+def _build(output, shard, merge, previous, pipelined):
+    """Runs builders for the loaded configuration."""
+    from publicstatic import highlight
+    helpers.forget_dirs()
+    # cache hit/miss counters are reported per build
+    artifacts.reset()
+    highlight.reset()
+    writer.written()  # outputs are tracked per build
+    if shard:
+        conf.set('shard', shards.parse(shard))
     if output:
         conf.set('build_path', output)
-    logger.info('build directory: ' + conf.get('build_path'))
-    for builder in builders.order():
-        builder(cache)
+    if pipelined:
+        conf.set('pipeline', True)
+
+    staging = None
+    baseline = None
+    published = conf.get('build_path')
+    try:
+        if conf.get('atomic_publish') and not shard:
+            staging = publish.stage()
+            baseline = publish.current()
+            writer.baseline(baseline, staging)
+            conf.set('build_path', staging)
+
+        sequence = builders.order()
+        if shard:
+            shards.prune(conf.get('shard')[1])
+            conf.set('build_path', shards.path(*conf.get('shard')))
+            logger.info("building shard %d/%d" % conf.get('shard'))
+            sequence = builders.shard_order()
+        elif merge:
+            shards.merge()
+            sequence = builders.global_order()
+        logger.info('build directory: ' + conf.get('build_path'))
+
+        if conf.get('pipeline') and not merge:
+            global_builders = [] if shard else builders.global_order()
+            cache = pipeline.build(global_builders, previous)
+            memory.snapshot('pipeline')
+            _report(cache)
+        else:
+            with profiler.builder('cache'), metrics.builder('cache'):
+                cache = Cache(previous)
+            memory.snapshot('cache')
+            _report(cache)
+            for builder in sequence:
+                name = builder.__name__
+                with profiler.builder(name), metrics.builder(name):
+                    builder(cache)
+                memory.snapshot(builder.__name__)
+        failed = writer.wait()
+        memory.snapshot('write')
+        if failed:
+            logger.error("%d output files were not written" % failed)
+            if staging:  # never publish a build with missing files
+                raise publish.IncompleteBuildException(failed=failed)
+    except BaseException:
+        if staging:
+            writer.wait()
+            publish.discard(staging)
+            conf.set('build_path', published)
+        raise
+    finally:
+        writer.baseline()
+
+    if not shard:
+        _track_changes(published, baseline)
+    if staging:
+        conf.set('build_path', published)
+        publish.swap(staging)
+    if artifacts.enabled():
+        message = "artifact cache (%s): %d hits, %d misses"
+        logger.info(message % ((artifacts.store(), ) + artifacts.stats()))
+        hits, misses = artifacts.stats()
+        metrics.count('artifacts_hits', hits)
+        metrics.count('artifacts_misses', misses)
+    if highlight.enabled():
+        message = "highlight cache (%s): %d hits, %d misses"
+        logger.info(message % ((highlight.store(), ) + highlight.stats()))
+        hits, misses = highlight.stats()
+        metrics.count('highlight_hits', hits)
+        metrics.count('highlight_misses', misses)
+    if not shard:
+        metrics.save(conf.get('metrics_path'),
+                     conf.get('metrics_prometheus_path'))
+    return cache
+
+
+def _report(cache):
+    """Log source processing errors."""
+    for file_name, error in cache.processing_errors():
+        message = "error processing source file '%s' - %s"
+        logger.error(message % (file_name, error))
 
 
-def _serve(path, port):
-    """Running web server in a background thread."""
-    print("running HTTP server on port %d..." % port)
-    print('use Ctrl-Break to stop webserver')
-    os.chdir(path)
-    handler = http.server.SimpleHTTPRequestHandler
-    server = socketserver.TCPServer(('', port), handler)
-    server.serve_forever()
+def _track_changes(published, baseline=None):
+    """Compresses changed outputs if enabled, updates the manifest of the
+    [published] build path and writes absolute URLs of changed and removed
+    outputs to the 'changed_urls' file. Compressed files are hard-linked
+    from the [baseline] build directory when possible."""
+    file_name = manifest.path(published)
+    previous = manifest.load(file_name)
+    build_path = conf.get('build_path')
+    current = manifest.scan(build_path, previous, writer.written())
+    if conf.get('gzip'):
+        compress.compress(build_path, previous, current, baseline)
+        current = compress.mark(manifest.scan(build_path, current))
+    manifest.save(current, file_name)
+    changed, removed = manifest.diff(previous, current)
+    changed = [rel for rel in changed
+               if not compress.compressed(rel, current[rel])]
+    removed = [rel for rel in removed
+               if not compress.compressed(rel, previous[rel])]
+    logger.info("%d output files changed, %d removed" %
+                (len(changed), len(removed)))
+    metrics.count('outputs_changed', len(changed))
+    metrics.count('outputs_removed', len(removed))
+    if conf.get('changed_urls'):
+        urls = manifest.urls(sorted(changed + removed))
+        with open(conf.get('changed_urls'), 'w', encoding='utf-8') as f:
+            f.write(''.join(url + '\n' for url in urls))
 
 
-def run(path=None, port=None, browse=False):
-    """Preview generated website."""
+def run(path=None, port=None, browse=False, live=False):
+    """Preview generated website, or render pages on demand if [live] is
+    True."""
+    from publicstatic import preview
+    from publicstatic import server
     conf.load(path)
-    helpers.check_build(conf.get('build_path'))
     port = port or conf.get('port')
-    args = [conf.get('build_path'), port]
-    threading.Thread(target=_serve, args=args).start()
+    if live:
+        target, args = preview.serve, [path, port]
+    else:
+        helpers.check_build(conf.get('build_path'))
+        target, args = server.serve, [conf.get('build_path'), port]
+    threading.Thread(target=target, args=args).start()
     if browse:
         url = "http://localhost:%d/" % port
         webbrowser.open_new(url)
 
 
+def loadtest(path=None, port=None, concurrency=None, requests=None):
+    """Crawl the sitemap of the running local web server concurrently and
+    report latencies, throughput and error rates."""
+    from publicstatic import loadtest as load
+    conf.load(path)
+    url = "http://localhost:%d/" % (port or conf.get('port'))
+    concurrency = concurrency or conf.get('loadtest_concurrency')
+    requests = requests or conf.get('loadtest_requests')
+    try:
+        result = load.run(url, concurrency, requests)
+    except OSError as e:
+        raise load.LoadTestException(url=url, error=e)
+    load.report(result, conf.get('loadtest_path'))
+    return result
+
+
 def deploy(path=None):
     """Deploy generated website to the remote web server."""
+    from publicstatic import deployer
     conf.load(path)
     helpers.check_build(conf.get('build_path'))
     logger.info('deploying website...')
+    if conf.get('deploy_target'):
+        target = deployer.target(conf.get('deploy_target'))
+        deployer.deploy(target, previous=manifest.load())
+        logger.info('done')
+        return
     if not conf.get('deploy_cmd'):
         raise Exception('deploy command is not defined')
     cmd = conf.get('deploy_cmd').format(build_path=conf.get('build_path'))
@@ -98,6 +283,7 @@ def clean(path=None):
     """Delete all generated content."""
     conf.load(path)
     logger.info('cleaning output...')
+    publish.clean()
     helpers.rmdir(conf.get('build_path'))
     logger.info('done')
 
@@ -113,6 +299,7 @@ def page(path=None, name=None, force=False, edit=False):
     logger.info('page created: ' + path)
     if edit:
         helpers.execute(conf.get('editor_cmd'), path)
+    return path
 
 
 def post(path=None, name=None, force=False, edit=False):
@@ -122,6 +309,25 @@ def post(path=None, name=None, force=False, edit=False):
     logger.info('post created: ' + path)
     if edit:
         helpers.execute(conf.get('editor_cmd'), path)
+    return path
+
+
+def daemon(path=None, stop=False):
+    """Run build daemon, or stop the running one."""
+    from publicstatic import daemon
+    if stop:
+        if daemon.running(path):
+            daemon.request(path, 'stop')
+        else:
+            logger.warn('build daemon is not running')
+    else:
+        daemon.serve(path)
+
+
+def rollback(path=None):
+    """Publish the build preceding the current one."""
+    conf.load(path)
+    publish.rollback()
 
 
 def theme_update(path=None, safe=False):
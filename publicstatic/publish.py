@@ -0,0 +1,124 @@
+# coding: utf-8
+
+"""Atomic publishing.
+
+When 'atomic_publish' is enabled, build_path is a symbolic link to one of
+the builds kept in '<build_path>.builds' directory. Each build is written
+to a fresh staging directory, where outputs identical to the previous
+build are hard-linked instead of being written again. When the build is
+complete, the link is switched to the new directory with a single rename,
+so the web server never serves a half-updated website."""
+
+import os
+import shutil
+from datetime import datetime
+from publicstatic import conf
+from publicstatic import errors
+from publicstatic import helpers
+from publicstatic import logger
+
+# build directory name format
+BUILD_NAME_FORMAT = '%Y%m%d-%H%M%S-%f'
+
+
+class NoPreviousBuildException(errors.BasicException):
+    """there is no previous build to roll back to"""
+    pass
+
+
+class IncompleteBuildException(errors.BasicException):
+    """some output files were not written, the build was not published"""
+    pass
+
+
+def builds_path():
+    """Directory containing all kept builds."""
+    return conf.get('build_path') + '.builds'
+
+
+def current():
+    """Real path to the currently published build directory, or None."""
+    build_path = conf.get('build_path')
+    if os.path.islink(build_path) or os.path.isdir(build_path):
+        return os.path.realpath(build_path)
+    return None
+
+
+def builds():
+    """Ordered list of kept build directories, the latest one goes last.
+    Real pathes are returned to be comparable with current()."""
+    path = builds_path()
+    if not os.path.isdir(path):
+        return []
+    names = sorted(name for name in os.listdir(path) if
+                   os.path.isdir(os.path.join(path, name)))
+    return [os.path.realpath(os.path.join(path, name)) for name in names]
+
+
+def stage():
+    """Creates a fresh staging directory for the new build."""
+    name = datetime.now().strftime(BUILD_NAME_FORMAT)
+    path = os.path.join(builds_path(), name)
+    os.makedirs(path)
+    return path
+
+
+def discard(path):
+    """Drops unsuccessful staging directory."""
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def swap(path):
+    """Atomically switches build_path link to the specified build, and
+    drops outdated builds."""
+    build_path = conf.get('build_path')
+    if os.path.isdir(build_path) and not os.path.islink(build_path):
+        logger.warn('converting build directory to a link: ' + build_path)
+        name = datetime.fromtimestamp(os.path.getmtime(build_path))
+        legacy = os.path.join(builds_path(), name.strftime(BUILD_NAME_FORMAT))
+        os.rename(build_path, legacy)
+
+    _link(path)
+    prune()
+
+
+def prune():
+    """Drops the oldest builds beyond 'keep_builds' limit, never touching
+    the published one."""
+    published = current()
+    kept = builds()
+    outdated = kept[:max(len(kept) - max(conf.get('keep_builds'), 1), 0)]
+    for path in outdated:
+        if path != published:
+            logger.debug('dropping outdated build: ' + path)
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def rollback():
+    """Switches build_path link to the build preceding the published
+    one."""
+    kept = builds()
+    published = current()
+    previous = [path for path in kept if published and path < published]
+    if not previous:
+        raise NoPreviousBuildException()
+    _link(previous[-1])
+
+
+def clean():
+    """Drops the link and all kept builds."""
+    build_path = conf.get('build_path')
+    if os.path.islink(build_path):
+        os.remove(build_path)
+    helpers.rmdir(builds_path())
+
+
+def _link(path):
+    """Points build_path link to the [path] with a single rename."""
+    build_path = conf.get('build_path')
+    link_path = build_path + '.tmp'
+    if os.path.lexists(link_path):
+        os.remove(link_path)
+    os.symlink(os.path.relpath(path, os.path.dirname(build_path)), link_path)
+    os.replace(link_path, build_path)
+    logger.info('published build: ' + os.path.basename(path))
@@ -0,0 +1,492 @@
+# coding: utf-8
+
+"""Asynchronous preview web server.
+
+Connections are handled by an asyncio event loop, so slow clients do not
+block each other, and kept alive between requests. File bodies are sent
+with os.sendfile() where the platform supports it. Responses carry ETag
+validators taken from the build manifest (or file size and modification
+time for files missing there) and Last-Modified headers, so browsers
+revalidate with conditional requests. Precompressed '.gz' siblings are
+served to clients accepting gzip encoding.
+
+When 'live_reload' is enabled, a tiny client script is injected into
+served HTML pages. It subscribes to server-sent events, and the server
+notifies each open page when its own output changes (the page reloads),
+or when stylesheets change (they are swapped without reloading)."""
+
+import asyncio
+import email.utils
+import json
+import mimetypes
+import os
+import posixpath
+import threading
+import time
+import urllib.parse
+from publicstatic import compress
+from publicstatic import conf
+from publicstatic import logger
+from publicstatic import manifest
+
+# maximum request head size in bytes
+MAX_HEAD_SIZE = 64 * 1024
+
+# seconds to keep idle connection open
+KEEP_ALIVE_TIMEOUT = 15
+
+# chunk size for sending files when sendfile() is not available
+CHUNK_SIZE = 256 * 1024
+
+# seconds between build manifest checks
+POLL_INTERVAL = 1.0
+
+# seconds between keep-alive comments in the event stream
+HEARTBEAT_INTERVAL = 15
+
+# live reload endpoints
+EVENTS_PATH = '/__pub/events'
+SCRIPT_PATH = '/__pub/reload.js'
+
+# live reload client
+RELOAD_SCRIPT = """(function () {
+  var path = encodeURIComponent(location.pathname);
+  var events = new EventSource('%s?path=' + path);
+  events.addEventListener('reload', function () {
+    location.reload();
+  });
+  events.addEventListener('css', function (event) {
+    var changed = JSON.parse(event.data);
+    var links = document.querySelectorAll('link[rel="stylesheet"]');
+    for (var i = 0; i < links.length; i++) {
+      var url = new URL(links[i].href);
+      if (changed.indexOf(url.pathname) >= 0) {
+        url.searchParams.set('reload', Date.now());
+        links[i].href = url.href;
+      }
+    }
+  });
+})();
+""" % EVENTS_PATH
+
+REASONS = {
+    200: 'OK',
+    301: 'Moved Permanently',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+    500: 'Internal Server Error',
+}
+
+
+class Request:
+    def __init__(self, method, target, version, headers):
+        self.method = method
+        self.target = target
+        self.version = version
+        self.headers = headers  # lower case header names
+        parsed = urllib.parse.urlsplit(target)
+        self.path = urllib.parse.unquote(parsed.path)
+        self.query = parsed.query
+
+    def keep_alive(self):
+        connection = self.headers.get('connection', '').lower()
+        if self.version == 'HTTP/1.0':
+            return connection == 'keep-alive'
+        return connection != 'close'
+
+    def accepts_gzip(self):
+        encodings = self.headers.get('accept-encoding', '').lower()
+        return any(item.split(';')[0].strip() == 'gzip'
+                   for item in encodings.split(','))
+
+
+class Response:
+    def __init__(self, status, headers=None, body=b'', file_name=None,
+                 size=None):
+        self.status = status
+        self.headers = headers or {}
+        self.body = body
+        self.file_name = file_name
+        self.size = len(body) if size is None else size
+
+
+class Server:
+    """Serves files from the [root] directory."""
+
+    def __init__(self, root, port):
+        self._root = root
+        self._port = port
+        self._manifest = {}
+        self._manifest_mtime = None
+        self._loop = None
+        self._clients = {}  # event queue -> page relative path
+        self._clients_lock = threading.Lock()
+
+    def serve(self):
+        """Runs the server forever in a new event loop (could be called in
+        a background thread), and watches for changes in background."""
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        self._loop = loop
+        watcher = threading.Thread(target=self.watch, name='watcher')
+        watcher.daemon = True
+        watcher.start()
+        server = loop.run_until_complete(
+            asyncio.start_server(self._handle, port=self._port))
+        try:
+            loop.run_forever()
+        finally:
+            self._loop = None
+            server.close()
+            loop.run_until_complete(server.wait_closed())
+            tasks = _all_tasks(loop)  # open keep-alive connections
+            for task in tasks:
+                task.cancel()
+            if tasks:
+                loop.run_until_complete(asyncio.wait(tasks))
+            loop.close()
+
+    def stop(self):
+        """Stops the server started by serve(). Could be called from any
+        thread."""
+        loop = self._loop
+        if loop is not None:
+            loop.call_soon_threadsafe(loop.stop)
+
+    def watch(self):
+        """Notifies live reload clients about outputs changed by builds,
+        comparing build manifests."""
+        if not conf.get('live_reload'):
+            return
+        mtime = _mtime(manifest.path())
+        previous = manifest.load()
+        while self._loop is not None:
+            time.sleep(POLL_INTERVAL)
+            if _mtime(manifest.path()) == mtime:
+                continue
+            mtime = _mtime(manifest.path())
+            current = manifest.load()
+            changed, removed = manifest.diff(previous, current)
+            previous = current
+            self.notify(changed + removed)
+
+    def notify(self, changed):
+        """Sends change notifications to live reload clients for the
+        changed output pathes. Could be called from any thread."""
+        if self._loop is not None and changed:
+            self._loop.call_soon_threadsafe(self._publish, set(changed))
+
+    def subscribed(self):
+        """Relative pathes of the pages opened by live reload clients."""
+        with self._clients_lock:
+            return set(self._clients.values())
+
+    async def respond(self, request):
+        """Returns response for the request."""
+        if request.method not in ('GET', 'HEAD'):
+            return error(405, {'Allow': 'GET, HEAD'})
+        rel_path = _rel_path(request.path)
+        if rel_path is None:
+            return error(400)
+        file_name = os.path.join(self._root, *rel_path.split('/'))
+        if os.path.isdir(file_name):
+            if rel_path and not request.path.endswith('/'):
+                location = request.path + '/'
+                if request.query:
+                    location += '?' + request.query
+                return error(301, {'Location': urllib.parse.quote(location)})
+            rel_path = posixpath.join(rel_path, conf.get('index_page'))
+            file_name = os.path.join(file_name, conf.get('index_page'))
+        if not os.path.isfile(file_name):
+            return error(404)
+        return self.file_response(request, rel_path, file_name)
+
+    def file_response(self, request, rel_path, file_name):
+        """Builds response for a file inside the root directory, preferring
+        its compressed sibling if the client accepts it."""
+        content_type = mimetypes.guess_type(file_name)[0] or \
+            'application/octet-stream'
+        if content_type.startswith('text/') or \
+           content_type in ('application/javascript', 'application/xml'):
+            content_type += '; charset=utf-8'
+        headers = {'Content-Type': content_type}
+        gz_name = file_name + compress.SUFFIX
+        injected = conf.get('live_reload') and \
+            content_type.startswith('text/html')
+        if not injected and os.path.isfile(gz_name):
+            headers['Vary'] = 'Accept-Encoding'
+            if request.accepts_gzip():
+                headers['Content-Encoding'] = 'gzip'
+                rel_path += compress.SUFFIX
+                file_name = gz_name
+
+        stat = os.stat(file_name)
+        headers['ETag'] = self._etag(rel_path, stat)
+        if injected:
+            headers['ETag'] = injected_etag(headers['ETag'])
+        headers['Last-Modified'] = email.utils.formatdate(stat.st_mtime,
+                                                          usegmt=True)
+        if _not_modified(request, headers['ETag'], stat.st_mtime):
+            return Response(304, headers)
+        if injected:
+            with open(file_name, 'rb') as f:
+                return Response(200, headers, inject(f.read()))
+        return Response(200, headers, file_name=file_name, size=stat.st_size)
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(_read_request(reader),
+                                                     KEEP_ALIVE_TIMEOUT)
+                except (asyncio.TimeoutError, ConnectionError):
+                    break
+                if request is None:
+                    break
+                if isinstance(request, Response):
+                    await self._send(writer, None, request, False)
+                    break
+                if request.path == EVENTS_PATH and conf.get('live_reload'):
+                    await self._events(request, writer)
+                    break
+                try:
+                    if request.path == SCRIPT_PATH:
+                        response = _script()
+                    else:
+                        response = await self.respond(request)
+                except Exception as e:
+                    logger.error("error serving '%s' - %s" %
+                                 (request.target, e))
+                    response = error(500)
+                keep_alive = request.keep_alive()
+                await self._send(writer, request, response, keep_alive)
+                if not keep_alive:
+                    break
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def _send(self, writer, request, response, keep_alive):
+        # the file is opened before writing headers, so a file removed
+        # after building the response still gets a complete error response
+        f = None
+        if response.file_name is not None:
+            try:
+                f = open(response.file_name, 'rb')
+            except OSError as e:
+                logger.error("error serving '%s' - %s" %
+                             (response.file_name, e))
+                missing = isinstance(e, FileNotFoundError)
+                response = error(404 if missing else 500)
+        try:
+            await self._write(writer, request, response, keep_alive, f)
+        finally:
+            if f is not None:
+                f.close()
+
+    async def _write(self, writer, request, response, keep_alive, f):
+        status = response.status
+        head = ["HTTP/1.1 %d %s" % (status, REASONS.get(status, ''))]
+        headers = dict(response.headers)
+        headers['Date'] = email.utils.formatdate(usegmt=True)
+        headers['Server'] = 'public-static'
+        headers['Connection'] = 'keep-alive' if keep_alive else 'close'
+        if status != 304:
+            headers['Content-Length'] = str(response.size)
+        head += ["%s: %s" % item for item in headers.items()]
+        writer.write(('\r\n'.join(head) + '\r\n\r\n').encode('latin-1'))
+        if request is not None:
+            logger.debug("%s %s %d" % (request.method, request.target, status))
+        if request is not None and request.method == 'HEAD' or status == 304:
+            await writer.drain()
+            return
+        if f is None:
+            writer.write(response.body)
+            await writer.drain()
+            return
+        await writer.drain()
+        await _sendfile(writer, f, response.size)
+
+    async def _events(self, request, writer):
+        """Streams live reload events for the page specified by the 'path'
+        query parameter."""
+        query = urllib.parse.parse_qs(request.query)
+        rel_path = _rel_path(query.get('path', ['/'])[0])
+        if rel_path is None:
+            await self._send(writer, request, error(400), False)
+            return
+        if not rel_path or query['path'][0].endswith('/'):
+            rel_path = posixpath.join(rel_path, conf.get('index_page'))
+        writer.write(b'HTTP/1.1 200 OK\r\n'
+                     b'Content-Type: text/event-stream\r\n'
+                     b'Cache-Control: no-cache\r\n'
+                     b'Connection: close\r\n\r\n'
+                     b'retry: 1000\n\n')
+        events = asyncio.Queue()
+        with self._clients_lock:
+            self._clients[events] = rel_path
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(events.get(),
+                                                   HEARTBEAT_INTERVAL)
+                    writer.write(event.encode('utf-8'))
+                except asyncio.TimeoutError:
+                    writer.write(b': ping\n\n')
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            with self._clients_lock:
+                del self._clients[events]
+
+    def _publish(self, changed):
+        styles = sorted('/' + rel for rel in changed
+                        if posixpath.splitext(rel)[1] == '.css')
+        with self._clients_lock:
+            clients = list(self._clients.items())
+        for events, rel_path in clients:
+            if rel_path in changed:
+                events.put_nowait("event: reload\ndata: %s\n\n" % rel_path)
+            elif styles:
+                events.put_nowait("event: css\ndata: %s\n\n" %
+                                  json.dumps(styles))
+
+    def _etag(self, rel_path, stat):
+        self._reload_manifest()
+        entry = self._manifest.get(rel_path)
+        if entry and entry['size'] == stat.st_size and \
+           entry['mtime'] == stat.st_mtime:
+            return '"%s"' % entry['hash']
+        return '"%x-%x"' % (stat.st_size, stat.st_mtime_ns)
+
+    def _reload_manifest(self):
+        mtime = _mtime(manifest.path())
+        if mtime != self._manifest_mtime:
+            self._manifest = manifest.load() if mtime else {}
+            self._manifest_mtime = mtime
+
+
+def error(status, headers=None):
+    body = ("%d %s\n" % (status, REASONS[status])).encode('utf-8')
+    headers = dict(headers or {})
+    headers['Content-Type'] = 'text/plain; charset=utf-8'
+    return Response(status, headers, body)
+
+
+def inject(html):
+    """Adds live reload client script to the HTML page."""
+    tag = ('<script src="%s"></script>' % SCRIPT_PATH).encode('utf-8')
+    index = html.lower().rfind(b'</body>')
+    if index < 0:
+        return html + tag
+    return html[:index] + tag + html[index:]
+
+
+def injected_etag(etag):
+    """ETag for the page with live reload script injected, so cached
+    copies of the page with and without the script never match."""
+    return etag[:-1] + '-live"'
+
+
+def serve(root, port):
+    """Runs preview server for the [root] directory."""
+    print("running HTTP server on port %d..." % port)
+    print('use Ctrl-Break to stop webserver')
+    Server(root, port).serve()
+
+
+def _script():
+    headers = {
+        'Content-Type': 'application/javascript; charset=utf-8',
+        'Cache-Control': 'no-cache',
+    }
+    return Response(200, headers, RELOAD_SCRIPT.encode('utf-8'))
+
+
+def _mtime(file_name):
+    try:
+        return os.path.getmtime(file_name)
+    except OSError:
+        return None
+
+
+async def _read_request(reader):
+    """Reads request head. Returns Request, None if the connection was
+    closed, or error Response for malformed requests."""
+    try:
+        head = await reader.readuntil(b'\r\n\r\n')
+    except asyncio.IncompleteReadError:
+        return None
+    except asyncio.LimitOverrunError:
+        return error(400)
+    if len(head) > MAX_HEAD_SIZE:
+        return error(400)
+    lines = head.decode('latin-1').split('\r\n')
+    try:
+        method, target, version = lines[0].split()
+    except ValueError:
+        return error(400)
+    headers = {}
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers[name.strip().lower()] = value.strip()
+    if headers.get('content-length', '0') != '0':  # drop request body
+        try:
+            await reader.readexactly(int(headers['content-length']))
+        except (ValueError, asyncio.IncompleteReadError):
+            return error(400)
+    return Request(method, target, version, headers)
+
+
+def _all_tasks(loop):
+    if hasattr(asyncio, 'all_tasks'):  # Python 3.7+
+        return asyncio.all_tasks(loop)
+    return asyncio.Task.all_tasks(loop)
+
+
+async def _sendfile(writer, f, size):
+    loop = asyncio.get_event_loop()
+    if hasattr(loop, 'sendfile'):  # Python 3.7+, falls back to read/write
+        await loop.sendfile(writer.transport, f, 0, size)
+        return
+    while True:
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        writer.write(chunk)
+        await writer.drain()
+
+
+def _not_modified(request, etag, mtime):
+    if 'if-none-match' in request.headers:
+        tags = [tag.strip() for tag in
+                request.headers['if-none-match'].split(',')]
+        return etag in tags or '*' in tags
+    if 'if-modified-since' in request.headers and mtime is not None:
+        try:
+            since = email.utils.parsedate_to_datetime(
+                request.headers['if-modified-since']).timestamp()
+        except (TypeError, ValueError):
+            return False
+        return int(mtime) <= since
+    return False
+
+
+def _rel_path(path):
+    """Converts URL path to a normalized relative path, or returns None for
+    pathes outside the root."""
+    if '\0' in path:
+        return None
+    parts = []
+    for part in path.split('/'):
+        if part in ('', '.'):
+            continue
+        if part == '..' or os.sep in part or (os.altsep and os.altsep in part):
+            return None
+        parts.append(part)
+    return '/'.join(parts)
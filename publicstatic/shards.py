@@ -0,0 +1,114 @@
+# coding: utf-8
+
+"""Sharded builds support.
+
+'pub build --shard K/N' renders a deterministic subset of the per-source
+outputs to a separate shard directory, and 'pub build --merge' assembles
+all shard directories to the build path and generates site-wide outputs
+which depend on the whole site index."""
+
+import os
+import re
+import shutil
+import zlib
+from publicstatic import conf
+from publicstatic import errors
+from publicstatic import logger
+from publicstatic import writer
+
+RE_SHARD = re.compile(r"^\s*(\d+)\s*/\s*(\d+)\s*$")
+
+RE_SHARD_DIR = re.compile(r"^(\d+)-(\d+)$")
+
+
+class ShardFormatException(errors.BasicException):
+    """shard should be specified as K/N, where 1 <= K <= N"""
+    pass
+
+
+class IncompleteShardsException(errors.BasicException):
+    """some of the shard outputs are missing"""
+    pass
+
+
+class AmbiguousShardsException(errors.BasicException):
+    """complete shard outputs found for different shard counts"""
+    pass
+
+
+def parse(value):
+    """Parses 'K/N' string to (K, N) tuple."""
+    match = RE_SHARD.match(value or '')
+    if not match:
+        raise ShardFormatException(value=value)
+    number, count = int(match.group(1)), int(match.group(2))
+    if not 1 <= number <= count:
+        raise ShardFormatException(value=value)
+    return number, count
+
+
+def path(number, count):
+    """Output directory for the specified shard."""
+    return os.path.join(conf.get('shards_path'), "%d-%d" % (number, count))
+
+
+def index(rel_dest, count):
+    """Returns 1-based shard number for the destination path. The value
+    depends on the path only, so it is stable across processes and
+    machines."""
+    rel_dest = rel_dest.replace(os.sep, '/').lstrip('/')
+    return zlib.crc32(rel_dest.encode('utf-8')) % count + 1
+
+
+def selected(rel_dest):
+    """Returns True if the destination belongs to the current shard.
+    Everything is selected for non-sharded builds."""
+    shard = conf.get('shard')
+    return shard is None or index(rel_dest, shard[1]) == shard[0]
+
+
+def prune(count):
+    """Removes shard outputs left by builds with a different shard
+    count."""
+    for number, other in _found():
+        if other != count:
+            logger.info("removing stale shard %d/%d" % (number, other))
+            shutil.rmtree(path(number, other))
+
+
+def merge():
+    """Schedules copying of all shard outputs to the build path.
+    Incomplete shard sets left by builds with a different shard count are
+    ignored."""
+    shards_path = conf.get('shards_path')
+    found = {}  # shard count -> shard numbers
+    for number, count in _found():
+        found.setdefault(count, set()).add(number)
+
+    complete = [count for count, numbers in found.items()
+                if numbers == set(range(1, count + 1))]
+    if not complete:
+        raise IncompleteShardsException(path=shards_path)
+    if len(complete) > 1:
+        raise AmbiguousShardsException(path=shards_path)
+
+    count = complete[0]
+    for number in range(1, count + 1):
+        logger.info("merging shard %d/%d" % (number, count))
+        shard_path = path(number, count)
+        for root, dirs, files in os.walk(shard_path):
+            dest_dir = os.path.join(conf.get('build_path'),
+                                    os.path.relpath(root, shard_path))
+            for name in files:
+                writer.copy(os.path.join(root, name),
+                            os.path.normpath(os.path.join(dest_dir, name)))
+
+
+def _found():
+    """Yields (number, count) tuples for the existing shard outputs."""
+    shards_path = conf.get('shards_path')
+    if os.path.isdir(shards_path):
+        for name in sorted(os.listdir(shards_path)):
+            match = RE_SHARD_DIR.match(name)
+            if match:
+                yield int(match.group(1)), int(match.group(2))
@@ -31,6 +31,30 @@ class PageExistsException(errors.BasicException):
     pass
 
 
+class _Data(dict):
+    """Page data dictionary computing some values on first access."""
+
+    def __init__(self, values, lazy):
+        super().__init__(values)
+        self._lazy = dict(lazy)
+
+    def __missing__(self, key):
+        compute = self._lazy.get(key)
+        if compute is None:
+            if super().__contains__(key):  # computed by another thread
+                return super().__getitem__(key)
+            raise KeyError(key)
+        value = self[key] = compute()
+        self._lazy.pop(key, None)
+        return value
+
+    def __contains__(self, key):
+        return super().__contains__(key) or key in self._lazy
+
+    def get(self, key, default=None):
+        return self[key] if key in self else default
+
+
 class Source:
     """Basic abstraction used for static files to be copied w/o processing."""
     def __init__(self, file_name, base_dir):
@@ -44,7 +68,8 @@ class Source:
         self._rel_path = os.path.relpath(file_name, base_dir)
         self._ext = os.path.splitext(file_name)[1].lower()
         self._ctime = datetime.fromtimestamp(os.path.getctime(self._path))
-        self._utime = datetime.fromtimestamp(os.path.getmtime(self._path))
+        self._mtime = os.path.getmtime(self._path)
+        self._utime = datetime.fromtimestamp(self._mtime)
         self._processed = False
 
     def __str__(self):
@@ -100,6 +125,14 @@ class Source:
     def updated(self):
         return self._utime
 
+    def changed(self):
+        """Returns True if the source file was modified after it was
+        loaded."""
+        try:
+            return os.path.getmtime(self._path) != self._mtime
+        except OSError:
+            return True
+
     def processed(self, value=None):
         """Get/set 'processed' flag for the file."""
         if type(value) == bool:
@@ -121,6 +154,11 @@ class ParseableSource(Source):
     def set(self, key, value):
         self._data[key] = value
 
+    def changed(self):
+        """Sources with data directives are always treated as changed,
+        because their content depends on the data files."""
+        return super().changed() or const.DATA_PREFIX in self.text()
+
     def data(self, key=None, default=None):
         """Returns page data as a dictionary, or a single data field
         if key argument specified."""
@@ -179,9 +217,9 @@ class ParseableSource(Source):
             'created': helpers.parse_time(meta.get('created'), self._ctime),
             'updated': helpers.parse_time(meta.get('updated'), self._utime),
             'description': meta.get('description', desc),
-            'content': md(content.strip()),
         })
-        return meta
+        # markdown is converted when the content is used for the first time
+        return _Data(meta, {'content': lambda: md(content.strip())})
 
     @staticmethod
     def _split(text):
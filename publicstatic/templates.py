@@ -3,18 +3,24 @@
 """Jinja2 helpers."""
 
 import codecs
-import jinja2
 import os.path
+import threading
 from urllib.parse import urlparse
-import yaml
+from publicstatic import artifacts
 from publicstatic import conf
 from publicstatic import const
+from publicstatic import datafiles
 from publicstatic import logger
 from publicstatic import helpers
 from publicstatic import minify
 from publicstatic import pathes
+from publicstatic import profiler
+from publicstatic import writer
 
 _env = None
+_sink = None
+_lock = threading.Lock()
+_fragments = {}  # (data file, template name) -> (stamp, template, html)
 
 JINJA_EXTENSIONS = [
     'jinja2.ext.loopcontrols',
@@ -24,15 +30,27 @@ JINJA_EXTENSIONS = [
 def env():
     global _env
     if _env is None:
+        import jinja2
+        from publicstatic import hotspots
         search_pathes = [pathes.templates(), pathes.theme_templates()]
         logger.info("templates pathes: [%s]" % ', '.join(search_pathes))
         loader = jinja2.FileSystemLoader(searchpath=search_pathes)
         _env = jinja2.Environment(loader=loader, extensions=JINJA_EXTENSIONS)
         _env.filters.update(custom_filters())
         _env.globals.update(custom_globals())
+        if hotspots.enabled():
+            hotspots.instrument(_env)
     return _env
 
 
+def reset():
+    """Drops Jinja2 environment to be recreated on the next use."""
+    global _env
+    _env = None
+    with _lock:
+        _fragments.clear()
+
+
 def custom_globals():
     return {
         'asset_exists': asset_exists,
@@ -70,46 +88,98 @@ def filter_trimurl(value):
 
 def render(data, template, dest_path):
     """Render data using a specified template to a file."""
-    result = env().get_template(template).render(data)
-    _save(result, dest_path)
+    with profiler.output(dest_path):
+        with profiler.stage('render'):
+            text = rendered(data, template)
+        _save(text, dest_path)
+
+
+def rendered(data, template):
+    """Render data using a specified template to a string."""
+    return env().get_template(template).render(data)
 
 
 def render_file(path, data, dest_path):
     """Read template from a file, and render it to the destination path."""
+    with profiler.output(dest_path):
+        with profiler.stage('render'):
+            text = rendered_file(path, data)
+        _save(text, dest_path)
+
+
+def rendered_file(path, data):
+    """Read template from a file, and render it to a string."""
     with codecs.open(path, mode='r', encoding='utf-8') as f:
         template = env().from_string(f.read())
-    _save(template.render(data), dest_path)
+    return template.render(data)
 
 
 def render_page(page_data, dest_path):
+    """Render page to the [dest_path]. See rendered_page()."""
+    import jinja2
+    try:
+        with profiler.output(dest_path):
+            with profiler.stage('render'):
+                text = rendered_page(page_data)
+            _save(text, dest_path)
+    except jinja2.exceptions.TemplateNotFound as e:
+        message = "page generation failed because template was not found: %s"
+        logger.error(message % e)
+
+
+def rendered_page(page_data):
     """This one is tricky. It creates a dynamic template inherited from
     the base template, adds a 'main' block to this template with page content
-    inside, and renders the result template to [dest_path]. Boom!"""
+    inside, and renders the result template to a string. Boom!"""
     base_template = page_data['page']['template'] + '.html'
     content = page_data['page']['content']
     template = """{%% extends "%s" %%}{%% block main %%}%s{%% endblock %%}"""
     template = template % (base_template, content)
-    try:
-        template = env().from_string(template)
-        html = template.render(page_data)
-        _save(html, dest_path)
-    except jinja2.exceptions.TemplateNotFound as e:
-        message = "page generation failed because template was not found: %s"
-        logger.error(message % e)
+    return env().from_string(template).render(page_data)
 
 
 def render_data(data_file, template):
+    """Renders data file with the _data_<template>.html template. The
+    result is reused until the data file or the template changes."""
     data_file = pathes.data(data_file)
-    with codecs.open(data_file, mode='r', encoding='utf-8') as f:
-        data = yaml.load(f)
-    template_file = "_data_%s.html" % template
-    result = env().get_template(template_file).render({'data': data})
+    template = env().get_template("_data_%s.html" % template)
+    key = (data_file, template.name)
+    stamp = datafiles.stamp(data_file)
+    with _lock:
+        cached = _fragments.get(key)
+    if cached is not None and cached[0] == stamp and cached[1] is template:
+        return cached[2]
+    with profiler.stage('data'):
+        result = template.render({'data': datafiles.load(data_file)})
+    with _lock:
+        _fragments[key] = (stamp, template, result)
     return result
 
 
+def redirect(sink=None):
+    """Send rendered outputs to the [sink] function taking (text, dest_path)
+    arguments instead of saving them. None restores default behavior."""
+    global _sink
+    _sink = sink
+
+
+def minified(text, dest_path):
+    """Apply optional HTML minification to the [text]."""
+    if conf.get('min_html') and helpers.ext(dest_path) == '.html':
+        minify_html = lambda: minify.minify_html(text)
+        with profiler.output(dest_path), profiler.stage('minify'):
+            text = artifacts.cached_text('min_html', [text], minify_html)
+    return text
+
+
+def write(text, dest_path):
+    """Schedule saving [text] to file."""
+    writer.write_text(dest_path, text)
+
+
 def _save(text, dest_path):
     """Apply optional HTML minification to the [text] and save it to file."""
-    if conf.get('min_html') and helpers.ext(dest_path) == '.html':
-        text = minify.minify_html(text)
-    with codecs.open(dest_path, mode='w', encoding='utf-8') as f:
-        f.write(text)
+    if _sink is not None:
+        _sink(text, dest_path)
+    else:
+        write(minified(text, dest_path), dest_path)
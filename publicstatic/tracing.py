@@ -0,0 +1,116 @@
+# coding: utf-8
+
+"""Build tracing in Chrome Trace Event format.
+
+Spans are recorded as complete ('X') events with the process and thread
+identifiers, so the trace shows nested spans for each thread on a shared
+timeline in Perfetto or chrome://tracing. When tracing is disabled,
+span() returns a shared no-op context manager."""
+
+import json
+import os
+import threading
+import time
+
+_enabled = False
+_lock = threading.Lock()
+_events = []
+_threads = {}  # thread identifier -> thread name
+_origin = 0
+
+
+class _Null:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        return False
+
+
+_NULL = _Null()
+
+
+class _Span:
+    def __init__(self, name, args):
+        self._name = name
+        self._args = args
+
+    def __enter__(self):
+        self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, *args):
+        complete(self._name, self._started,
+                 time.perf_counter() - self._started, self._args)
+        return False
+
+
+def enable():
+    """Starts recording spans."""
+    global _enabled, _origin
+    with _lock:
+        del _events[:]
+        _threads.clear()
+    _origin = time.perf_counter()
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def enabled():
+    return _enabled
+
+
+def span(name, **args):
+    """Context manager recording a span with optional [args]."""
+    return _Span(name, args) if _enabled else _NULL
+
+
+def complete(name, started, duration, args=None):
+    """Records a span started at [started] time.perf_counter() value and
+    lasted for [duration] seconds."""
+    thread = threading.current_thread()
+    event = {
+        'name': name,
+        'cat': 'build',
+        'ph': 'X',
+        'ts': (started - _origin) * 1e6,
+        'dur': duration * 1e6,
+        'pid': os.getpid(),
+        'tid': thread.ident,
+    }
+    if args:
+        event['args'] = {key: str(value) for key, value in args.items()
+                         if value is not None}
+    with _lock:
+        _events.append(event)
+        _threads[thread.ident] = thread.name
+
+
+def save(file_name):
+    """Writes recorded spans to [file_name]."""
+    with _lock:
+        events = list(_events)
+        threads = dict(_threads)
+    pid = os.getpid()
+    metadata = [{
+        'name': 'thread_name',
+        'ph': 'M',
+        'pid': pid,
+        'tid': tid,
+        'args': {'name': name},
+    } for tid, name in threads.items()]
+    metadata.append({
+        'name': 'process_name',
+        'ph': 'M',
+        'pid': pid,
+        'args': {'name': 'pub build'},
+    })
+    with open(file_name, 'w', encoding='utf-8') as f:
+        json.dump({
+            'traceEvents': metadata + events,
+            'displayTimeUnit': 'ms',
+        }, f)
@@ -55,17 +55,19 @@ class UrlizePattern(markdown.inlinepatterns.Pattern):
 
         text = url
 
-        if not url.split('://')[0] in ('http','https','ftp'):
-            if '@' in url and not '/' in url:
-                url = 'mailto:' + url
-            else:
-                url = 'http://' + url
-
         el = markdown.util.etree.Element("a")
-        el.set('href', url)
+        el.set('href', href(url))
         el.text = markdown.util.AtomicString(text)
         return el
 
+def href(url):
+    """ Return link target for the matched text. """
+    if not url.split('://')[0] in ('http','https','ftp'):
+        if '@' in url and not '/' in url:
+            return 'mailto:' + url
+        return 'http://' + url
+    return url
+
 class UrlizeExtension(markdown.Extension):
     """ Urlize Extension for Python-Markdown. """
 
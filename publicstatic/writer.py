@@ -0,0 +1,247 @@
+# coding: utf-8
+
+"""Background writer pool for build outputs.
+
+Rendered pages and copied files are handed to a bounded pool of writer
+threads, so slow file system operations do not block rendering. Each
+file is written to a temporary file in the destination directory and
+renamed to the destination path, so readers never see partial files."""
+
+import concurrent.futures
+import os
+import shutil
+import sys
+import threading
+import traceback
+from publicstatic import conf
+from publicstatic import helpers
+from publicstatic import logger
+from publicstatic import metrics
+from publicstatic import profiler
+
+_executor = None
+_slots = None
+_lock = threading.Lock()
+_pending = {}  # destination path -> future
+_errors = []
+_baseline = None  # (previous build path, current build path)
+_outputs = set()  # destination pathes written since the last written() call
+
+
+def write_text(dest_path, text):
+    """Schedules writing unicode [text] to the [dest_path]."""
+    _submit(dest_path, _write, dest_path, text.encode('utf-8'))
+
+
+def write_bytes(dest_path, value):
+    """Schedules writing [value] to the [dest_path]."""
+    _submit(dest_path, _write, dest_path, value)
+
+
+def copy(src_path, dest_path, updated=None):
+    """Schedules copying a file, and setting its modification time to the
+    [updated] datetime value if specified. Pending write to the
+    [src_path] will be completed first."""
+    wait(src_path)
+    _submit(dest_path, _copy, src_path, dest_path, updated)
+
+
+def produce(dest_path, func):
+    """Calls func(path) to create the output in a temporary file (e.g. by
+    an external command), and renames it to the [dest_path] when it is
+    complete. Unlike other writes, runs in the calling thread."""
+    wait(dest_path)
+    tmp_path = _tmp(dest_path)
+    try:
+        func(tmp_path)
+        os.replace(tmp_path, dest_path)
+    except Exception:
+        _discard(tmp_path)
+        raise
+    _written(dest_path, os.path.getsize(dest_path))
+
+
+def written():
+    """Returns a set of destination pathes written (not hard-linked from
+    the baseline) since the previous call."""
+    global _outputs
+    with _lock:
+        result, _outputs = _outputs, set()
+    return result
+
+
+def baseline(previous=None, current=None):
+    """Enables hard-linking files from the [previous] build directory
+    instead of writing identical outputs to the [current] one. Call
+    without arguments to disable."""
+    global _baseline
+    _baseline = (previous, current) if previous and current else None
+
+
+def wait(dest_path=None):
+    """Waits for pending write to the [dest_path], or for all pending
+    writes if the path is not specified. Returns a number of failed
+    writes."""
+    with _lock:
+        if dest_path is None:
+            futures = list(_pending.values())
+        else:
+            futures = [_pending[dest_path]] if dest_path in _pending else []
+    concurrent.futures.wait(futures)
+    with _lock:
+        errors = list(_errors)
+        del _errors[:]
+    for path, error in errors:
+        logger.error("error writing '%s' - %s" % (path, error))
+    return len(errors)
+
+
+def reset():
+    """Stops writer threads when pending writes are complete, so the next
+    write starts them with the current configuration."""
+    global _executor, _slots
+    with _lock:
+        executor = _executor
+    if executor is not None:
+        executor.shutdown()
+    with _lock:
+        _executor, _slots = None, None
+
+
+def _submit(dest_path, func, *args):
+    global _executor, _slots
+    with _lock:
+        if _executor is None:
+            threads = conf.get('writer_threads')
+            # named threads are labelled in traces (Python 3.6+)
+            options = {'thread_name_prefix': 'writer'} \
+                if sys.version_info >= (3, 6) else {}
+            _executor = concurrent.futures.ThreadPoolExecutor(threads,
+                                                              **options)
+            _slots = threading.BoundedSemaphore(conf.get('writer_queue_size'))
+    with _lock:
+        previous = _pending.get(dest_path)
+    if previous is not None:  # keep the order of writes to the same file
+        concurrent.futures.wait([previous])
+    _slots.acquire()
+    try:
+        builder = profiler.current()[0]
+        future = _executor.submit(_run, dest_path, builder, func, *args)
+    except Exception:
+        _slots.release()
+        raise
+    with _lock:
+        _pending[dest_path] = future
+    future.add_done_callback(lambda future: _done(dest_path, future))
+
+
+def _run(dest_path, builder, func, *args):
+    try:
+        with profiler.output(dest_path, builder), profiler.stage('write'):
+            func(*args)
+    except Exception as e:
+        logger.debug(traceback.format_exc())
+        with _lock:
+            _errors.append((dest_path, e))
+    finally:
+        _slots.release()
+
+
+def _done(dest_path, future):
+    with _lock:
+        if _pending.get(dest_path) is future:
+            del _pending[dest_path]
+
+
+def _write(dest_path, value):
+    def same(path):
+        if os.path.getsize(path) != len(value):
+            return False
+        with open(path, 'rb') as f:
+            return f.read() == value
+
+    if _link(dest_path, same):
+        return
+    tmp_path = _tmp(dest_path)
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(value)
+        os.replace(tmp_path, dest_path)
+    except Exception:
+        _discard(tmp_path)
+        raise
+    _written(dest_path, len(value))
+
+
+def _copy(src_path, dest_path, updated):
+    def same(path):
+        if updated is None:
+            return False
+        stat = os.stat(path)
+        return stat.st_size == os.path.getsize(src_path) and \
+            stat.st_mtime == updated.timestamp()
+
+    if _link(dest_path, same):
+        return
+    tmp_path = _tmp(dest_path)
+    try:
+        shutil.copyfile(src_path, tmp_path)
+        if updated is not None:
+            helpers.utime(tmp_path, updated)
+        os.replace(tmp_path, dest_path)
+    except Exception:
+        _discard(tmp_path)
+        raise
+    _written(dest_path, os.path.getsize(dest_path))
+
+
+def _link(dest_path, same):
+    """Hard-links the file from the baseline build to the [dest_path] if
+    it exists and same(baseline file path) returns True."""
+    if _baseline is None:
+        return False
+    previous, current = _baseline
+    rel_path = os.path.relpath(dest_path, current)
+    if rel_path.startswith(os.pardir):
+        return False
+    path = os.path.join(previous, rel_path)
+    try:
+        if not os.path.isfile(path) or os.path.lexists(dest_path) or \
+           not same(path):
+            return False
+        helpers.makedirs(os.path.dirname(dest_path))
+        os.link(path, dest_path)
+        metrics.count('outputs_linked')
+        return True
+    except OSError:
+        return False
+
+
+def _written(dest_path, size):
+    with _lock:
+        _outputs.add(dest_path)
+    metrics.count('outputs_written')
+    metrics.count('bytes_written', size)
+
+
+def _tmp(dest_path):
+    """Creates temporary file next to the destination. Unlike mkstemp(),
+    the file is created with the default 0o666 mode, so it gets the same
+    umask-based permissions a regular new file would have."""
+    dir_path = os.path.dirname(dest_path)
+    helpers.makedirs(dir_path)
+    flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+    while True:
+        tmp_path = os.path.join(dir_path, '.%s.tmp' % os.urandom(6).hex())
+        try:
+            os.close(os.open(tmp_path, flags, 0o666))
+            return tmp_path
+        except FileExistsError:
+            continue
+
+
+def _discard(tmp_path):
+    try:
+        os.remove(tmp_path)
+    except OSError:
+        pass
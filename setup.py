@@ -49,12 +49,18 @@ setup(
     install_requires=[
         'beautifulsoup4',
         'jinja2',
-        'markdown >= 2.4',
+        'markdown >= 2.4, < 3',
         'mdx_grid',
         'pygments',
         'pyyaml',
         'yuicompressor',
     ],
+    extras_require={
+        'markdown-it': [
+            'markdown-it-py',
+            'mdit-py-plugins',
+        ],
+    },
     entry_points={
         'console_scripts': [
             'pub = %s:main' % PACKAGE_NAME
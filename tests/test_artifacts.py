@@ -0,0 +1,75 @@
+# encoding: utf-8
+
+import http.server
+import shutil
+import tempfile
+import threading
+from publicstatic import artifacts
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    """Minimal artifact storage server keeping everything in memory."""
+    storage = {}
+
+    def do_GET(self):
+        value = self.storage.get(self.path)
+        if value is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(value)))
+        self.end_headers()
+        self.wfile.write(value)
+
+    def do_PUT(self):
+        length = int(self.headers['Content-Length'])
+        self.storage[self.path] = self.rfile.read(length)
+        self.send_response(201)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+def check_backend(backend):
+    key = artifacts.key('test', ['input'])
+    assert backend.get(key) is None
+    backend.put(key, b'output')
+    assert backend.get(key) == b'output'
+
+
+def test_key():
+    assert artifacts.key('a', ['b', 'c']) == artifacts.key('a', ['b', b'c'])
+    assert artifacts.key('a', ['bc']) != artifacts.key('a', ['b', 'c'])
+    assert artifacts.key('a', ['b']) != artifacts.key('x', ['b'])
+
+
+def test_dir_backend():
+    path = tempfile.mkdtemp()
+    try:
+        check_backend(artifacts.DirBackend(path))
+    finally:
+        shutil.rmtree(path)
+
+
+def test_http_backend():
+    server = http.server.HTTPServer(('127.0.0.1', 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    try:
+        url = "http://127.0.0.1:%d/cache" % server.server_address[1]
+        check_backend(artifacts.HttpBackend(url))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    test_key()
+    test_dir_backend()
+    test_http_backend()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+# encoding: utf-8
+
+import gzip
+import os
+import shutil
+import tempfile
+from publicstatic import compress
+from publicstatic import conf
+from publicstatic import manifest
+
+
+def write(path, rel_path, text):
+    with open(os.path.join(path, rel_path), 'w') as f:
+        f.write(text)
+
+
+def test_compress():
+    conf.set('gzip_extensions', ['.html'])
+    conf.set('gzip_level', 9)
+    conf.set('gzip_min_size', 100)
+    path = tempfile.mkdtemp()
+    try:
+        write(path, 'large.html', 'x' * 1000)
+        write(path, 'small.html', 'x')
+        write(path, 'image.png', 'x' * 1000)
+        write(path, 'foo.tar.gz', 'archive')
+        previous = manifest.scan(path)
+        assert compress.compress(path, {}, previous) == 1
+        with gzip.open(os.path.join(path, 'large.html.gz'), 'rt') as f:
+            assert f.read() == 'x' * 1000
+        assert not os.path.exists(os.path.join(path, 'small.html.gz'))
+        assert not os.path.exists(os.path.join(path, 'image.png.gz'))
+
+        current = compress.mark(manifest.scan(path, previous))
+        assert compress.compressed('large.html.gz', current['large.html.gz'])
+        assert not compress.compressed('foo.tar.gz', current['foo.tar.gz'])
+        assert compress.compress(path, previous, current) == 0
+        os.remove(os.path.join(path, 'large.html'))
+        assert compress.compress(path, current,
+                                 manifest.scan(path, current)) == 0
+        assert not os.path.exists(os.path.join(path, 'large.html.gz'))
+        assert os.path.exists(os.path.join(path, 'foo.tar.gz'))
+    finally:
+        shutil.rmtree(path)
+
+
+def main():
+    test_compress()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+# encoding: utf-8
+
+import glob
+import os
+import socket
+import tempfile
+import threading
+import pytest
+from publicstatic import conf
+from publicstatic import daemon
+from publicstatic import publicstatic
+
+
+def touch(file_name, delta=10):
+    """Moves file modification time forward."""
+    mtime = os.path.getmtime(file_name) + delta
+    os.utime(file_name, (mtime, mtime))
+
+
+def sources(site):
+    """Returns {file name: source} for the warm site model."""
+    cache = site._cache
+    return dict((item.path(), item)
+                for item in list(cache.pages()) + list(cache.posts()))
+
+
+def test_round_trip():
+    pytest.importorskip('mdx_grid')
+    if not hasattr(socket, 'AF_UNIX'):
+        pytest.skip('Unix domain sockets are not supported')
+    saved = conf._path, conf._params
+    with tempfile.TemporaryDirectory() as path:
+        try:
+            publicstatic.init(path)
+            conf.load(path)
+            site = daemon.Site(path)
+            server = daemon._Server(daemon.socket_path(path), site)
+
+            def serve():
+                while not site.stopped:
+                    server.handle_request()
+
+            thread = threading.Thread(target=serve, daemon=True)
+            thread.start()
+            try:
+                assert daemon.running(path)
+                assert daemon.request(path, 'build') is None
+                first = sources(site)
+                assert first
+
+                # unchanged sources are reused, the edited one is parsed
+                post_name = glob.glob(os.path.join(path, 'posts', '*.md'))[0]
+                with open(post_name, 'a', encoding='utf-8') as f:
+                    f.write('\nDaemon round trip.\n')
+                touch(post_name)
+                daemon.request(path, 'build')
+                second = sources(site)
+                assert second.keys() == first.keys()
+                for file_name, item in second.items():
+                    reused = item is first[file_name]
+                    assert reused == (file_name != post_name), file_name
+                html = glob.glob(os.path.join(conf.get('build_path'),
+                                              '20*', '*', '*', '*.html'))
+                with open(html[0], encoding='utf-8') as f:
+                    assert 'Daemon round trip.' in f.read()
+
+                # configuration change drops the warm model
+                touch(conf.path())
+                daemon.request(path, 'build')
+                third = sources(site)
+                assert not any(third[file_name] is second[file_name]
+                               for file_name in second)
+
+                try:
+                    daemon.request(path, 'unknown')
+                    assert False, 'unknown command accepted'
+                except Exception as e:
+                    assert 'unknown' in str(e)
+            finally:
+                daemon.request(path, 'stop')
+                thread.join()
+                server.server_close()
+        finally:
+            conf._path, conf._params = saved
+
+
+def main():
+    test_round_trip()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# encoding: utf-8
+
+import os
+import tempfile
+from publicstatic import conf
+from publicstatic import const
+from publicstatic import datafiles
+from publicstatic import templates
+
+TEMPLATE = "{% for row in data %}{{ row.name }}={{ row.value }};{% endfor %}"
+
+
+def _write(path, *parts):
+    *parts, text = parts
+    file_name = os.path.join(path, *parts)
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    with open(file_name, 'w', encoding='utf-8') as f:
+        f.write(text)
+    return file_name
+
+
+def test_load():
+    with tempfile.TemporaryDirectory() as path:
+        yml = _write(path, 'a.yml', "- name: a\n  value: 1\n")
+        assert datafiles.load(yml) == [{'name': 'a', 'value': 1}]
+        _write(path, 'a.yml', "- name: b\n  value: 22\n")
+        os.utime(yml, ns=(0, 0))
+        assert datafiles.load(yml) == [{'name': 'b', 'value': 22}]
+        json = _write(path, 'b.json', '[{"name": "c", "value": 3}]')
+        assert datafiles.load(json) == [{'name': 'c', 'value': 3}]
+        csv = _write(path, 'c.csv', "name,value\nd,4\ne,5\n")
+        rows = datafiles.load(csv)
+        assert list(rows) == list(rows) == [{'name': 'd', 'value': '4'},
+                                            {'name': 'e', 'value': '5'}]
+    datafiles.reset()
+
+
+def test_render_data():
+    saved = conf._path, conf._params
+    with tempfile.TemporaryDirectory() as path:
+        _write(path, const.CONF_NAME, "title: Data\n")
+        _write(path, 'templates', '_data_list.html', TEMPLATE)
+        file_name = _write(path, 'data', 'items.csv', "name,value\na,1\n")
+        try:
+            conf.load(path)
+            templates.reset()
+            assert templates.render_data('items.csv', 'list') == 'a=1;'
+            _write(path, 'data', 'items.csv', "name,value\nb,22\n")
+            os.utime(file_name, ns=(0, 0))
+            assert templates.render_data('items.csv', 'list') == 'b=22;'
+        finally:
+            conf._path, conf._params = saved
+            templates.reset()
+
+
+def main():
+    test_load()
+    test_render_data()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,187 @@
+# encoding: utf-8
+
+import datetime
+import http.server
+import os
+import shutil
+import tempfile
+import threading
+import urllib.error
+from publicstatic import compress
+from publicstatic import const
+from publicstatic import deployer
+from publicstatic import manifest
+
+
+class StandInHandler(http.server.BaseHTTPRequestHandler):
+    """Minimal S3-compatible storage keeping objects in the server
+    storage dictionary."""
+
+    def do_GET(self):
+        if not self._authorized():
+            return
+        value = self.server.storage.get(self.path)
+        if value is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(value)))
+        self.end_headers()
+        self.wfile.write(value)
+
+    def do_PUT(self):
+        length = int(self.headers['Content-Length'])
+        body = self.rfile.read(length)
+        if not self._authorized(body):
+            return
+        self.server.storage[self.path] = body
+        self.send_response(200)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+    def do_DELETE(self):
+        if not self._authorized():
+            return
+        self.server.storage.pop(self.path, None)
+        self.send_response(204)
+        self.end_headers()
+
+    def _authorized(self, body=b''):
+        """Checks the signature recomputed with the known secret key."""
+        try:
+            now = datetime.datetime.strptime(self.headers['X-Amz-Date'],
+                                             '%Y%m%dT%H%M%SZ')
+        except (TypeError, ValueError):
+            now = None
+        url = "http://%s%s" % (self.headers['Host'], self.path)
+        expected = now and deployer.sign(self.command, url, body, 'us-east-1',
+                                         'key', 'secret', now)
+        if not expected or any(self.headers.get(name) != value
+                               for name, value in expected.items()):
+            self.send_error(403)
+            return False
+        return True
+
+    def log_message(self, *args):
+        pass
+
+
+def write(path, rel_path, text):
+    file_name = os.path.join(path, rel_path)
+    os.makedirs(os.path.dirname(file_name), exist_ok=True)
+    with open(file_name, 'w') as f:
+        f.write(text)
+
+
+def check_target(target, build_path):
+    write(build_path, 'index.html', 'index')
+    write(build_path, 'css/style.css', 'style')
+    write(build_path, 'old.html', 'old')
+    assert deployer.deploy(target, build_path, workers=2) == (3, 0)
+    assert target.get('css/style.css') == b'style'
+    assert deployer.deploy(target, build_path, workers=2) == (0, 0)
+
+    write(build_path, 'index.html', 'new index')
+    os.remove(os.path.join(build_path, 'old.html'))
+    assert deployer.deploy(target, build_path, workers=2) == (1, 1)
+    assert target.get('index.html') == b'new index'
+    assert target.get('old.html') is None
+    assert target.get(const.DEPLOY_MANIFEST) is not None
+
+
+def test_manifest():
+    path = tempfile.mkdtemp()
+    try:
+        write(path, 'a.html', 'a')
+        write(path, 'b/c.html', 'c')
+        old = manifest.scan(path)
+        assert sorted(old) == ['a.html', 'b/c.html']
+        assert manifest.loads(manifest.dumps(old)) == old
+        write(path, 'a.html', 'changed')
+        os.remove(os.path.join(path, 'b', 'c.html'))
+        write(path, 'd.html', 'd')
+        new = manifest.scan(path, old)
+        assert manifest.diff(old, new) == (['a.html', 'd.html'], ['b/c.html'])
+    finally:
+        shutil.rmtree(path)
+
+
+def test_dir_target():
+    build_path = tempfile.mkdtemp()
+    target_path = tempfile.mkdtemp()
+    try:
+        check_target(deployer.DirTarget(target_path), build_path)
+    finally:
+        shutil.rmtree(build_path)
+        shutil.rmtree(target_path)
+
+
+def test_sign():
+    now = datetime.datetime(2015, 1, 1)
+    url = 'https://s3.amazonaws.com/bucket/key'
+    sign = lambda url, secret='secret': deployer.sign(
+        'GET', url, b'', 'us-east-1', 'key', secret, now)['Authorization']
+    assert sign(url + '?b=2&a=1') == sign(url + '?a=1&b=2')
+    assert sign(url + '?a=1') != sign(url + '?a=2')
+    assert sign(url) != sign(url, 'other')
+
+
+def serve():
+    server = http.server.HTTPServer(('127.0.0.1', 0), StandInHandler)
+    server.storage = {}
+    thread = threading.Thread(target=server.serve_forever)
+    thread.start()
+    return server
+
+
+def test_s3_target():
+    server = serve()
+    build_path = tempfile.mkdtemp()
+    try:
+        endpoint = "http://127.0.0.1:%d" % server.server_address[1]
+        target = deployer.S3Target('bucket', 'site',
+                                   endpoint=endpoint,
+                                   access_key='key',
+                                   secret_key='secret')
+        check_target(target, build_path)
+        assert '/bucket/site/index.html' in server.storage
+        write(build_path, 'index.html.gz', 'compressed')
+        write(build_path, 'files/data.tar.gz', 'archive')
+        previous = manifest.scan(build_path)
+        previous['index.html.gz'][compress.FLAG] = True
+        assert deployer.deploy(target, build_path, previous, 2) == (1, 0)
+        assert '/bucket/site/files/data.tar.gz' in server.storage
+        assert '/bucket/site/index.html.gz' not in server.storage
+    finally:
+        shutil.rmtree(build_path)
+        server.shutdown()
+        server.server_close()
+
+
+def test_s3_credentials():
+    server = serve()
+    try:
+        endpoint = "http://127.0.0.1:%d" % server.server_address[1]
+        target = deployer.S3Target('bucket', endpoint=endpoint,
+                                   access_key='key', secret_key='wrong')
+        try:
+            target.put_bytes('index.html', b'index')
+            assert False, 'wrong secret key accepted'
+        except urllib.error.HTTPError as e:
+            assert e.code == 403
+        assert not server.storage
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def main():
+    test_manifest()
+    test_dir_target()
+    test_sign()
+    test_s3_target()
+    test_s3_credentials()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+# encoding: utf-8
+
+import tempfile
+import markdown
+from markdown.extensions import codehilite
+from publicstatic import conf
+from publicstatic import highlight
+
+CODE = "def f(x):\n    return x * 2\n"
+
+TEXT = """Indented:
+
+    :::python
+    def f(x):
+        return x * 2
+
+Fenced:
+
+```python
+def f(x):
+    return x * 2
+```
+"""
+
+
+def test_cached_highlighting():
+    expected = codehilite.CodeHilite(CODE, lang='python').hilite()
+    with tempfile.TemporaryDirectory() as path:
+        conf.set('highlight_cache', path)
+        highlight.reset()
+        try:
+            for _ in range(2):
+                hiliter = highlight.CodeHilite(CODE, lang='python')
+                assert hiliter.hilite() == expected
+            assert highlight.stats() == (1, 1)
+            highlight.CodeHilite(CODE, lang='text').hilite()
+            assert highlight.stats() == (1, 2)
+        finally:
+            conf.set('highlight_cache', '')
+            highlight.reset()
+
+
+def test_converter_extensions():
+    expected = markdown.markdown(TEXT, extensions=['codehilite',
+                                                   'fenced_code'])
+    with tempfile.TemporaryDirectory() as path:
+        conf.set('highlight_cache', path)
+        highlight.reset()
+        try:
+            for _ in range(2):
+                extensions = [highlight.CodeHiliteExtension(),
+                              highlight.FencedCodeExtension()]
+                assert markdown.markdown(TEXT,
+                                         extensions=extensions) == expected
+            assert highlight.stats() == (2, 2)
+        finally:
+            conf.set('highlight_cache', '')
+            highlight.reset()
+    # other Python-Markdown users are not affected
+    assert codehilite.CodeHilite is not highlight.CodeHilite
+    assert markdown.markdown(TEXT, extensions=['codehilite',
+                                               'fenced_code']) == expected
+    assert highlight.stats() == (0, 0)
+
+
+def main():
+    test_cached_highlighting()
+    test_converter_extensions()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,38 @@
+# encoding: utf-8
+
+import jinja2
+from publicstatic import hotspots
+
+TEMPLATES = {
+    '_macros.html': '{% macro item(x) %}<li>{{ x|upper }}</li>{% endmacro %}',
+    'base.html': '<ul>{% block main %}{% endblock %}</ul>',
+    'list.html': '{% extends "base.html" %}'
+                 '{% import "_macros.html" as m %}'
+                 '{% block main %}{% for x in items %}{{ m.item(x) }}'
+                 '{% endfor %}{% endblock %}',
+}
+
+
+def test_hotspots():
+    env = jinja2.Environment(loader=jinja2.DictLoader(TEMPLATES))
+    hotspots.enable()
+    try:
+        hotspots.instrument(env)
+        result = env.get_template('list.html').render(items=['a', 'b'])
+    finally:
+        hotspots.disable()
+    assert result == '<ul><li>A</li><li>B</li></ul>'
+    calls = dict(((record['kind'], record['name']), record['calls'])
+                 for record in hotspots.data())
+    assert calls[('template', 'list.html')] == 1
+    assert calls[('block', 'list.html:main')] == 1
+    assert calls[('macro', '_macros.html:item')] == 2
+    assert calls[('filter', 'upper')] == 2
+
+
+def main():
+    test_hotspots()
+
+
+if __name__ == '__main__':
+    main()
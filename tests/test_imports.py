@@ -0,0 +1,64 @@
+# encoding: utf-8
+
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+from publicstatic import conf
+from publicstatic import const
+
+# dependencies loaded on demand only
+HEAVY = ['jinja2', 'markdown', 'yaml', 'bs4', 'asyncio']
+
+
+def test_lazy_imports():
+    code = "import sys, publicstatic; print(' '.join(sys.modules))"
+    output = subprocess.check_output([sys.executable, '-c', code])
+    modules = output.decode().split()
+    loaded = [name for name in HEAVY if name in modules]
+    assert loaded == []
+
+
+def test_conf_cache():
+    saved = conf._path, conf._params
+    with tempfile.TemporaryDirectory() as path:
+        file_name = os.path.join(path, const.CONF_NAME)
+        cache_name = os.path.join(path, const.CONF_CACHE)
+        try:
+            with open(file_name, 'w', encoding='utf-8') as f:
+                f.write("title: Cached\n")
+            conf.load(path)
+            assert conf.get('title') == 'Cached'
+            with open(cache_name, encoding='utf-8') as f:
+                assert json.load(f)['conf'] == {'title': 'Cached'}
+            with open(file_name, 'w', encoding='utf-8') as f:
+                f.write("title: Changed site\n")
+            conf.load(path)
+            assert conf.get('title') == 'Changed site'
+
+            # cache in other formats is never unpickled
+            with open(cache_name, 'wb') as f:
+                pickle.dump((conf._stamp(file_name), {'title': 'Bad'}), f)
+            conf.load(path)
+            assert conf.get('title') == 'Changed site'
+
+            # values JSON could not keep are not cached
+            os.remove(cache_name)
+            with open(file_name, 'w', encoding='utf-8') as f:
+                f.write("title: Dated\nlaunched: 2015-01-01\n")
+            conf.load(path)
+            assert conf.get('title') == 'Dated'
+            assert not os.path.exists(cache_name)
+        finally:
+            conf._path, conf._params = saved
+
+
+def main():
+    test_lazy_imports()
+    test_conf_cache()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# encoding: utf-8
+
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from publicstatic import conf
+from publicstatic import loadtest
+from publicstatic import server
+
+SITEMAP = """<?xml version="1.0" encoding="UTF-8"?>
+<urlset xmlns="http://www.sitemaps.org/schemas/sitemap/0.9">
+<url><loc>http://example.com/</loc></url>
+<url><loc>http://example.com/about.html</loc></url>
+<url><loc>http://example.com/missing.html</loc></url>
+</urlset>"""
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_pathes():
+    assert loadtest.pathes(SITEMAP) == ['/', '/about.html', '/missing.html']
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert loadtest._percentile(values, 50) == 50
+    assert loadtest._percentile(values, 99) == 99
+    assert loadtest._percentile([], 50) == 0
+
+
+def test_run():
+    root = tempfile.mkdtemp()
+    saved = dict((param, conf.get(param))
+                 for param in ['index_page', 'build_path', 'live_reload'])
+    conf.set('index_page', 'index.html')
+    conf.set('build_path', root)
+    conf.set('live_reload', False)
+    for name, text in [('index.html', '<p>index</p>'),
+                       ('about.html', '<p>about</p>'),
+                       ('sitemap.xml', SITEMAP)]:
+        with open(os.path.join(root, name), 'w') as f:
+            f.write(text)
+    port = free_port()
+    instance = server.Server(root, port)
+    thread = threading.Thread(target=instance.serve, daemon=True)
+    thread.start()
+    try:
+        for attempt in range(50):
+            try:
+                socket.create_connection(('127.0.0.1', port)).close()
+                break
+            except ConnectionError:
+                time.sleep(0.1)
+        result = loadtest.run("http://127.0.0.1:%d/" % port, 3, 30)
+    finally:
+        instance.stop()
+        thread.join()
+        for param, value in saved.items():
+            conf.set(param, value)
+        shutil.rmtree(root)
+    assert result['requests'] == 30
+    assert result['statuses'] == {'200': 20, '404': 10}
+    assert abs(result['error_rate'] - 1 / 3) < 1e-9
+    assert 0 < result['latency']['p50'] <= result['latency']['max']
+
+
+def main():
+    test_pathes()
+    test_percentile()
+    test_run()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+# encoding: utf-8
+
+import gzip
+import os
+import tempfile
+from publicstatic import conf
+from publicstatic import manifest
+from publicstatic import publicstatic
+from publicstatic import writer
+
+
+def _write(path, rel_path, text):
+    file_name = os.path.join(path, *rel_path.split('/'))
+    writer.write_text(file_name, text)
+    assert writer.wait() == 0
+    return file_name
+
+
+def test_urls():
+    saved = conf._path, conf._params
+    try:
+        conf._params = conf.defaults()
+        conf.set('root_url', 'http://example.com/')
+        conf.set('index_page', 'index.html')
+        assert manifest.urls([]) == []
+        assert manifest.urls(['index.html', 'a/index.html', 'b.html',
+                              'c/main.html', 'd e/index.html',
+                              'f/\u00fc.html']) == [
+            'http://example.com/index.html',
+            'http://example.com/',
+            'http://example.com/a/index.html',
+            'http://example.com/a/',
+            'http://example.com/b.html',
+            'http://example.com/c/main.html',
+            'http://example.com/d%20e/index.html',
+            'http://example.com/d%20e/',
+            'http://example.com/f/%C3%BC.html',
+        ]
+    finally:
+        conf._path, conf._params = saved
+
+
+def test_changed_urls():
+    saved = conf._path, conf._params
+    with tempfile.TemporaryDirectory() as path:
+        try:
+            build_path = os.path.join(path, 'build')
+            changed_urls = os.path.join(path, 'changed-urls.txt')
+            conf._params = conf.defaults()
+            conf.set('log_file', None)
+            conf.set('root_url', 'http://example.com/')
+            conf.set('build_path', build_path)
+            conf.set('changed_urls', changed_urls)
+            conf.set('gzip', True)
+            conf.set('gzip_min_size', 0)
+
+            def track():
+                publicstatic._track_changes(build_path)
+                with open(changed_urls, encoding='utf-8') as f:
+                    return f.read().splitlines()
+
+            _write(build_path, 'index.html', '<p>index</p>')
+            _write(build_path, 'about.html', '<p>about</p>')
+            _write(build_path, 'old.html', '<p>old</p>')
+            # user file, not a compressed sibling
+            with gzip.open(os.path.join(build_path, 'data.tar.gz'), 'w') as f:
+                f.write(b'data')
+            assert track() == [
+                'http://example.com/about.html',
+                'http://example.com/data.tar.gz',
+                'http://example.com/index.html',
+                'http://example.com/',
+                'http://example.com/old.html',
+            ]
+            assert os.path.isfile(os.path.join(build_path, 'index.html.gz'))
+            assert track() == []
+
+            _write(build_path, 'about.html', '<p>changed</p>')
+            os.remove(os.path.join(build_path, 'old.html'))
+            assert track() == [
+                'http://example.com/about.html',
+                'http://example.com/old.html',
+            ]
+        finally:
+            conf._path, conf._params = saved
+
+
+def test_scan():
+    saved = conf._path, conf._params
+    with tempfile.TemporaryDirectory() as path:
+        try:
+            conf._params = conf.defaults()
+            conf.set('log_file', None)
+            writer.written()
+            written = set([_write(path, 'a.html', 'a'),
+                           _write(path, 'b.html', 'b')])
+            previous = manifest.scan(path)
+            assert set(previous) == set(['a.html', 'b.html'])
+
+            # only written files are hashed, others keep their hashes
+            # even if their modification time has changed
+            new = _write(path, 'a.html', 'c')
+            assert writer.written() == written
+            other = os.path.join(path, 'b.html')
+            with open(other, 'w', encoding='utf-8') as f:
+                f.write('d')
+            current = manifest.scan(path, previous, set([new]))
+            assert current['a.html']['hash'] == manifest.digest(new)
+            assert current['a.html']['hash'] != previous['a.html']['hash']
+            assert current['b.html']['hash'] == previous['b.html']['hash']
+            assert current['b.html']['mtime'] == os.path.getmtime(other)
+
+            # without the written files list, modification time is checked
+            current = manifest.scan(path, previous)
+            assert current['b.html']['hash'] == manifest.digest(other)
+        finally:
+            conf._path, conf._params = saved
+
+
+def main():
+    test_urls()
+    test_scan()
+    test_changed_urls()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,122 @@
+# encoding: utf-8
+
+import difflib
+import html
+import re
+import threading
+import pytest
+from publicstatic import markdown
+
+TEXTS = [
+    "Term\n:   definition\n\n\"Quoted\" text -- see example.com",
+    "```python\nprint('hello')\n```\n\nline one\nline two",
+    "<div>raw html</div>\n\n* item\n* another item",
+]
+
+# markdown-it backend compatibility corpus
+CORPUS = {
+    'paragraphs': "First paragraph\nwith a line break.\n\nSecond one.",
+    'emphasis': "Some *emphasis*, **strong** and `code` text.",
+    'nested_emphasis': "***Strong emphasis*** text.",
+    'headers': "# Title\n\nSection\n-------\n\n### Subsection",
+    'list_types': "* one\n* two\n\n1. first\n2. second",
+    'loose_lists': "* one\n* two\n\n* three",
+    'blockquote': "> Quoted\n> text",
+    'links': "[Link](http://example.com/ \"title\") and <http://a.org>",
+    'images': "![Alt](image.png \"title\")",
+    'raw_html': "<div class=\"note\">Raw HTML</div>\n\nText.",
+    'fenced_code': "```python\ndef f():\n    return 1\n```",
+    'fenced_no_lang': "```\nplain text\n```",
+    'indented_code': "    :::python\n    print('hello')",
+    'def_list': "Term\n:   Definition\n\nOther\n:   Another one",
+    'smarty': "\"Double\" and 'single' quotes -- dashes --- and more...",
+    'apostrophes': "Don't stop, it's fine.",
+    'urlize': "Visit example.com, www.example.org/path or "
+              "http://example.net/a?b=1.",
+    'urlize_in_link': "[example.com](http://example.com)",
+    'urlize_in_code': "`http://example.com`",
+    'hr': "Text\n\n* * *\n\nMore text",
+}
+
+# cases rendered differently by markdown-it
+DIFFERENCES = {
+    'images': 'attributes are written in a different order',
+    'list_types': 'bullet and ordered lists are not merged into one',
+    'loose_lists': 'all items of a loose list are wrapped in paragraphs',
+    'nested_emphasis': 'em and strong tags are nested the other way round',
+    'urlize_in_link': 'link text is not turned into a nested link',
+}
+
+
+def _require(*modules):
+    """Skips the test if grid extension or other third-party modules
+    are not installed."""
+    for name in ('mdx_grid',) + modules:
+        pytest.importorskip(name)
+
+
+def _normalize(text):
+    """Ignores character references and whitespace between tags."""
+    return re.sub(r'>\s+<', '><', html.unescape(text)).strip()
+
+
+def _compare():
+    """Yields (name, Python-Markdown output, markdown-it output)."""
+    python_markdown = markdown.converter(markdown.PYTHON_MARKDOWN)
+    markdown_it = markdown.converter(markdown.MARKDOWN_IT)
+    for name, text in sorted(CORPUS.items()):
+        expected = python_markdown.convert(text)
+        python_markdown.reset()
+        yield name, expected, markdown_it.convert(text)
+
+
+def test_converter_reuse():
+    _require()
+    import markdown as python_markdown
+    outputs = [python_markdown.markdown(text,
+                                        extensions=markdown.extensions())
+               for text in TEXTS]
+    instance = markdown.converter()
+    for _ in range(2):
+        for text, expected in zip(TEXTS, outputs):
+            assert instance.convert(text) == expected
+            instance.reset()
+    assert markdown.converter() is instance
+
+
+def test_converter_per_thread():
+    _require()
+    converters = []
+    thread = threading.Thread(
+        target=lambda: converters.append(markdown.converter()))
+    thread.start()
+    thread.join()
+    assert converters[0] is not markdown.converter()
+
+
+def test_markdown_it_compatibility():
+    _require('markdown_it', 'mdit_py_plugins')
+    for name, expected, result in _compare():
+        same = _normalize(expected) == _normalize(result)
+        assert same == (name not in DIFFERENCES), name
+
+
+def report():
+    """Prints differences between the engines for the corpus."""
+    for name, expected, result in _compare():
+        if _normalize(expected) != _normalize(result):
+            print("%s: %s" % (name, DIFFERENCES.get(name, 'unexpected')))
+            diff = difflib.unified_diff(expected.splitlines(),
+                                        result.splitlines(), lineterm='')
+            print('\n'.join(list(diff)[2:]) + '\n')
+
+
+def main():
+    test_converter_reuse()
+    test_converter_per_thread()
+    test_markdown_it_compatibility()
+    report()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+# encoding: utf-8
+
+import inspect
+import os
+from publicstatic import memory
+
+
+def test_snapshots():
+    memory.snapshot('ignored')
+    memory.enable(5)
+    try:
+        memory.snapshot('start')
+        line = inspect.currentframe().f_lineno + 1
+        data = [bytearray(1024) for _ in range(1000)]
+        memory.snapshot('allocate')
+    finally:
+        memory.disable()
+    start, allocate = memory.data()
+    assert (start['stage'], allocate['stage']) == ('start', 'allocate')
+    assert allocate['traced'] - start['traced'] >= len(data) * 1024
+    site = allocate['growth'][0]
+    expected = "%s:%d" % (os.path.basename(__file__), line)
+    assert site['site'].endswith(expected)
+    assert site['size'] >= len(data) * 1024
+    assert len(allocate['top']) <= 5
+
+
+def main():
+    test_snapshots()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,33 @@
+# encoding: utf-8
+
+import logging
+from publicstatic import metrics
+
+
+def test_metrics():
+    metrics.start()
+    try:
+        with metrics.builder('posts'):
+            metrics.count('outputs_written', 2)
+            metrics.count('bytes_written', 100)
+        logging.getLogger().error('failed')
+        result = metrics.data()
+    finally:
+        metrics.stop()
+    assert 'posts' in result['builders']
+    assert result['counters']['outputs_written'] == 2
+    assert result['counters']['outputs_linked'] == 0
+    assert result['log']['error'] == 1
+    text = metrics.prometheus(result)
+    assert '# TYPE pub_build_bytes_written gauge\n' in text
+    assert 'pub_build_bytes_written 100\n' in text
+    assert 'pub_build_builder_duration_seconds{builder="posts"} ' in text
+    assert 'pub_build_log_messages{level="error"} 1\n' in text
+
+
+def main():
+    test_metrics()
+
+
+if __name__ == '__main__':
+    main()
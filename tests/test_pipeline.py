@@ -0,0 +1,101 @@
+# encoding: utf-8
+
+import os
+import shutil
+import tempfile
+import threading
+import pytest
+from publicstatic import cache
+from publicstatic import conf
+from publicstatic import publicstatic
+from publicstatic import source
+
+POST = """title: Post %(number)d
+created: 2015/01/%(number)02d 12:00:00
+tags: %(tags)s
+
+Post number %(number)d with `code` and a link to example.com.
+
+```python
+print(%(number)d)
+```
+"""
+
+
+def tree(path):
+    """Returns {relative path: contents} for the directory. Sitemap is
+    skipped since it has build time in it."""
+    result = {}
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            file_name = os.path.join(root, name)
+            rel_path = os.path.relpath(file_name, path)
+            if rel_path != 'sitemap.xml':
+                with open(file_name, 'rb') as f:
+                    result[rel_path] = f.read()
+    return result
+
+
+def write_posts(path, count):
+    for number in range(1, count + 1):
+        tags = ', '.join(['odd' if number % 2 else 'even', 'all'])
+        name = os.path.join(path, 'posts', '201501%02d-post.md' % number)
+        with open(name, 'w', encoding='utf-8') as f:
+            f.write(POST % {'number': number, 'tags': tags})
+
+
+def test_pipeline():
+    pytest.importorskip('mdx_grid')
+    saved = conf._path, conf._params
+    with tempfile.TemporaryDirectory() as path:
+        try:
+            publicstatic.init(path)
+            write_posts(path, 12)
+            publicstatic.build(path)
+            build_path = conf.get('build_path')
+            expected = tree(build_path)
+            shutil.rmtree(build_path)
+            publicstatic.build(path, pipelined=True)
+            assert tree(build_path) == expected
+        finally:
+            conf._path, conf._params = saved
+
+
+def test_streaming():
+    """Markdown is converted while the next sources are parsed: parsing
+    of the later posts waits for a conversion to happen, which would time
+    out if conversion started after parsing."""
+    pytest.importorskip('mdx_grid')
+    saved = conf._path, conf._params
+    load, md = cache.load, source.md
+    converted = threading.Event()
+    waits = []
+
+    def slow_load(src_type, root, rel, reusable=None):
+        if src_type == source.PostSource and rel != '20150101-post.md':
+            waits.append(converted.wait(5))
+        return load(src_type, root, rel, reusable)
+
+    def tracked_md(text):
+        converted.set()
+        return md(text)
+
+    with tempfile.TemporaryDirectory() as path:
+        try:
+            publicstatic.init(path)
+            write_posts(path, 3)
+            cache.load, source.md = slow_load, tracked_md
+            publicstatic.build(path, pipelined=True)
+        finally:
+            cache.load, source.md = load, md
+            conf._path, conf._params = saved
+    assert waits and all(waits)
+
+
+def main():
+    test_pipeline()
+    test_streaming()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,113 @@
+# encoding: utf-8
+
+import asyncio
+import os
+import socket
+import tempfile
+import pytest
+from publicstatic import cache
+from publicstatic import conf
+from publicstatic import preview
+from publicstatic import publicstatic
+from publicstatic import server
+
+POST = '2010/10/10/welcome.html'
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def touch(file_name, delta=10):
+    """Moves file modification time forward."""
+    mtime = os.path.getmtime(file_name) + delta
+    os.utime(file_name, (mtime, mtime))
+
+
+def respond(instance, path):
+    request = server.Request('GET', path, 'HTTP/1.1', {})
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(instance.respond(request))
+    finally:
+        loop.close()
+
+
+def test_preview():
+    pytest.importorskip('mdx_grid')
+    saved = conf._path, conf._params
+    with tempfile.TemporaryDirectory() as path:
+        try:
+            publicstatic.init(path)
+            publicstatic.build(path)
+            build_path = conf.get('build_path')
+            conf.set('live_reload', False)
+            conf.set('live_cache_size', 2)
+            instance = preview.LiveServer(path, free_port())
+
+            # posts are rendered before the site is indexed
+            route = preview._provisional(POST)
+            assert route[0] == 'post'
+            assert preview._provisional('archive.html') is None
+
+            instance._snapshot = preview._snapshot()
+            instance._load()
+            instance._ready.set()
+            assert not instance.poll()
+
+            # rendered on demand with the builders' templates
+            response = respond(instance, '/about.html')
+            assert response.status == 200
+            with open(os.path.join(build_path, 'about.html'), 'rb') as f:
+                assert response.body == f.read()
+            assert respond(instance, '/missing.html').status == 404
+
+            # the least recently used response is dropped
+            assert respond(instance, '/about.html') is response
+            respond(instance, '/' + POST)
+            respond(instance, '/about.html')
+            respond(instance, '/archive.html')
+            assert list(instance._responses) == ['about.html',
+                                                 'archive.html']
+
+            # source changes invalidate rendered responses
+            page_name = os.path.join(path, 'pages', 'about.md')
+            with open(page_name, 'a', encoding='utf-8') as f:
+                f.write('\nUpdated about page.\n')
+            touch(page_name)
+            assert page_name in preview._snapshot()
+            assert instance.poll()
+            assert not instance._responses
+            response = respond(instance, '/about.html')
+            assert b'Updated about page.' in response.body
+
+            # the site is replaced only when reloaded with the new
+            # configuration, so requests never see it missing
+            sites = []
+            create = cache.Cache
+
+            def tracked(previous=None, *args, **kwargs):
+                sites.append((previous, instance._site))
+                return create(previous, *args, **kwargs)
+
+            touch(conf.path())
+            cache.Cache = tracked
+            try:
+                assert instance.poll()
+            finally:
+                cache.Cache = create
+            (previous, current), = sites
+            assert previous is None and current is not None
+            assert instance._site is not current
+        finally:
+            conf._path, conf._params = saved
+
+
+def main():
+    test_preview()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+# encoding: utf-8
+
+import tempfile
+from publicstatic import conf
+from publicstatic import profiler
+from publicstatic import publicstatic
+from publicstatic import tracing
+
+
+class Clock():
+    """Replaces time module for the profiler."""
+
+    def __init__(self):
+        self.now = 100.0
+
+    def perf_counter(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_disabled():
+    profiler.disable()
+    with profiler.builder('b'), profiler.item('i'), profiler.stage('s'):
+        pass
+    assert profiler.data()['items'] == []
+
+
+def test_nested_stages():
+    clock = Clock()
+    time, profiler.time = profiler.time, clock
+    profiler.enable()
+    try:
+        with profiler.builder('posts'):
+            with profiler.item('post.html'), profiler.stage('render'):
+                clock.sleep(0.02)
+                with profiler.stage('markdown'):
+                    clock.sleep(0.05)
+    finally:
+        profiler.disable()
+        profiler.time = time
+    result = profiler.data()
+    assert abs(result['builders']['posts'] - 0.07) < 1e-9
+    record, = result['items']
+    assert (record['builder'], record['item']) == ('posts', 'post.html')
+    stages = record['stages']
+    assert abs(stages['markdown']['seconds'] - 0.05) < 1e-9
+    assert abs(stages['render']['seconds'] - 0.02) < 1e-9
+    assert stages['render']['calls'] == stages['markdown']['calls'] == 1
+
+
+def test_failed_build():
+    saved = conf._path, conf._params
+    with tempfile.TemporaryDirectory() as path:
+        try:
+            publicstatic.build(path, profile=True, trace=path + '/trace.json')
+            assert False, 'build without configuration'
+        except conf.NotFoundException:
+            pass
+        finally:
+            conf._path, conf._params = saved
+    assert not profiler.enabled()
+    assert not tracing.enabled()
+
+
+def main():
+    test_disabled()
+    test_nested_stages()
+    test_failed_build()
+
+
+if __name__ == '__main__':
+    main()
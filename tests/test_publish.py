@@ -0,0 +1,97 @@
+# encoding: utf-8
+
+import os
+import shutil
+import tempfile
+import pytest
+from publicstatic import conf
+from publicstatic import const
+from publicstatic import publicstatic
+from publicstatic import publish
+from publicstatic import shards
+from publicstatic import writer
+
+
+def test_publish():
+    path = tempfile.mkdtemp()
+    saved = dict((param, conf.get(param))
+                 for param in ['build_path', 'keep_builds'])
+    try:
+        # parent directory of build_path is a symbolic link
+        os.mkdir(os.path.join(path, 'real'))
+        os.symlink(os.path.join(path, 'real'), os.path.join(path, 'alias'))
+        conf.set('build_path', os.path.join(path, 'alias', 'build'))
+        conf.set('keep_builds', 2)
+
+        published = []
+        for _ in range(3):
+            staging = publish.stage()
+            published.append(os.path.realpath(staging))
+            publish.swap(staging)
+            assert publish.current() == published[-1]
+        assert publish.builds() == published[1:]
+
+        publish.rollback()
+        assert publish.current() == published[1]
+        publish.prune()
+        assert publish.builds() == published[1:]
+        assert os.path.isdir(publish.current())
+        try:
+            publish.rollback()
+            assert False, 'rollback to a dropped build'
+        except publish.NoPreviousBuildException:
+            pass
+
+        publish.clean()
+        assert publish.current() is None
+        assert publish.builds() == []
+    finally:
+        for param, value in saved.items():
+            conf.set(param, value)
+        shutil.rmtree(path)
+
+
+def test_failed_build():
+    saved = conf._path, conf._params
+    wait = writer.wait
+    with tempfile.TemporaryDirectory() as path:
+        try:
+            publicstatic.init(path)
+            with open(os.path.join(path, const.CONF_NAME), 'a') as f:
+                f.write("\natomic_publish: true\n")
+
+            # staging directory is dropped if merge fails
+            try:
+                publicstatic.build(path, merge=True)
+                assert False, 'merge without shards'
+            except shards.IncompleteShardsException:
+                pass
+            assert publish.builds() == []
+            assert writer._baseline is None
+
+            # build with missing files is not published
+            pytest.importorskip('mdx_grid')
+            writer.wait = lambda dest_path=None: wait(dest_path) or 1
+            try:
+                publicstatic.build(path)
+                assert False, 'failed writes ignored'
+            except publish.IncompleteBuildException:
+                pass
+            writer.wait = wait
+            assert publish.current() is None
+            assert publish.builds() == []
+
+            publicstatic.build(path)
+            assert publish.builds() == [publish.current()]
+        finally:
+            writer.wait = wait
+            conf._path, conf._params = saved
+
+
+def main():
+    test_publish()
+    test_failed_build()
+
+
+if __name__ == '__main__':
+    main()
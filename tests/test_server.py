@@ -0,0 +1,159 @@
+# encoding: utf-8
+
+import asyncio
+import gzip
+import http.client
+import os
+import shutil
+import socket
+import tempfile
+import threading
+import time
+from publicstatic import conf
+from publicstatic import server
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_rel_path():
+    assert server._rel_path('/a/./b//c.html') == 'a/b/c.html'
+    assert server._rel_path('/') == ''
+    assert server._rel_path('/a/../../etc/passwd') is None
+
+
+def test_inject():
+    tag = '<script src="%s"></script>' % server.SCRIPT_PATH
+    html = server.inject(b'<html><body><p>x</p></BODY></html>')
+    assert html.decode() == '<html><body><p>x</p>%s</BODY></html>' % tag
+    assert server.inject(b'<p>x</p>').decode() == '<p>x</p>' + tag
+
+
+def test_injected_etag():
+    root = tempfile.mkdtemp()
+    saved = dict((param, conf.get(param))
+                 for param in ['build_path', 'live_reload'])
+    conf.set('build_path', root)
+    file_name = os.path.join(root, 'index.html')
+    with open(file_name, 'w') as f:
+        f.write('<p>index</p>')
+    instance = server.Server(root, free_port())
+    try:
+        request = server.Request('GET', '/', 'HTTP/1.1', {})
+        conf.set('live_reload', False)
+        plain = instance.file_response(request, 'index.html', file_name)
+        conf.set('live_reload', True)
+        injected = instance.file_response(request, 'index.html', file_name)
+        assert server.SCRIPT_PATH.encode() in injected.body
+        assert injected.headers['ETag'] != plain.headers['ETag']
+
+        # a page cached without the script is sent again
+        request = server.Request('GET', '/', 'HTTP/1.1', {
+            'if-none-match': plain.headers['ETag']})
+        response = instance.file_response(request, 'index.html', file_name)
+        assert response.status == 200
+        request = server.Request('GET', '/', 'HTTP/1.1', {
+            'if-none-match': injected.headers['ETag']})
+        response = instance.file_response(request, 'index.html', file_name)
+        assert response.status == 304
+    finally:
+        for param, value in saved.items():
+            conf.set(param, value)
+        shutil.rmtree(root)
+
+
+class Writer:
+    """Collects data written by the server."""
+
+    def __init__(self):
+        self.data = b''
+
+    def write(self, data):
+        self.data += data
+
+    async def drain(self):
+        pass
+
+
+def test_send_missing_file():
+    instance = server.Server(tempfile.gettempdir(), free_port())
+    response = server.Response(200, {'Content-Type': 'text/html'},
+                               file_name='/nonexistent/index.html', size=10)
+    writer = Writer()
+    loop = asyncio.new_event_loop()
+    try:
+        loop.run_until_complete(instance._send(writer, None, response, True))
+    finally:
+        loop.close()
+    assert writer.data.startswith(b'HTTP/1.1 404 ')
+    assert writer.data.endswith(b'\r\n\r\n404 Not Found\n')
+
+
+def test_server():
+    root = tempfile.mkdtemp()
+    saved = dict((param, conf.get(param))
+                 for param in ['index_page', 'build_path', 'live_reload'])
+    conf.set('index_page', 'index.html')
+    conf.set('build_path', root)
+    conf.set('live_reload', False)
+    with open(os.path.join(root, 'index.html'), 'w') as f:
+        f.write('<p>index</p>')
+    with gzip.open(os.path.join(root, 'index.html.gz'), 'wt') as f:
+        f.write('<p>index</p>')
+    port = free_port()
+    instance = server.Server(root, port)
+    thread = threading.Thread(target=instance.serve, daemon=True)
+    thread.start()
+    try:
+        for attempt in range(50):
+            try:
+                connection = http.client.HTTPConnection('127.0.0.1', port)
+                connection.connect()
+                break
+            except ConnectionError:
+                time.sleep(0.1)
+
+        connection.request('GET', '/')
+        response = connection.getresponse()
+        assert response.status == 200
+        assert response.read() == b'<p>index</p>'
+        etag = response.getheader('ETag')
+
+        # the same connection is kept alive
+        connection.request('GET', '/index.html', headers={
+            'If-None-Match': etag})
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 304
+
+        connection.request('GET', '/', headers={'Accept-Encoding': 'gzip'})
+        response = connection.getresponse()
+        assert response.getheader('Content-Encoding') == 'gzip'
+        assert gzip.decompress(response.read()) == b'<p>index</p>'
+
+        connection.request('GET', '/missing.html')
+        response = connection.getresponse()
+        response.read()
+        assert response.status == 404
+        connection.close()
+    finally:
+        instance.stop()
+        thread.join()
+        for param, value in saved.items():
+            conf.set(param, value)
+        shutil.rmtree(root)
+
+
+def main():
+    test_rel_path()
+    test_inject()
+    test_injected_etag()
+    test_send_missing_file()
+    test_server()
+
+
+if __name__ == '__main__':
+    main()
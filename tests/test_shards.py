@@ -0,0 +1,98 @@
+# encoding: utf-8
+
+import os
+import shutil
+import tempfile
+import pytest
+from publicstatic import cli
+from publicstatic import conf
+from publicstatic import publicstatic
+from publicstatic import shards
+
+
+def tree(path):
+    """Returns {relative path: contents} for the directory. Sitemap is
+    skipped since it has build time in it."""
+    result = {}
+    for root, dirs, files in os.walk(path):
+        for name in files:
+            file_name = os.path.join(root, name)
+            rel_path = os.path.relpath(file_name, path)
+            if rel_path != 'sitemap.xml':
+                with open(file_name, 'rb') as f:
+                    result[rel_path] = f.read()
+    return result
+
+
+def test_parse():
+    assert shards.parse('2/4') == (2, 4)
+    assert shards.parse(' 1 / 1 ') == (1, 1)
+    for value in ['0/4', '5/4', '1', 'a/b', '']:
+        try:
+            shards.parse(value)
+            assert False, "'%s' should not be accepted" % value
+        except shards.ShardFormatException:
+            pass
+
+
+def test_index():
+    pathes = ["2015/01/%02d/post.html" % day for day in range(1, 29)]
+    numbers = [shards.index(path, 3) for path in pathes]
+    assert all(1 <= number <= 3 for number in numbers)
+    assert len(set(numbers)) == 3
+    assert numbers == [shards.index(path, 3) for path in pathes]
+    assert shards.index('/about.html', 3) == shards.index('about.html', 3)
+
+
+def test_cli():
+    assert cli.parse(['build', '--shard', '1/2'])['shard'] == '1/2'
+    for args in [['--output', 'out'], ['--merge']]:
+        try:
+            cli.parse(['build', '--shard', '1/2'] + args)
+            assert False, "%s should be rejected with --shard" % args[0]
+        except SystemExit:
+            pass
+
+
+def test_merge():
+    pytest.importorskip('mdx_grid')
+    saved = conf._path, conf._params
+    with tempfile.TemporaryDirectory() as path:
+        try:
+            publicstatic.init(path)
+            publicstatic.build(path)
+            build_path = conf.get('build_path')
+            expected = tree(build_path)
+
+            # shard left by a build with a different shard count
+            os.makedirs(shards.path(1, 3))
+            publicstatic.build(path, shard='1/2')
+            try:
+                publicstatic.build(path, merge=True)
+                assert False, 'merge with a missing shard'
+            except shards.IncompleteShardsException:
+                pass
+            publicstatic.build(path, shard='2/2')
+            assert not os.path.exists(shards.path(1, 3))
+            shard_files = [tree(shards.path(number, 2))
+                           for number in (1, 2)]
+            assert all(shard_files)
+            assert not set(shard_files[0]) & set(shard_files[1])
+
+            os.makedirs(shards.path(1, 3))
+            shutil.rmtree(build_path)
+            publicstatic.build(path, merge=True)
+            assert tree(build_path) == expected
+        finally:
+            conf._path, conf._params = saved
+
+
+def main():
+    test_parse()
+    test_index()
+    test_cli()
+    test_merge()
+
+
+if __name__ == '__main__':
+    main()
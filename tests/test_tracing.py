@@ -0,0 +1,56 @@
+# encoding: utf-8
+
+import json
+import os
+import tempfile
+import threading
+from publicstatic import profiler
+from publicstatic import tracing
+
+
+def test_disabled():
+    tracing.disable()
+    assert tracing.span('s') is tracing.span('t')
+
+
+def _work():
+    with tracing.span('x'):
+        pass
+
+
+def test_spans():
+    tracing.enable()
+    try:
+        with profiler.builder('posts'):
+            with profiler.item('post.html'), profiler.stage('render'):
+                with tracing.span('execute', command='true'):
+                    pass
+        thread = threading.Thread(target=_work, name='worker')
+        thread.start()
+        thread.join()
+    finally:
+        tracing.disable()
+    with tempfile.TemporaryDirectory() as path:
+        file_name = os.path.join(path, 'trace.json')
+        tracing.save(file_name)
+        with open(file_name, encoding='utf-8') as f:
+            events = json.load(f)['traceEvents']
+    spans = {event['name']: event for event in events if event['ph'] == 'X'}
+    assert set(spans) == {'posts', 'render', 'execute', 'x'}
+    render, builder = spans['render'], spans['posts']
+    assert render['args'] == {'builder': 'posts', 'item': 'post.html'}
+    assert builder['ts'] <= render['ts']
+    assert render['ts'] + render['dur'] <= builder['ts'] + builder['dur']
+    assert spans['x']['tid'] != spans['posts']['tid']
+    names = {event['args']['name'] for event in events
+             if event['name'] == 'thread_name'}
+    assert 'worker' in names
+
+
+def main():
+    test_disabled()
+    test_spans()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+# encoding: utf-8
+
+import os
+import tempfile
+from publicstatic import conf
+from publicstatic import writer
+
+
+def test_reset():
+    saved = dict((param, conf.get(param))
+                 for param in ['writer_threads', 'writer_queue_size'])
+    conf.set('writer_queue_size', 4)
+    try:
+        with tempfile.TemporaryDirectory() as path:
+            for threads in [1, 3]:
+                conf.set('writer_threads', threads)
+                writer.reset()
+                file_name = os.path.join(path, "%d.txt" % threads)
+                writer.write_text(file_name, 'text')
+                assert writer.wait() == 0
+                assert writer._executor._max_workers == threads
+                with open(file_name, encoding='utf-8') as f:
+                    assert f.read() == 'text'
+    finally:
+        writer.reset()
+        for param, value in saved.items():
+            conf.set(param, value)
+
+
+def test_produce():
+    with tempfile.TemporaryDirectory() as path:
+        dest = os.path.join(path, 'out.css')
+        with open(dest, 'w', encoding='utf-8') as f:
+            f.write('old')
+        reference = os.path.join(path, 'reference.txt')
+        open(reference, 'w').close()
+
+        def produce(tmp_path):
+            with open(dest, encoding='utf-8') as f:
+                assert f.read() == 'old'  # replaced when complete
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.write('new')
+
+        writer.produce(dest, produce)
+        with open(dest, encoding='utf-8') as f:
+            assert f.read() == 'new'
+        # permissions of a regular new file
+        assert os.stat(dest).st_mode == os.stat(reference).st_mode
+
+        def fail(tmp_path):
+            raise OSError('command failed')
+
+        try:
+            writer.produce(dest, fail)
+            assert False, 'error ignored'
+        except OSError:
+            pass
+        with open(dest, encoding='utf-8') as f:
+            assert f.read() == 'new'
+        assert sorted(os.listdir(path)) == ['out.css', 'reference.txt']
+
+
+def main():
+    test_reset()
+    test_produce()
+
+
+if __name__ == '__main__':
+    main()